@@ -1,50 +1,28 @@
 import calendar
-import glob
-import json
 import statistics
 from pathlib import Path
 
-from matplotlib import pyplot as plt
 from tabulate import tabulate
 
 import mca.config.constants as _constants
 import mca.core.interval as _correct_interval
-from mca.analytics.activity import display_most_active_days, get_most_active_days
-from mca.analytics.links import get_topn_links
-from mca.analytics.media import (
-    display_topn_photos,
-    get_most_reactedto_photos,
-    get_most_reactedto_videos,
-    get_topn_photos,
-    get_topn_videos,
-    save_topn_videos,
-)
-from mca.analytics.message_length import (
-    display_average_message_lengths,
-    get_average_message_length,
-)
-from mca.config.constants import COLORS, IS_WINDOWS
+from mca.config.constants import COLORS
+from mca.core.ingest import load_messages
 from mca.core.interval import check_month_interval, filter_messages_to_one_month
-from mca.core.normalizer import standarize
-from mca.core.parsed_messages import parse_messages
-from mca.ml.label_days import display_label_calendar, label_days
-from mca.nlp.digest import save_group_chat_digest
-from mca.nlp.summarize_ollama import (
-    save_group_chat_digest as save_ollama_digest,
-    summarize_month as ollama_summarize_month,
-    summarize_most_active_days as ollama_summarize_active_days,
-)
-from mca.viz.emojis import create_emoji_cloud, extract_emojis, save_emoji_cloud
-from mca.viz.word_cloud import display_word_cloud, get_most_used_words
+from mca.core.storage import find_exports, open_export
 
-try:
-    plt.style.use("rose-pine-moon")
-except OSError:
-    pass
+# Everything behind the analysis steps (matplotlib, PIL, sklearn, nltk, wordcloud, ollama, ...) is
+# imported inside the step that needs it, so listing the chats does not wait for it.
+# Check with: python -X importtime main.py
 
 
-def standarize_path(path):
-    return path.replace("\\", "/") if IS_WINDOWS else path
+def use_chart_style():
+    import matplotlib.style
+
+    try:
+        matplotlib.style.use("rose-pine-moon")
+    except OSError:
+        pass
 
 
 def init_members(data):
@@ -68,197 +46,317 @@ def get_top_3(data):
     return sorted(data, key=lambda m: m["num_of_messages"], reverse=True)[:3]
 
 
-def displayGeneral(members, debug):
-    plt.figure(figsize=(12, 6))
+def general_figure(members, show=False):
+    from mca.viz.render import new_figure
+
     sorted_members = sorted(members, key=lambda x: x["name"])
     list_names = [x["name"] for x in sorted_members if x["num_of_messages"] > 15]
     list_mess = [x["num_of_messages"] for x in sorted_members if x["num_of_messages"] > 15]
-    bars = plt.barh(list_names, list_mess)
-    plt.grid(axis="y")
-    plt.title("Liczba wiadomości na osobę (przynajmniej 15 wiadomości)")
+    if not list_mess:
+        return None
 
-    plt.xlabel("Liczba wiadomości")
-    plt.ylabel("Uczestnicy")
+    fig = new_figure(figsize=(12, 6), show=show)
+    ax = fig.subplots()
+    bars = ax.barh(list_names, list_mess)
+    ax.grid(axis="y")
+    ax.set_title("Liczba wiadomości na osobę (przynajmniej 15 wiadomości)")
 
-    if not list_mess:
-        print("No members with more than 15 messages, skipping general statistics chart")
-        plt.close()
-        return
+    ax.set_xlabel("Liczba wiadomości")
+    ax.set_ylabel("Uczestnicy")
 
     mean_val = statistics.mean(list_mess)
     median_val = statistics.median(list_mess)
 
-    plt.axvline(
+    ax.axvline(
         mean_val,
         color="red",
         linestyle="--",
         linewidth=2,
         label=f"Średnia: {mean_val:.1f}",
     )
-    plt.axvline(
+    ax.axvline(
         median_val,
         color="green",
         linestyle="--",
         linewidth=2,
         label=f"Mediana: {median_val:.1f}",
     )
-    plt.legend()
+    ax.legend()
 
     for bar in bars:
         xval = bar.get_width()
         yval = bar.get_y() + bar.get_height() / 2
-        plt.text(
+        ax.text(
             xval + 1,
             yval,
             int(xval),
             va="center",
             ha="left",
         )
-    plt.tight_layout()
-    plt.savefig(f"{_constants.results_dir()}/general.png")
+    fig.tight_layout()
+    return fig
 
-    if debug:
-        plt.show()
 
+def displayGeneral(members, debug, exporter=None):
+    from mca.viz.render import export_figure
 
-def displayTop3(members, debug):
-    plt.figure(figsize=(12, 6))
+    fig = general_figure(members, show=debug)
+    if fig is None:
+        print("No members with more than 15 messages, skipping general statistics chart")
+        return
+    export_figure(fig, f"{_constants.results_dir()}/general.png", exporter=exporter, debug=debug)
+
+
+def top3_figure(members, show=False):
+    from mca.viz.render import new_figure
+
+    fig = new_figure(figsize=(12, 6), show=show)
+    ax = fig.subplots()
     list_names = [x["name"] for x in members]
     list_mess = [x["num_of_messages"] for x in members]
-    bars = plt.bar(list_names, height=list_mess, width=0.5, color=COLORS)
-    plt.xticks()
-    plt.title("Top 3 najbardziej udzielających się osób")
-    plt.xlabel("Uczestnicy")
-    plt.ylabel("Liczba wiadomości")
-    plt.grid(axis="y")
+    bars = ax.bar(list_names, height=list_mess, width=0.5, color=COLORS)
+    ax.set_title("Top 3 najbardziej udzielających się osób")
+    ax.set_xlabel("Uczestnicy")
+    ax.set_ylabel("Liczba wiadomości")
+    ax.grid(axis="y")
     for bar in bars:
         yval = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2.4, yval + 1, yval)
-    plt.tight_layout()
-    plt.savefig(f"{_constants.results_dir()}/top3.png")
-
-    if debug:
-        plt.show()
-
-
-def pick_chat_to_analyze(folder):
-    chats = []
-    paths = []
-    for i, file in enumerate(glob.glob(f"./{folder}/your_facebook_activity/messages/inbox/*")):
-        path = standarize_path(file).split("/")[-1]
-        chat_name = path.split("_")[0]
-        chats.append((i + 1, chat_name))
-        paths.append((i + 1, path))
-    print(f"Available chats in {folder}:")
-    print(tabulate(chats, headers=["Number", "Name"], tablefmt="outline"))
-    choice = int(
-        input("Pick a chat to analyze (0 picks nothing and continues to other available folders if there are any): ")
-    )
-    if choice < 1 or choice > len(chats):
+        ax.text(bar.get_x() + bar.get_width() / 2.4, yval + 1, yval)
+    fig.tight_layout()
+    return fig
+
+
+def displayTop3(members, debug, exporter=None):
+    from mca.viz.render import export_figure
+
+    fig = top3_figure(members, show=debug)
+    export_figure(fig, f"{_constants.results_dir()}/top3.png", exporter=exporter, debug=debug)
+
+
+def pick_chat_to_analyze(export):
+    """Lets the user pick a chat from the export's catalog; typing text instead of a number filters the list."""
+    from mca.core.catalog import load_catalog
+
+    export = open_export(export)
+    catalog = load_catalog(export)
+    shown = catalog
+    while True:
+        rows = [
+            (i + 1, entry.name, entry.folder, len(entry.participants), entry.period(), f"{entry.size / 2**20:.1f} MB")
+            for i, entry in enumerate(shown)
+        ]
+        print(f"Available chats in {export.name}:")
+        print(tabulate(rows, headers=["Number", "Name", "Folder", "People", "Period", "Size"], tablefmt="outline"))
+        answer = input(
+            "Pick a chat to analyze (0 picks nothing and continues to other available folders if there are any,"
+            " text filters the list): "
+        ).strip()
+        if answer.lstrip("-").isdigit():
+            break
+        shown = [entry for entry in catalog if entry.matches(answer)]
+
+    choice = int(answer)
+    if choice < 1 or choice > len(shown):
         print("Wrong choice, exiting")
         return None
     elif choice == 0:
         print("Picked 0, continuing to other available folders")
         return None
-    else:
-        path2 = paths[choice - 1][1]
-    return path2
+    return shown[choice - 1]
 
 
-def get_facebook_folders():
-    current_dir = Path.cwd()
-    facebook_folders = [
-        folder.name for folder in current_dir.iterdir() if folder.is_dir() and folder.name.startswith("facebook")
-    ]
-    if not facebook_folders:
-        print("Did not find any facebook folders, try putting the folder in the same directory as the script")
+def get_facebook_exports():
+    """Extracted ``facebook*`` folders and ``facebook*.zip`` archives in the current directory."""
+    facebook_exports = find_exports(Path.cwd())
+    if not facebook_exports:
+        print("Did not find any facebook folders or zip files, try putting them in the same directory as the script")
         exit(1)
-    return facebook_folders[::-1]
+    return facebook_exports[::-1]
 
 
-def process_chat(path, folder, chat_name):
-    message_files = sorted(
-        path.glob("message_*.json"),
-        key=lambda p: int(p.stem.split("_")[1]),
-    )
+def load_chat(export, chat, thread_folder="inbox"):
+    """
+    ``(data, typed)`` of all message_N.json pages of a chat, read in one pass: ``data`` is the merged
+    export (text already repaired) and ``typed`` the same with its messages decoded into ``Message``
+    structs. Messages that cannot be decoded (no sender or timestamp, a field of the wrong type) are
+    left out of both and reported with the page they are in. None if there are no pages or one is malformed.
+    """
+    from mca.core.schema import SchemaError
+
+    export = open_export(export)
+    message_files = export.message_pages(chat, thread_folder)
     if not message_files:
-        print(f"No message files found in {path}")
-        return
+        print(f"No message files found for {chat} in {export.name}")
+        return None
+
+    skipped = []
+    try:
+        data, messages = load_messages(export, message_files, skipped)
+    except SchemaError as error:
+        print(f"Malformed export, {error}")
+        return None
+    if skipped:
+        report_skipped(skipped)
+    return data, {**data, "messages": messages}
+
+
+def report_skipped(problems, shown=10):
+    more = f" and {len(problems) - shown} more" if len(problems) > shown else ""
+    print(f"Skipped {len(problems)} messages that could not be read: {'; '.join(problems[:shown])}{more}")
+
 
-    with message_files[0].open() as f:
-        data = json.load(f)
-    for msg_file in message_files[1:]:
-        with msg_file.open() as f:
-            page = json.load(f)
-            data["messages"].extend(page["messages"])
+def store_chat(export, chat, thread_folder="inbox"):
+    """Imports the chat into its SQLite store (see ``mca.core.store``) and returns the database path."""
+    from mca.core.schema import SchemaError
+    from mca.core.store import import_chat, open_store, store_path
+
+    export = open_export(export)
+    path = store_path(export, chat, thread_folder)
+    conn = open_store(path)
+    skipped = []
+    try:
+        imported = import_chat(conn, export, chat, thread_folder, skipped=skipped)
+    except SchemaError as error:
+        print(f"Malformed export, {error}")
+        return None
+    finally:
+        conn.close()
+    if skipped:
+        report_skipped(skipped)
+    print(f"{imported} new or changed pages imported into {path}")
+    return path
+
+
+def export_parquet(export, chat, chat_name, thread_folder="inbox"):
+    """Writes the parsed messages and day features of the whole chat to ./parquet-{chat_name} (see ``mca.core.parquet``)."""
+    loaded = load_chat(export, chat, thread_folder)
+    if loaded is None:
+        return None
+    _, typed = loaded
+
+    from mca.core.parquet import write_chat
+    from mca.core.parsed_messages import parse_messages
+    from mca.ml.features import build_day_features
+
+    root = write_chat(f"./parquet-{chat_name}", parse_messages(typed), build_day_features(typed))
+    print(f"Messages and day features written to {root}")
+    return root
+
+
+def load_month(export, chat, thread_folder="inbox"):
+    """``(data, typed)`` of the month the chat is analysed for, or None if it cannot be loaded."""
+    loaded = load_chat(export, chat, thread_folder)
+    if loaded is None:
+        return None
 
-    standarize(data)
+    data, typed = loaded
     check_month_interval(data)
     data = filter_messages_to_one_month(data)
     check_month_interval(data)
+    return data, filter_messages_to_one_month(typed)
+
+
+def process_chat(export, chat, chat_name, thread_folder="inbox"):
+    export = open_export(export)
+    month = load_month(export, chat, thread_folder)
+    if month is None:
+        return
+    data, typed = month
 
     _constants.MONTHNAME = calendar.month_name[_correct_interval.CORRECT_MONTH]
     _constants.CHATNAME = chat_name
     Path(_constants.results_dir()).mkdir(exist_ok=True)
 
-    messages = parse_messages(data)
+    from mca.core.parsed_messages import parse_messages
+    from mca.viz.render import FigureExporter
+
+    use_chart_style()
+    messages = parse_messages(typed)
     members = init_members(data)
     print(len(members))
     num_participants = len(members)
+    exporter = FigureExporter()
 
     def run_member_processing():
         count_messages(messages, members)
         return members
 
     def run_general_stats():
-        displayGeneral(members, debug)
+        displayGeneral(members, debug, exporter=exporter)
         return "General statistics generated"
 
     def run_links():
+        from mca.analytics.links import get_topn_links
+
         return get_topn_links(messages)
 
     def run_top_users():
         top_3 = get_top_3(members)
-        displayTop3(top_3, debug)
+        displayTop3(top_3, debug, exporter=exporter)
         return "Top users processed"
 
     def run_media():
+        from mca.analytics.media import (
+            display_topn_photos,
+            get_most_reactedto_photos,
+            get_most_reactedto_videos,
+            get_topn_photos,
+            get_topn_videos,
+            save_topn_videos,
+        )
+
         photos = get_most_reactedto_photos(messages)
         videos = get_most_reactedto_videos(messages)
         top3photos = get_topn_photos(photos, num_participants=num_participants) if photos else None
         top3videos = get_topn_videos(videos, num_participants=num_participants) if videos else None
         if top3photos:
-            display_topn_photos(top3photos, folder, debug)
+            display_topn_photos(top3photos, export, debug)
         if top3videos:
-            save_topn_videos(top3videos, folder)
+            save_topn_videos(top3videos, export)
         return "Media processed"
 
     _day_labels: dict = {}
     _active_days: tuple = ()
 
     def run_label_days():
-        result = label_days(data)
+        from mca.ml.label_days import display_label_calendar, label_days
+
+        result = label_days(typed)
         _day_labels.update(result or {})
-        display_label_calendar(result, debug)
+        display_label_calendar(result, debug, exporter=exporter)
         return "Label days processed"
 
     def run_active_days():
+        from mca.analytics.activity import (
+            display_most_active_days,
+            get_most_active_days,
+        )
+
         nonlocal _active_days
         _active_days = get_most_active_days(messages)
-        display_most_active_days(*_active_days, debug, day_labels=_day_labels or None)
+        display_most_active_days(*_active_days, debug, day_labels=_day_labels or None, exporter=exporter)
         return "Active days processed"
 
     def run_word_cloud():
-        words, top_n = get_most_used_words(data)
-        display_word_cloud(words, top_n, debug)
+        from mca.viz.word_cloud import count_most_used_words, display_word_cloud
+
+        word_counts, top_n = count_most_used_words(data)
+        display_word_cloud(word_counts, top_n, debug)
         return "Word cloud generated"
 
     def run_message_lengths():
+        from mca.analytics.message_length import (
+            display_average_message_lengths,
+            get_average_message_length,
+        )
+
         lengths = get_average_message_length(messages)
-        display_average_message_lengths(lengths, debug)
+        display_average_message_lengths(lengths, debug, exporter=exporter)
         return "Message lengths processed"
 
     def run_emojis():
+        from mca.viz.emojis import create_emoji_cloud, extract_emojis, save_emoji_cloud
+
         emojis = extract_emojis(messages)
         if emojis:
             ascii_art = create_emoji_cloud(emojis)
@@ -266,20 +364,32 @@ def process_chat(path, folder, chat_name):
         return "Emojis processed"
 
     def run_digest():
+        from mca.nlp.digest import save_group_chat_digest
+
         save_group_chat_digest(data, out_dir=Path(_constants.results_dir()))
         return "Chat digest processed"
 
     def run_ollama_digest():
+        from mca.nlp.summarize_ollama import (
+            save_group_chat_digest as save_ollama_digest,
+        )
+
         save_ollama_digest(data, out_dir=Path(_constants.results_dir()))
         return "Ollama chat digest processed"
 
     def run_ollama_month_summary():
+        from mca.nlp.summarize_ollama import summarize_month as ollama_summarize_month
+
         summary = ollama_summarize_month(data)
         out = Path(_constants.results_dir()) / "month_summary_ollama.txt"
         out.write_text(summary.summary, encoding="utf-8")
         return f"Ollama month summary saved to {out}"
 
     def run_ollama_active_days_summary():
+        from mca.nlp.summarize_ollama import (
+            summarize_most_active_days as ollama_summarize_active_days,
+        )
+
         if not _active_days:
             return "Active days not computed yet, skipping"
         top_dates = [date for date, _ in _active_days[0]]
@@ -314,26 +424,114 @@ def process_chat(path, folder, chat_name):
 
     total = len(steps)
     print(f"Processing chat data... ({total} steps)")
-    for i, (step_desc, step_func) in enumerate(steps, 1):
-        print(f"[{i}/{total}] {step_desc}...")
-        result = step_func()
-        if debug:
-            print(f"        → {result}")
+    with exporter:
+        for i, (step_desc, step_func) in enumerate(steps, 1):
+            print(f"[{i}/{total}] {step_desc}...")
+            result = step_func()
+            if debug:
+                print(f"        → {result}")
 
     print(f"Data saved in {_constants.results_dir()} folder")
 
 
+def save_period_results(stats, participants, export, exporter=None):
+    """Charts and reports of one period (a ``PeriodStats``) into the current results folder."""
+    from mca.analytics.activity import display_most_active_days
+    from mca.analytics.links import report_links
+    from mca.analytics.media import (
+        display_topn_photos,
+        get_topn_photos,
+        get_topn_videos,
+        save_topn_videos,
+    )
+    from mca.analytics.message_length import display_average_message_lengths
+    from mca.viz.emojis import create_emoji_cloud, save_emoji_cloud
+    from mca.viz.word_cloud import display_word_cloud
+
+    members = [{"name": name, "num_of_messages": stats.member_messages[name]} for name in participants]
+    displayGeneral(members, debug, exporter=exporter)
+    displayTop3(get_top_3(members), debug, exporter=exporter)
+    report_links(stats.links)
+    display_most_active_days(*stats.most_active_days(), debug, exporter=exporter)
+
+    lengths = stats.average_message_lengths()
+    if lengths:
+        display_average_message_lengths(lengths, debug, exporter=exporter)
+    if stats.words:
+        display_word_cloud(stats.words, 500_000, debug)
+    if stats.emojis:
+        save_emoji_cloud(create_emoji_cloud(stats.emojis))
+
+    top_photos = get_topn_photos(stats.photos, num_participants=len(participants)) if stats.photos else None
+    top_videos = get_topn_videos(stats.videos, num_participants=len(participants)) if stats.videos else None
+    if top_photos:
+        display_topn_photos(top_photos, export, debug)
+    if top_videos:
+        save_topn_videos(top_videos, export)
+
+
+def process_chat_by_period(export, chat, chat_name, period="month", thread_folder="inbox"):
+    """
+    Partitioned analysis: the export is read and parsed once, split into weeks, months or quarters
+    by timestamp and every period gets its own results folder (e.g. ``results-2024-03-{chat}``).
+    """
+    from mca.analytics.periods import aggregate_periods
+    from mca.core.interval import partition_by_period
+    from mca.core.parsed_messages import parse_messages
+    from mca.viz.render import FigureExporter
+
+    export = open_export(export)
+    loaded = load_chat(export, chat, thread_folder)
+    if loaded is None:
+        return
+
+    data, typed = loaded
+    periods = aggregate_periods(partition_by_period(parse_messages(typed), period))
+    participants = [participant["name"] for participant in data["participants"]]
+
+    use_chart_style()
+    _constants.CHATNAME = chat_name
+    total = len(periods)
+    print(f"Processing chat data... ({total} {period}s)")
+    with FigureExporter() as exporter:
+        for i, stats in enumerate(periods.values(), 1):
+            print(f"[{i}/{total}] {stats.label}: {stats.messages} messages")
+            _constants.MONTHNAME = stats.label
+            Path(_constants.results_dir()).mkdir(exist_ok=True)
+            save_period_results(stats, participants, export, exporter=exporter)
+
+    print(f"Data saved in {total} results-*-{chat_name} folders")
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Messenger chat analysis")
+    parser.add_argument(
+        "--period",
+        choices=["week", "month", "quarter"],
+        help="analyse the whole export with one results folder per period instead of a single month",
+    )
+    parser.add_argument(
+        "--sqlite",
+        action="store_true",
+        help="import the chat into an SQLite database in misc/cache/stores/ for SQL queries instead of analysing it",
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="write the parsed chat to partitioned Parquet files in ./parquet-<chat>/ instead of analysing it",
+    )
+    args = parser.parse_args()
     debug = False
 
-    facebook_folders = get_facebook_folders()
+    facebook_exports = get_facebook_exports()
 
     picked = False
-    for folder in facebook_folders:
-        chat_to_analyze = pick_chat_to_analyze(folder)
+    for export in facebook_exports:
+        chat_to_analyze = pick_chat_to_analyze(export)
 
         if chat_to_analyze:
-            path = Path(folder) / "your_facebook_activity" / "messages" / "inbox" / chat_to_analyze
             picked = True
             break
 
@@ -341,4 +539,12 @@ if __name__ == "__main__":
         print("Folder with message_1.json not found")
         exit()
 
-    process_chat(path, folder, chat_to_analyze.split("_")[0])
+    chat_name = chat_to_analyze.chat.split("_")[0]
+    if args.sqlite:
+        store_chat(export, chat_to_analyze.chat, chat_to_analyze.folder)
+    elif args.parquet:
+        export_parquet(export, chat_to_analyze.chat, chat_name, chat_to_analyze.folder)
+    elif args.period:
+        process_chat_by_period(export, chat_to_analyze.chat, chat_name, args.period, chat_to_analyze.folder)
+    else:
+        process_chat(export, chat_to_analyze.chat, chat_name, chat_to_analyze.folder)
@@ -0,0 +1,30 @@
+"""
+Lazy package exports.
+
+``mca.<package>`` maps its public names to the submodule that defines them, and a submodule (with
+matplotlib, PIL, sklearn, ... behind it) is only imported when one of its names is first used.
+"""
+
+import importlib
+import sys
+
+
+def lazy_exports(package, exports):
+    """
+    ``(__getattr__, __dir__, __all__)`` for ``package``, where ``exports`` maps relative submodule
+    names to the names they provide, e.g. ``{".links": ["get_topn_links"]}``.
+    """
+    origin = {name: module for module, names in exports.items() for name in names}
+
+    def __getattr__(name):
+        module = origin.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(origin))
+
+    return __getattr__, __dir__, sorted(origin)
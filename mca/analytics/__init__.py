@@ -1,11 +1,19 @@
-from .activity import display_most_active_days, get_most_active_days
-from .links import get_topn_links
-from .media import (
-    display_topn_photos,
-    get_most_reactedto_photos,
-    get_most_reactedto_videos,
-    get_topn_photos,
-    get_topn_videos,
-    save_topn_videos,
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        ".activity": ["display_most_active_days", "get_most_active_days"],
+        ".links": ["get_topn_links", "report_links"],
+        ".media": [
+            "display_topn_photos",
+            "get_most_reactedto_photos",
+            "get_most_reactedto_videos",
+            "get_topn_photos",
+            "get_topn_videos",
+            "save_topn_videos",
+        ],
+        ".message_length": ["display_average_message_lengths", "get_average_message_length"],
+        ".periods": ["PeriodStats", "aggregate_periods"],
+    },
 )
-from .message_length import display_average_message_lengths, get_average_message_length
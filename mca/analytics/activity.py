@@ -1,20 +1,20 @@
 from collections import Counter
 from datetime import datetime
 
-import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+from matplotlib import colormaps
 
 from ..config import constants
+from ..viz.render import export_figure, new_figure
+from .topk import select_top
 
 
 def get_most_active_days(messages, top_n=3):
-    date_counts = Counter(msg.date for msg in messages)
-    return date_counts.most_common(top_n), top_n
+    date_counts = list(Counter(msg.date for msg in messages).items())
+    return select_top(date_counts, top_n, key=lambda day: day[1]), top_n
 
 
-def display_most_active_days(active_days, top_n, debug, day_labels=None):
-    if not active_days:
-        print("No active days data available, skipping chart")
-        return
+def most_active_days_figure(active_days, top_n, day_labels=None, show=False):
     dates, counts = zip(*active_days)
     formatted_dates = [datetime.strptime(date, "%Y-%m-%d").strftime("%d-%m-%Y (%A)") for date in dates]
     days_of_week_polish = {
@@ -33,7 +33,7 @@ def display_most_active_days(active_days, top_n, debug, day_labels=None):
         if day in date
     ]
 
-    palette = plt.cm.Set2.colors
+    palette = colormaps["Set2"].colors
     if day_labels:
         unique_labels = sorted(set(day_labels.values()))
         label_color = {lbl: palette[i % len(palette)] for i, lbl in enumerate(unique_labels)}
@@ -42,14 +42,15 @@ def display_most_active_days(active_days, top_n, debug, day_labels=None):
         bar_colors = ["skyblue"] * len(dates)
         label_color = {}
 
-    plt.figure(figsize=(12, 6))
-    bars = plt.bar(formatted_dates, counts, color=bar_colors)
-    plt.xlabel("Dni")
-    plt.ylabel("Liczba wiadomości")
-    plt.title(f"Top {top_n} najbardziej aktywnych dni")
+    fig = new_figure(figsize=(12, 6), show=show)
+    ax = fig.subplots()
+    bars = ax.bar(formatted_dates, counts, color=bar_colors)
+    ax.set_xlabel("Dni")
+    ax.set_ylabel("Liczba wiadomości")
+    ax.set_title(f"Top {top_n} najbardziej aktywnych dni")
 
     for bar, count in zip(bars, counts):
-        plt.text(
+        ax.text(
             bar.get_x() + bar.get_width() / 2.0,
             count + 1,
             int(count),
@@ -58,15 +59,18 @@ def display_most_active_days(active_days, top_n, debug, day_labels=None):
         )
 
     if label_color:
-        import matplotlib.patches as mpatches
-
-        plt.legend(
+        ax.legend(
             handles=[mpatches.Patch(color=c, label=str(lbl)) for lbl, c in label_color.items()],
             title="Etykieta dnia",
             loc="upper right",
         )
-    plt.tight_layout()
-    plt.savefig(f"{constants.results_dir()}/active_days.png")
+    fig.tight_layout()
+    return fig
 
-    if debug:
-        plt.show()
+
+def display_most_active_days(active_days, top_n, debug, day_labels=None, exporter=None):
+    if not active_days:
+        print("No active days data available, skipping chart")
+        return
+    fig = most_active_days_figure(active_days, top_n, day_labels=day_labels, show=debug)
+    export_figure(fig, f"{constants.results_dir()}/active_days.png", exporter=exporter, debug=debug)
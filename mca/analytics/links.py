@@ -1,25 +1,127 @@
+import csv
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
 from ..config import constants
+from .topk import select_top
+
+REPORT_FORMATS = ("txt", "csv", "json")
+_WRITE_BUFFER = 1 << 16
+# query parameters that only say where a link was shared from
+_TRACKING_PARAMS = frozenset({"fbclid", "gclid", "igshid", "si"})
+
+
+def normalize_url(url):
+    """Form used to dedupe links: no scheme, "www.", fragment, tracking parameters or trailing slash."""
+    parts = urlsplit(url if "//" in url else "//" + url)
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(
+        [
+            (k, v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k not in _TRACKING_PARAMS and not k.startswith("utm_")
+        ]
+    )
+    return host + parts.path.rstrip("/") + ("?" + query if query else "")
+
+
+@dataclass
+class LinkStats:
+    """``key`` only dedupes; reports show ``url``, the link as it was first shared (or the domain)."""
+
+    key: str
+    domain: str
+    url: str
+    shares: int = 0
+    reactions: int = 0
+    senders: Counter = field(default_factory=Counter)
+
+    @property
+    def top_sender(self):
+        return self.senders.most_common(1)[0][0]
 
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "domain": self.domain,
+            "shares": self.shares,
+            "reactions": self.reactions,
+            "senders": dict(self.senders),
+        }
 
-def get_topn_links(messages, top_n=15):
-    links = []
+
+def aggregate_links(messages, by="url"):
+    """
+    One ``LinkStats`` per normalised URL (or per domain with ``by="domain"``), in first-shared
+    order. Memory grows with the number of distinct links, not with how often they are posted.
+    """
+    if by not in ("url", "domain"):
+        raise ValueError(f"Unknown link grouping {by!r}, expected 'url' or 'domain'")
+    stats = {}
     for msg in messages:
-        for url in msg.urls:
-            links.append(
-                {
-                    "URL": url,
-                    "Sender": msg.sender,
-                    "Num_reactions": msg.num_reactions,
-                }
+        add_message_links(stats, msg, by)
+    return stats
+
+
+def add_message_links(stats, msg, by="url"):
+    """Adds the links of one message to a ``key -> LinkStats`` dict built by ``aggregate_links``."""
+    for url in msg.urls:
+        normalized = normalize_url(url)
+        domain = normalized.split("/", 1)[0].split("?", 1)[0]
+        key = normalized if by == "url" else domain
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = LinkStats(key, domain, url if by == "url" else domain)
+        entry.shares += 1
+        entry.reactions += msg.num_reactions
+        entry.senders[msg.sender] += 1
+
+
+def write_links_report(stats, path, fmt="txt"):
+    """Streams the links that got reactions to ``path`` as plain text, CSV or a JSON array."""
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format {fmt!r}, expected one of {REPORT_FORMATS}")
+    reacted = (entry for entry in stats if entry.reactions > 0)
+    with open(path, "w", encoding="UTF-8", newline="" if fmt == "csv" else None, buffering=_WRITE_BUFFER) as f:
+        if fmt == "txt":
+            for entry in reacted:
+                reaction_word = "reactions" if entry.reactions > 1 else "reaction"
+                senders = ", ".join(entry.senders)
+                f.write(f"{entry.url} (sent by {senders}): {entry.reactions} {reaction_word}\n")
+        elif fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["url", "domain", "shares", "reactions", "senders"])
+            writer.writerows(
+                (entry.url, entry.domain, entry.shares, entry.reactions, ";".join(entry.senders)) for entry in reacted
             )
+        else:
+            f.write("[")
+            for i, entry in enumerate(reacted):
+                f.write(",\n" if i else "\n")
+                f.write(json.dumps(entry.as_dict(), ensure_ascii=False))
+            f.write("\n]\n")
+    return path
+
+
+def get_topn_links(messages, top_n=15, by="url", fmt="txt"):
+    return report_links(aggregate_links(messages, by=by), top_n=top_n, fmt=fmt)
+
 
-    with open(f"{constants.results_dir()}/links.txt", "w", encoding="UTF-8") as f:
-        for link in links:
-            if link["Num_reactions"] > 0:
-                reaction_word = "reactions" if link["Num_reactions"] > 1 else "reaction"
-                f.write(f"{link['URL']} (sent by {link['Sender']}): {link['Num_reactions']} {reaction_word}\n")
+def report_links(stats, top_n=15, fmt="txt"):
+    """Writes the links report for already aggregated ``stats`` and returns the ``top_n`` most reacted links."""
+    write_links_report(stats.values(), f"{constants.results_dir()}/links.{fmt}", fmt=fmt)
 
-    links.sort(key=lambda x: x["Num_reactions"], reverse=True)
-    topnlinks = links[:top_n]
+    reacted = [entry for entry in stats.values() if entry.reactions > 0]
+    topnlinks = [
+        {
+            "URL": entry.url,
+            "Sender": entry.top_sender,
+            "Num_reactions": entry.reactions,
+            "Shares": entry.shares,
+        }
+        for entry in select_top(reacted, top_n, key=lambda entry: entry.reactions)
+    ]
 
     return topnlinks, len(topnlinks)
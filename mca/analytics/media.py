@@ -1,11 +1,25 @@
+import hashlib
+import io
+import json
+import math
 import os
 import platform
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cache
 from shutil import copyfile
 
 from PIL import Image, ImageDraw, ImageFont
 
 from ..config import constants
+from ..core.storage import open_export
+from .topk import select_top
+
+
+def _num_reactions(item):
+    return item["num_reactions"]
 
 
 def get_most_reactedto_photos(messages):
@@ -24,10 +38,7 @@ def get_most_reactedto_photos(messages):
 
 
 def get_topn_photos(photo_data, top_n=5, num_participants=1):
-    dynamic_topn = len([x for x in photo_data if x["num_reactions"] > int(num_participants * 0.2)])
-    if dynamic_topn > top_n:
-        top_n = dynamic_topn
-    result = sorted(photo_data, reverse=True, key=lambda x: x["num_reactions"])[:top_n]
+    result = select_top(photo_data, top_n, key=_num_reactions, threshold=int(num_participants * 0.2))
     print("\nNumber of photos", len(result))
     return result
 
@@ -48,10 +59,7 @@ def get_most_reactedto_videos(messages):
 
 
 def get_topn_videos(video_data, top_n=5, num_participants=1):
-    dynamic_topn = len([x for x in video_data if x["num_reactions"] > int(num_participants * 0.2)])
-    if dynamic_topn > top_n:
-        top_n = dynamic_topn
-    result = sorted(video_data, reverse=True, key=lambda x: x["num_reactions"])[:top_n]
+    result = select_top(video_data, top_n, key=_num_reactions, threshold=int(num_participants * 0.2))
     print("Number of videos", len(result))
     return result
 
@@ -59,122 +67,263 @@ def get_topn_videos(video_data, top_n=5, num_participants=1):
 # ==========
 
 
-def display_topn_photos(photos, folder_path, debug):
+_TEXT_FONT_CANDIDATES = {
+    "Windows": ["C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/segoeui.ttf"],
+    "Darwin": [
+        "/System/Library/Fonts/Supplemental/Arial.ttf",
+        "/System/Library/Fonts/Helvetica.ttc",
+    ],
+    "Linux": [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/truetype/ubuntu/Ubuntu-R.ttf",
+        "/usr/share/fonts/truetype/freefont/FreeSans.ttf",
+    ],
+}
+# longer side photos are decoded at (at most ~2x this); full-size camera originals only slow encoding down
+MAX_PHOTO_SIDE = 2048
+
+
+@cache
+def _text_font(size):
+    for candidate in _TEXT_FONT_CANDIDATES.get(platform.system(), []):
+        if os.path.exists(candidate):
+            try:
+                return ImageFont.truetype(candidate, size)
+            except OSError:
+                continue
+    return ImageFont.load_default()
+
+
+def _open_photo(photo_path, max_side=MAX_PHOTO_SIDE):
+    im = Image.open(photo_path)
+    longest = max(im.width, im.height)
+    if longest > max_side:
+        # JPEGs can be decoded straight at 1/2, 1/4 or 1/8 scale, other formats ignore this
+        scale = max_side / longest
+        im.draft(None, (math.ceil(im.width * scale), math.ceil(im.height * scale)))
+        factor = max(im.width, im.height) // max_side
+        if factor > 1:
+            im = im.reduce(factor)
+    return im
+
+
+def annotate_photo(photo_path, text, max_side=MAX_PHOTO_SIDE):
+    """Photo with ``text`` on a black strip above it, encoded as JPEG bytes."""
+    im = _open_photo(photo_path, max_side)
+
+    fillcolor = "white"
+    shadowcolor = "black"
+
+    fontsize = 20 if im.width < 500 or im.height < 500 else 40
+    font = _text_font(fontsize)
+
+    text_width = font.getlength(text)
+    newim = Image.new("RGB", (im.width, im.height + fontsize), "black")
+    newim.paste(im, (0, fontsize))
+
+    draw = ImageDraw.Draw(newim)
+    x, y = (im.width - text_width) / 2, 0
+
+    draw.text((x - 1, y - 1), text, font=font, fill=shadowcolor)
+    draw.text((x + 1, y - 1), text, font=font, fill=shadowcolor)
+    draw.text((x - 1, y + 1), text, font=font, fill=shadowcolor)
+    draw.text((x + 1, y + 1), text, font=font, fill=shadowcolor)
+    draw.text((x, y), text, font=font, fill=fillcolor)
+
+    if newim.mode in ("RGBA", "P", "LA"):
+        rgb_im = Image.new("RGB", newim.size, (255, 255, 255))
+        if newim.mode == "P":
+            newim = newim.convert("RGBA")
+        rgb_im.paste(newim, mask=newim.split()[-1] if newim.mode in ("RGBA", "LA") else None)
+        newim = rgb_im
+
+    buf = io.BytesIO()
+    newim.save(buf, "JPEG", quality=85, optimize=True)
+    return buf.getvalue()
+
+
+def _annotate_export_photo(export, uri, text):
+    photo_path = export.media_path(uri)
+    if photo_path is None:
+        raise FileNotFoundError(f"not found in {export.name}")
+    return annotate_photo(photo_path, text)
+
+
+def display_topn_photos(photos, folder_path, debug, max_workers=None):
+    """
+    Annotates the photos on a thread pool (Pillow releases the GIL while decoding and encoding)
+    and writes them as photo1.jpg, photo2.jpg, ... in ranking order, skipping unreadable ones.
+    ``folder_path`` is the export (folder, ZIP or ``Export``); zipped photos are extracted one by one.
+    """
+    export = open_export(folder_path)
+    out_dir = f"{constants.results_dir()}/top3photos/"
+    jobs = [(photo["photo"], photo["sent_by"] + " " + str(photo["num_reactions"])) for photo in photos]
     saved = 0
-    for photo in photos:
-        photo_path = os.path.join(folder_path, photo["photo"])
-        try:
-            im = Image.open(photo_path)
-
-            fillcolor = "white"
-            shadowcolor = "black"
-            text = photo["sent_by"] + " " + str(photo["num_reactions"])
-
-            fontsize = 20 if im.width < 500 or im.height < 500 else 40
-
-            _text_font_candidates = {
-                "Windows": ["C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/segoeui.ttf"],
-                "Darwin": [
-                    "/System/Library/Fonts/Supplemental/Arial.ttf",
-                    "/System/Library/Fonts/Helvetica.ttc",
-                ],
-                "Linux": [
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                    "/usr/share/fonts/truetype/ubuntu/Ubuntu-R.ttf",
-                    "/usr/share/fonts/truetype/freefont/FreeSans.ttf",
-                ],
-            }
-            font = ImageFont.load_default()
-            for candidate in _text_font_candidates.get(platform.system(), []):
-                if os.path.exists(candidate):
-                    try:
-                        font = ImageFont.truetype(candidate, fontsize)
-                    except OSError:
-                        continue
-                    break
-
-            text_width = font.getlength(text)
-            newim = Image.new("RGB", (im.width, im.height + fontsize), "black")
-            newim.paste(im, (0, fontsize))
-
-            draw = ImageDraw.Draw(newim)
-            x, y = (im.width - text_width) / 2, 0
-
-            draw.text((x - 1, y - 1), text, font=font, fill=shadowcolor)
-            draw.text((x + 1, y - 1), text, font=font, fill=shadowcolor)
-            draw.text((x - 1, y + 1), text, font=font, fill=shadowcolor)
-            draw.text((x + 1, y + 1), text, font=font, fill=shadowcolor)
-            draw.text((x, y), text, font=font, fill=fillcolor)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_annotate_export_photo, export, uri, text) for uri, text in jobs]
+        for (uri, _), future in zip(jobs, futures):
+            try:
+                encoded = future.result()
+            except Exception as e:
+                print(f"Skipping photo {uri}: {e}")
+                continue
 
+            saved += 1
+            os.makedirs(out_dir, exist_ok=True)
+            out_path = f"{out_dir}photo{saved}.jpg"
+            with open(out_path, "wb") as f:
+                f.write(encoded)
             if debug:
-                newim.show()
+                Image.open(out_path).show()
 
-            if newim.mode in ("RGBA", "P", "LA"):
-                rgb_im = Image.new("RGB", newim.size, (255, 255, 255))
-                if newim.mode == "P":
-                    newim = newim.convert("RGBA")
-                rgb_im.paste(newim, mask=newim.split()[-1] if newim.mode in ("RGBA", "LA") else None)
-                newim = rgb_im
 
-            saved += 1
-            os.makedirs(f"{constants.results_dir()}/top3photos/", exist_ok=True)
-            newim.save(
-                f"{constants.results_dir()}/top3photos/photo{saved}.jpg",
-                "JPEG",
-                quality=85,
-                optimize=True,
-            )
-        except Exception as e:
-            print(f"Skipping photo {photo_path}: {e}")
-
-
-def save_topn_videos(videos, folder_path):
+_VIDEO_CACHE_DIR = os.path.join("misc", "cache", "videos")
+_VIDEO_MAX_SIZE = (1280, 720)
+_VIDEO_ENCODE_ARGS = [
+    "-vcodec",
+    "libx264",
+    "-crf",
+    "28",
+    "-preset",
+    "fast",
+    "-vf",
+    "scale='min(1280,iw)':'min(720,ih)':force_original_aspect_ratio=decrease:force_divisible_by=2",
+    "-acodec",
+    "aac",
+    "-b:a",
+    "128k",
+]
+
+
+def _video_cache_key(source):
+    with open(source, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256")
+    digest.update(json.dumps(_VIDEO_ENCODE_ARGS).encode())
+    return digest.hexdigest()
+
+
+def _probe_streams(source):
+    """Stream list from ffprobe, or None when ffprobe is missing or cannot read the file."""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "stream=codec_type,codec_name,width,height",
+                "-of",
+                "json",
+                source,
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return json.loads(result.stdout).get("streams", [])
+    except ValueError:
+        return None
+
+
+def _can_stream_copy(streams):
+    """True when the source already is the target: h264 within 1280x720 and aac (or no) audio."""
+    if not streams:
+        return False
+    video = [st for st in streams if st.get("codec_type") == "video"]
+    audio = [st for st in streams if st.get("codec_type") == "audio"]
+    max_w, max_h = _VIDEO_MAX_SIZE
+    return (
+        len(video) == 1
+        and video[0].get("codec_name") == "h264"
+        and video[0].get("width", max_w + 1) <= max_w
+        and video[0].get("height", max_h + 1) <= max_h
+        and all(st.get("codec_name") == "aac" for st in audio)
+    )
+
+
+def transcode_video(source, cache_dir=_VIDEO_CACHE_DIR):
+    """
+    Returns ``(path, action)`` for a web-sized copy of ``source`` kept in ``cache_dir`` under its
+    content hash and the encoding parameters. ``action`` is "cached" when an earlier run already
+    produced it, "copied" for the stream-copy fast path and "transcoded" otherwise.
+    Raises ``subprocess.CalledProcessError`` when ffmpeg fails.
+    """
+    cached = os.path.join(cache_dir, f"{_video_cache_key(source)}.mp4")
+    if os.path.exists(cached):
+        return cached, "cached"
+
+    if _can_stream_copy(_probe_streams(source)):
+        args, action = ["-c", "copy", "-movflags", "+faststart"], "copied"
+    else:
+        args, action = _VIDEO_ENCODE_ARGS, "transcoded"
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # a partial file of its own: two jobs for the same content must not write into one file
+    fd, partial = tempfile.mkstemp(suffix=".part.mp4", dir=cache_dir)
+    os.close(fd)
+    cmd = ["ffmpeg", "-v", "error", "-i", source, *args, "-y", partial]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, cmd, stderr=result.stderr)
+        os.replace(partial, cached)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return cached, action
+
+
+def save_topn_videos(videos, folder_path, max_workers=2, cache_dir=_VIDEO_CACHE_DIR):
+    """
+    Writes video1.mp4, video2.mp4, ... through a queue of ``max_workers`` concurrent ffmpeg jobs.
+    Finished encodes are cached, so a repeated run only copies files. Without ffmpeg, or when it
+    fails on a video, the source is copied as is. Videos of a zipped export are extracted first.
+    """
+    export = open_export(folder_path)
     output_dir = f"{constants.results_dir()}/top3videos/"
     os.makedirs(output_dir, exist_ok=True)
+
+    jobs = {}
     for i, video in enumerate(videos):
-        source = os.path.join(folder_path, video["video"])
-        destination = os.path.join(output_dir, f"video{i + 1}.mp4")
-        try:
-            result = subprocess.run(
-                [
-                    "ffmpeg",
-                    "-i",
-                    source,
-                    "-vcodec",
-                    "libx264",
-                    "-crf",
-                    "28",
-                    "-preset",
-                    "fast",
-                    "-vf",
-                    "scale='min(1280,iw)':'min(720,ih)':force_original_aspect_ratio=decrease:force_divisible_by=2",
-                    "-acodec",
-                    "aac",
-                    "-b:a",
-                    "128k",
-                    "-y",
-                    destination,
-                ],
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode != 0:
-                print(f"FFmpeg error for {source}: {result.stderr}")
-                print("Falling back to direct copy...")
-                copyfile(source, destination)
-        except FileNotFoundError:
+        source = export.media_path(video["video"])
+        if source is None:
+            print(f"Source video not found, skipping: {video['video']}")
+            continue
+        jobs[i] = source
+
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg not found on PATH, falling back to direct copy...")
+        for i, source in jobs.items():
+            copyfile(source, os.path.join(output_dir, f"video{i + 1}.mp4"))
+        return
+
+    total = len(jobs)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(transcode_video, source, cache_dir): i for i, source in jobs.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            source = jobs[i]
+            destination = os.path.join(output_dir, f"video{i + 1}.mp4")
             try:
-                print("ffmpeg not found on PATH, falling back to direct copy...")
+                ready, action = future.result()
+                copyfile(ready, destination)
+                print(f"Videos [{done}/{total}] video{i + 1}.mp4 ({action})")
+            except subprocess.CalledProcessError as e:
+                print(f"FFmpeg error for {source}: {e.stderr}")
+                print("Falling back to direct copy...")
                 copyfile(source, destination)
-            except FileNotFoundError:
-                print(f"Source video not found, skipping: {source}")
-        except Exception as e:
-            print(f"Error processing video {source}: {e}")
-            print("Attempting direct copy as fallback...")
-            try:
-                ext = os.path.splitext(source)[1] or ".mp4"
-                fallback_dest = os.path.join(output_dir, f"video{i + 1}{ext}")
-                copyfile(source, fallback_dest)
-            except Exception as copy_error:
-                print(f"Fallback copy also failed: {copy_error}")
+            except Exception as e:
+                print(f"Error processing video {source}: {e}")
+                print("Attempting direct copy as fallback...")
+                try:
+                    ext = os.path.splitext(source)[1] or ".mp4"
+                    copyfile(source, os.path.join(output_dir, f"video{i + 1}{ext}"))
+                except Exception as copy_error:
+                    print(f"Fallback copy also failed: {copy_error}")
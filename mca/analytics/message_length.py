@@ -1,6 +1,5 @@
-import matplotlib.pyplot as plt
-
 from ..config import constants
+from ..viz.render import export_figure, new_figure
 
 
 def get_average_message_length(messages):
@@ -15,24 +14,27 @@ def get_average_message_length(messages):
     return {sender: int(sum(v) / len(v)) for sender, v in lengths.items()}
 
 
-def display_average_message_lengths(avg_lengths, debug):
+def average_message_lengths_figure(avg_lengths, show=False):
     participants, lengths = zip(*avg_lengths.items())
-    plt.figure(figsize=(12, 6))
-    bars = plt.barh(participants, lengths, color="skyblue")
-    plt.xlabel("Średnia długość wiadomości")
-    plt.ylabel("Uczestnicy")
-    plt.title("Średnia długość wiadomości na uczestnika")
+    fig = new_figure(figsize=(12, 6), show=show)
+    ax = fig.subplots()
+    bars = ax.barh(participants, lengths, color="skyblue")
+    ax.set_xlabel("Średnia długość wiadomości")
+    ax.set_ylabel("Uczestnicy")
+    ax.set_title("Średnia długość wiadomości na uczestnika")
 
     for bar, length in zip(bars, lengths):
-        plt.text(
+        ax.text(
             bar.get_width() + 0.5,
             bar.get_y() + bar.get_height() / 2.0,
             str(length),
             ha="left",
             va="center",
         )
-    plt.tight_layout()
-    plt.savefig(f"{constants.results_dir()}/avg_lengths.png")
+    fig.tight_layout()
+    return fig
+
 
-    if debug:
-        plt.show()
+def display_average_message_lengths(avg_lengths, debug, exporter=None):
+    fig = average_message_lengths_figure(avg_lengths, show=debug)
+    export_figure(fig, f"{constants.results_dir()}/avg_lengths.png", exporter=exporter, debug=debug)
@@ -0,0 +1,78 @@
+"""
+Per-period aggregates for the partitioned (week / month / quarter) analysis.
+
+The export is parsed once and the parsed messages are cut into periods with ``partition_by_period``,
+so the windows and the messages they read are one list; each message is then
+visited exactly once and feeds every aggregate of its period at the same time (member counts,
+active days, message lengths, emojis, words, links and media), instead of one pass per statistic
+and one run of the whole pipeline per month.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+from ..config.constants import stopwords_polish
+from ..core.interval import MessageWindow
+from ..viz.word_cloud import message_words
+from .links import LinkStats, add_message_links
+from .topk import select_top
+
+
+@dataclass
+class PeriodStats:
+    label: str
+    messages: int = 0
+    member_messages: Counter = field(default_factory=Counter)
+    day_messages: Counter = field(default_factory=Counter)
+    text_chars: Counter = field(default_factory=Counter)
+    text_messages: Counter = field(default_factory=Counter)
+    emojis: list = field(default_factory=list)
+    words: Counter = field(default_factory=Counter)
+    links: dict[str, LinkStats] = field(default_factory=dict)
+    photos: list = field(default_factory=list)
+    videos: list = field(default_factory=list)
+
+    def add(self, msg, stop_words=frozenset()):
+        self.messages += 1
+        self.day_messages[msg.date] += 1
+        self.emojis.extend(msg.emojis)
+        add_message_links(self.links, msg)
+        if msg.num_reactions > 0:
+            # same rows as get_most_reactedto_photos / get_most_reactedto_videos
+            for uri in msg.photos:
+                self.photos.append({"sent_by": msg.sender, "photo": uri, "num_reactions": msg.num_reactions})
+            for uri in msg.videos:
+                self.videos.append({"sent_by": msg.sender, "video": uri, "num_reactions": msg.num_reactions})
+        if msg.is_builtin:
+            return
+        self.member_messages[msg.sender] += 1
+        if msg.content is not None:
+            self.text_chars[msg.sender] += len(msg.content)
+            self.text_messages[msg.sender] += 1
+            if msg.content:
+                self.words.update(message_words(msg.content, stop_words))
+
+    def most_active_days(self, top_n=3):
+        """Same result as ``get_most_active_days`` on the period's messages."""
+        return select_top(list(self.day_messages.items()), top_n, key=lambda day: day[1]), top_n
+
+    def average_message_lengths(self):
+        """Same result as ``get_average_message_length`` on the period's messages."""
+        return {sender: int(self.text_chars[sender] / count) for sender, count in self.text_messages.items()}
+
+
+def aggregate_periods(partitions: Mapping[str, MessageWindow], stop_words=None) -> dict[str, PeriodStats]:
+    """
+    One ``PeriodStats`` per period of ``partitions``: label -> window over the ``ParsedMessage``
+    list, as from ``partition_by_period(parse_messages(data), period)``.
+    """
+    stop_words = stopwords_polish() if stop_words is None else stop_words
+    periods = {}
+    for label, window in partitions.items():
+        stats = periods[label] = PeriodStats(label)
+        for msg in window:
+            stats.add(msg, stop_words)
+    return periods
@@ -0,0 +1,62 @@
+"""
+The per-chat statistics as SQL aggregates over a ``mca.core.store`` database.
+
+Each function gives the same result as its counterpart over ``parse_messages`` output, optionally
+for ``start_ms <= timestamp_ms < end_ms`` only, which the ``messages_timestamp`` index serves.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from .topk import select_top
+
+
+def _window(start_ms=None, end_ms=None, column="timestamp_ms") -> tuple[str, list]:
+    conditions, params = [], []
+    if start_ms is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(start_ms)
+    if end_ms is not None:
+        conditions.append(f"{column} < ?")
+        params.append(end_ms)
+    return " AND ".join(conditions) or "1", params
+
+
+def count_messages(conn: sqlite3.Connection, start_ms=None, end_ms=None) -> dict[str, int]:
+    """Messages per sender without Messenger's builtin notices, like ``main.count_messages``."""
+    where, params = _window(start_ms, end_ms)
+    rows = conn.execute(
+        f"SELECT sender, COUNT(*) FROM messages WHERE NOT is_builtin AND {where} GROUP BY sender", params
+    )
+    return dict(rows.fetchall())
+
+
+def get_most_active_days(conn: sqlite3.Connection, top_n=3, start_ms=None, end_ms=None):
+    """``(dates with their message counts, top_n)`` like ``activity.get_most_active_days``."""
+    where, params = _window(start_ms, end_ms)
+    # newest day first, the order in which the export lists them, so ties break the same way
+    rows = conn.execute(
+        f"SELECT date, COUNT(*) FROM messages WHERE {where} GROUP BY date ORDER BY MAX(timestamp_ms) DESC", params
+    )
+    return select_top([tuple(row) for row in rows], top_n, key=lambda day: day[1]), top_n
+
+
+def get_average_message_length(conn: sqlite3.Connection, start_ms=None, end_ms=None) -> dict[str, int]:
+    """Average characters per text message and sender, like ``message_length.get_average_message_length``."""
+    where, params = _window(start_ms, end_ms)
+    rows = conn.execute(
+        "SELECT sender, SUM(LENGTH(content)), COUNT(*) FROM messages"
+        f" WHERE content IS NOT NULL AND NOT is_builtin AND {where} GROUP BY sender",
+        params,
+    )
+    return {sender: int(total / count) for sender, total, count in rows}
+
+
+def search(conn: sqlite3.Connection, query: str, limit=20) -> list[sqlite3.Row]:
+    """Best FTS5 matches of ``query`` (e.g. ``'pizza OR kebab'``) with their date, sender and content."""
+    return conn.execute(
+        "SELECT m.date, m.sender, m.content FROM messages_fts JOIN messages AS m ON m.id = messages_fts.rowid"
+        " WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?",
+        (query, limit),
+    ).fetchall()
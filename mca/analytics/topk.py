@@ -0,0 +1,49 @@
+"""
+Top-k selection shared by the photo, video, link and active-day rankings.
+
+Selection runs on a numpy array of scores with ``np.argpartition``: O(n) to find the k best and
+O(k log k) to order them, instead of sorting every candidate. Results match a stable
+``sorted(items, key=key, reverse=True)[:k]``, so equal scores keep their input order.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+
+import numpy as np
+
+
+def top_k_indices(scores, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first; ties go to the earlier index."""
+    scores = np.asarray(scores, dtype=np.float64)
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    neg = -scores
+    if k < scores.size:
+        # everything strictly better than the k-th score, topped up with the earliest ties
+        kth = np.partition(neg, k - 1)[k - 1]
+        better = np.flatnonzero(neg < kth)
+        ties = np.flatnonzero(neg == kth)[: k - better.size]
+        idx = np.concatenate([better, ties])
+    else:
+        idx = np.arange(scores.size)
+    return idx[np.lexsort((idx, neg[idx]))]
+
+
+def select_top[T](
+    items: Sequence[T],
+    top_n: int,
+    key: Callable[[T], float],
+    threshold: float | None = None,
+) -> list[T]:
+    """
+    The ``top_n`` best items by ``key``. With a ``threshold``, N grows to the number of items
+    scoring above it when there are more of those than ``top_n``.
+    """
+    scores = np.fromiter((key(item) for item in items), dtype=np.float64, count=len(items))
+    k = top_n
+    if threshold is not None:
+        k = max(k, int(np.count_nonzero(scores > threshold)))
+    return [items[i] for i in top_k_indices(scores, k)]
@@ -1,20 +1,38 @@
 import os
 import platform
 from datetime import datetime, timedelta
+from functools import cache
 
-import nltk
-from nltk.corpus import stopwords
+# resolved from the package, not the working directory, so the stopwords load wherever the CLI runs
+_NLTK_DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "misc", "nltk_data"))
 
-nltk.data.path.append(os.path.join("misc", "nltk_data"))
-# from https://raw.githubusercontent.com/bieli/stopwords/master/polish.stopwords.txt
-try:
-    STOPWORDS_POLISH = set(stopwords.words("polish"))
-except OSError:
-    mask_file = os.path.join("misc", "stencils", "cat_stencil_2k.png")
 
-    stopwords_file = os.path.join("misc", "nltk_data", "corpora", "stopwords", "polish")
-    with open(stopwords_file, "r", encoding="utf-8") as f:
-        STOPWORDS_POLISH = set(f.read().splitlines())
+def load_nltk():
+    """nltk with the bundled misc/nltk_data on its search path. Imported on first use, it takes seconds."""
+    import nltk
+
+    if _NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.append(_NLTK_DATA_DIR)
+    return nltk
+
+
+@cache
+def stopwords_polish() -> frozenset:
+    # from https://raw.githubusercontent.com/bieli/stopwords/master/polish.stopwords.txt
+    try:
+        return frozenset(load_nltk().corpus.stopwords.words("polish"))
+    except (OSError, LookupError):
+        stopwords_file = os.path.join(_NLTK_DATA_DIR, "corpora", "stopwords", "polish")
+        with open(stopwords_file, "r", encoding="utf-8") as f:
+            return frozenset(f.read().splitlines())
+
+
+def __getattr__(name):
+    # STOPWORDS_POLISH used to be built at import time; keep the name working without the import cost
+    if name == "STOPWORDS_POLISH":
+        return stopwords_polish()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 MESSENGER_BUILTIN_MESSAGES = [
     "voice call",
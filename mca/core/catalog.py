@@ -0,0 +1,157 @@
+"""
+Catalog of the chats in an export, for the chat picker.
+
+A chat's title, participants and first/last message times are read from the ends of its pages
+instead of parsing them: ``participants`` and the newest message open ``message_1.json``, the
+title closes it, and the oldest message closes the last page. The result is kept in an index file
+per export and a chat is only read again when the size or modification time of a page changes,
+so listing hundreds of chats is a few ``stat`` calls.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from .normalizer import fix_escaped_utf8
+from .storage import THREAD_FOLDERS, Export
+
+_CATALOG_CACHE_DIR = os.path.join("misc", "cache", "catalogs")
+_CATALOG_VERSION = 1
+# both ends of a page are read in chunks this big; pages are rarely smaller
+_EDGE_BYTES = 1 << 16
+
+_decoder = json.JSONDecoder()
+_KEY_RE = {key: re.compile(rf'"{key}"\s*:\s*') for key in ("participants", "title")}
+_TIMESTAMP_RE = re.compile(r'"timestamp_ms"\s*:\s*(\d+)')
+
+
+@dataclass
+class ChatEntry:
+    folder: str
+    chat: str
+    title: str
+    participants: list[str] = field(default_factory=list)
+    first_ms: int | None = None
+    last_ms: int | None = None
+    pages: int = 0
+    size: int = 0
+
+    @property
+    def name(self):
+        return self.title or self.chat.split("_")[0]
+
+    def matches(self, query):
+        """Case-insensitive match of ``query`` against the title, chat directory and participant names."""
+        query = query.casefold()
+        return any(query in text.casefold() for text in (self.title, self.chat, *self.participants))
+
+    def period(self):
+        if self.first_ms is None or self.last_ms is None:
+            return ""
+        first, last = (datetime.fromtimestamp(ms / 1000.0).strftime("%d-%m-%Y") for ms in (self.first_ms, self.last_ms))
+        return f"{first} - {last}"
+
+
+def _read_edges(export: Export, name: str, size: int) -> tuple[str, str]:
+    """First and last ``_EDGE_BYTES`` of a page; one chunk if the page is smaller than two."""
+    with export.open(name) as f:
+        if size <= 2 * _EDGE_BYTES:
+            text = fix_escaped_utf8(f.read()).decode("utf-8", errors="replace")
+            return text, text
+        head = fix_escaped_utf8(f.read(_EDGE_BYTES))
+        f.seek(size - _EDGE_BYTES)
+        tail = fix_escaped_utf8(f.read())
+    # a chunk edge can cut a character in half
+    return head.decode("utf-8", errors="ignore"), tail.decode("utf-8", errors="ignore")
+
+
+def _value(chunk: str, key: str, last=False):
+    """The JSON value of the first (or last) ``"key":`` in ``chunk``, or None if it is cut off or missing."""
+    matches = list(_KEY_RE[key].finditer(chunk)) if last else [_KEY_RE[key].search(chunk)]
+    match = matches[-1] if matches else None
+    if match is None:
+        return None
+    try:
+        return _decoder.raw_decode(chunk, match.end())[0]
+    except ValueError:
+        return None
+
+
+def _timestamps(chunk: str) -> list[int]:
+    return [int(ts) for ts in _TIMESTAMP_RE.findall(chunk)]
+
+
+def read_chat_entry(export: Export, folder: str, chat: str, pages: list[str], sizes: list[int]) -> ChatEntry:
+    """Reads the catalog entry of one chat from the edges of its pages, falling back to a full parse."""
+    head, tail = _read_edges(export, pages[0], sizes[0])
+    participants = _value(head, "participants")
+    title = _value(tail, "title", last=True)
+    newest = _timestamps(head)
+    if len(pages) > 1:
+        _, tail = _read_edges(export, pages[-1], sizes[-1])
+    oldest = _timestamps(tail)
+
+    if not isinstance(participants, list) or not isinstance(title, str) or not newest or not oldest:
+        first_page = export.load_json(pages[0])
+        participants = first_page.get("participants", [])
+        title = first_page.get("title", "")
+        newest = [m["timestamp_ms"] for m in first_page.get("messages", [])]
+        last_page = export.load_json(pages[-1]) if len(pages) > 1 else first_page
+        oldest = [m["timestamp_ms"] for m in last_page.get("messages", [])]
+
+    return ChatEntry(
+        folder=folder,
+        chat=chat,
+        title=title or "",
+        participants=[p["name"] for p in participants if "name" in p],
+        first_ms=min(oldest) if oldest else None,
+        last_ms=max(newest) if newest else None,
+        pages=len(pages),
+        size=sum(sizes),
+    )
+
+
+def load_catalog(export: Export, folders=THREAD_FOLDERS, cache_dir=_CATALOG_CACHE_DIR) -> list[ChatEntry]:
+    """
+    One ``ChatEntry`` per chat with at least one message page, in ``folders`` order. Entries are kept
+    in ``cache_dir`` and re-read only for chats whose pages changed.
+    """
+    index_path = Path(cache_dir) / f"{export.name}.json"
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") != _CATALOG_VERSION:
+            cached = {}
+    except (OSError, ValueError):
+        cached = {}
+    cached_chats = cached.get("chats", {})
+
+    entries, chats, changed = [], {}, False
+    for folder in folders:
+        for chat in export.chats(folder):
+            pages = export.message_pages(chat, folder)
+            if not pages:
+                continue
+            stamps = [[page, *export.stat(page)] for page in pages]
+            key = f"{folder}/{chat}"
+            hit = cached_chats.get(key)
+            if hit is not None and hit["stamps"] == stamps:
+                entry = ChatEntry(**hit["entry"])
+            else:
+                entry = read_chat_entry(export, folder, chat, pages, [size for _, size, _ in stamps])
+                changed = True
+            entries.append(entry)
+            chats[key] = {"stamps": stamps, "entry": asdict(entry)}
+
+    if changed or chats.keys() != cached_chats.keys():
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = index_path.with_name(index_path.name + ".part")
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({"version": _CATALOG_VERSION, "chats": chats}, f, ensure_ascii=False)
+        os.replace(partial, index_path)
+    return entries
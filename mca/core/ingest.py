@@ -0,0 +1,31 @@
+"""
+Loading the message pages of a chat.
+
+Every ``message_N.json`` is read, repaired and parsed with the fastest installed JSON backend
+(see ``normalizer.loads_export``), one page after the other, and its messages are decoded into
+``schema.Message`` structs right away, so loading is the only pass over the export. Pages are not
+spread over worker processes: sending a parsed page back to the parent costs about as much as
+parsing it, so a pool was slower than this loop.
+"""
+
+from __future__ import annotations
+
+from .schema import Message, decode_page
+from .storage import Export
+
+
+def load_messages(export: Export, pages: list[str], skipped: list | None = None) -> tuple[dict, list[Message]]:
+    """
+    ``pages`` merged into one export, the header of the first page with the messages of all of
+    them, and those messages decoded. A message that does not decode is left out of both and its
+    error, located in its page (``.../message_2.json: $.messages[4].content: expected str, got int``),
+    goes to ``skipped`` (see ``schema.decode_messages``). A malformed page header raises ``SchemaError``.
+    """
+    data, raw, typed = None, [], []
+    for page in pages:
+        loaded = export.load_json(page)
+        typed.extend(decode_page(loaded, page, skipped, kept=raw).messages)
+        if data is None:
+            data = loaded
+    data["messages"] = raw
+    return data, typed
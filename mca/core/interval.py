@@ -1,15 +1,21 @@
 import calendar
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from datetime import date, datetime, timedelta, tzinfo
+from itertools import islice
+from operator import attrgetter, itemgetter
 
 CORRECT_MONTH: int = 0
+CORRECT_YEAR: int = 0
 
 
 def check_month_interval(data) -> bool:
-    global CORRECT_MONTH
+    global CORRECT_MONTH, CORRECT_YEAR
     messages_list = data["messages"]
 
     num_messages = len(messages_list)
-    CORRECT_MONTH = datetime.fromtimestamp(messages_list[num_messages // 2]["timestamp_ms"] / 1000.0).month
+    middle = datetime.fromtimestamp(messages_list[num_messages // 2]["timestamp_ms"] / 1000.0)
+    CORRECT_MONTH, CORRECT_YEAR = middle.month, middle.year
     last_mess_timestamp = messages_list[0]["timestamp_ms"]
     first_mess_timestamp = messages_list[-1]["timestamp_ms"]
 
@@ -30,16 +36,138 @@ def check_month_interval(data) -> bool:
 def is_the_same_month(message):
     timestamp = message["timestamp_ms"] / 1000.0
     dt = datetime.fromtimestamp(timestamp)
-    return dt.month == CORRECT_MONTH
+    return dt.month == CORRECT_MONTH and dt.year == CORRECT_YEAR
 
 
-def filter_messages_to_one_month(data):
-    global CORRECT_MONTH
-    data_copy = data.copy()
-    messages_list = data["messages"]
+# ----------------------------
+# Timestamp windows
+# ----------------------------
+def _ms(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+def month_window(year: int, month: int, tz: tzinfo | None = None) -> tuple[int, int]:
+    """[start, end) of a calendar month in ms; ``tz=None`` means local time, like ``datetime.fromtimestamp``."""
+    start = datetime(year, month, 1, tzinfo=tz)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=tz)
+    return _ms(start), _ms(end)
+
+
+def week_window(day: date, tz: tzinfo | None = None) -> tuple[int, int]:
+    """[start, end) in ms of the Monday-to-Sunday week containing ``day``."""
+    monday = day - timedelta(days=day.weekday())
+    start = datetime(monday.year, monday.month, monday.day, tzinfo=tz)
+    end = start + timedelta(weeks=1)
+    return _ms(start), _ms(end)
+
+
+class MessageWindow(Sequence):
+    """Read-only view of ``messages[start:stop]`` that shares the underlying list instead of copying it."""
+
+    __slots__ = ("_messages", "start", "stop")
+
+    def __init__(self, messages, start: int, stop: int):
+        self._messages = messages
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._messages[i] for i in range(self.start, self.stop)[index]]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("message window index out of range")
+        return self._messages[self.start + index]
+
+    def __iter__(self):
+        return islice(self._messages, self.start, self.stop)
+
+    def __reversed__(self):
+        for i in range(self.stop - 1, self.start - 1, -1):
+            yield self._messages[i]
 
-    filtered_messages = list(filter(is_the_same_month, messages_list))
+    def __repr__(self):
+        return f"MessageWindow({self.start}:{self.stop} of {len(self._messages)})"
 
-    data_copy["messages"] = filtered_messages
 
+def _getter(messages, key: str):
+    """Reads ``key`` of export dicts by item and of ``Message`` / ``ParsedMessage`` objects by attribute."""
+    return itemgetter(key) if not messages or isinstance(messages[0], Mapping) else attrgetter(key)
+
+
+def messages_in_range(messages, start_ms: float, end_ms: float, key: str = "timestamp_ms") -> MessageWindow:
+    """
+    Messages with ``start_ms <= key < end_ms``, found with two binary searches. ``messages`` (export
+    dicts or decoded / parsed messages) must be sorted by ``key``, newest first (as in Facebook
+    exports) or oldest first.
+    """
+    get = _getter(messages, key)
+    n = len(messages)
+    if n and get(messages[0]) > get(messages[-1]):
+        lo = bisect_right(messages, -end_ms, key=lambda m: -get(m))
+        hi = bisect_right(messages, -start_ms, key=lambda m: -get(m))
+    else:
+        lo = bisect_left(messages, start_ms, key=get)
+        hi = bisect_left(messages, end_ms, key=get)
+    return MessageWindow(messages, lo, max(lo, hi))
+
+
+# ----------------------------
+# Periods
+# ----------------------------
+PERIODS = ("week", "month", "quarter")
+
+
+def period_window(period: str, day: date, tz: tzinfo | None = None) -> tuple[str, int, int]:
+    """Label ("2024-W05", "2024-01", "2024-Q1") and [start, end) in ms of the period containing ``day``."""
+    if period == "week":
+        iso = day.isocalendar()
+        return f"{iso.year}-W{iso.week:02d}", *week_window(day, tz)
+    if period == "month":
+        return f"{day.year}-{day.month:02d}", *month_window(day.year, day.month, tz)
+    if period == "quarter":
+        first_month = (day.month - 1) // 3 * 3 + 1
+        start, _ = month_window(day.year, first_month, tz)
+        _, end = month_window(day.year, first_month + 2, tz)
+        return f"{day.year}-Q{first_month // 3 + 1}", start, end
+    raise ValueError(f"Unknown period {period!r}, expected one of {PERIODS}")
+
+
+def partition_by_period(
+    messages, period: str = "month", tz: tzinfo | None = None, key: str = "timestamp_ms"
+) -> dict[str, MessageWindow]:
+    """
+    Cuts time-sorted messages into consecutive periods, oldest first, leaving out empty ones. Every
+    period is a ``MessageWindow`` over ``messages`` found with ``messages_in_range``, so nothing is copied.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period {period!r}, expected one of {PERIODS}")
+    if not messages:
+        return {}
+
+    get = _getter(messages, key)
+    oldest, newest = sorted((get(messages[0]), get(messages[-1])))
+    partitions = {}
+    end = oldest
+    while end <= newest:
+        label, start, end = period_window(period, datetime.fromtimestamp(end / 1000.0, tz).date(), tz)
+        window = messages_in_range(messages, start, end, key)
+        if window:
+            partitions[label] = window
+    return partitions
+
+
+def filter_messages_to_range(data, start_ms: float, end_ms: float):
+    """Shallow copy of ``data`` whose "messages" is a window over the original list."""
+    data_copy = data.copy()
+    data_copy["messages"] = messages_in_range(data["messages"], start_ms, end_ms)
     return data_copy
+
+
+def filter_messages_to_one_month(data, tz: tzinfo | None = None):
+    return filter_messages_to_range(data, *month_window(CORRECT_YEAR, CORRECT_MONTH, tz))
@@ -0,0 +1,48 @@
+"""
+JSON parser used for export pages.
+
+orjson or msgspec are several times faster than the standard library on big ``message_N.json``
+pages. Neither is a dependency: the first one that is installed is used, and ``json`` otherwise.
+``MCA_JSON_BACKEND=json`` (or ``orjson`` / ``msgspec``) forces one.
+"""
+
+import json
+import os
+from collections.abc import Callable
+from importlib.util import find_spec
+from typing import Any
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _backend_loads(name: str) -> Callable[[bytes], Any]:
+    """``loads`` of one backend; ImportError if it is not installed."""
+    if name == "orjson":
+        import orjson
+
+        return orjson.loads
+    if name == "msgspec":
+        import msgspec
+
+        return msgspec.json.Decoder().decode
+    if name == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON backend {name!r}, expected one of {', '.join(BACKENDS)}")
+
+
+def select_backend(name: str | None = None) -> str:
+    """
+    Makes ``loads`` use ``name``, or the fastest installed backend if it is None, and returns the
+    name of the backend in use. A missing backend asked for by name raises ImportError.
+    """
+    global BACKEND, loads
+    if name is None:
+        name = next(backend for backend in BACKENDS if backend == "json" or find_spec(backend) is not None)
+    loads = _backend_loads(name)
+    BACKEND = name
+    return name
+
+
+BACKEND: str
+loads: Callable[[bytes], Any]
+select_backend(os.environ.get("MCA_JSON_BACKEND") or None)
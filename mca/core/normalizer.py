@@ -1,7 +1,14 @@
+import re
+import sys
+
+from . import jsonbackend
+
+
 def standarize(data):
     """Re-encode participant names and message content from latin1 to utf-8.
 
     Facebook exports occasionally mis-encode non-ASCII characters; this fixes them in-place.
+    Pages read with ``loads_export`` are already fixed and must not go through this again.
     """
     for participant in data["participants"]:
         participant["name"] = participant["name"].encode("latin1").decode("utf-8")
@@ -12,6 +19,84 @@ def standarize(data):
             message["content"] = message["content"].encode("latin1").decode("utf-8")
 
 
+# Facebook writes every UTF-8 byte of a non-ASCII character as its own escape ("ł" is "\u00c5\u0082"),
+# which json turns into one Latin-1 character per byte: that is where the mojibake comes from.
+_BYTE_ESCAPE = rb"u00[89a-fA-F][0-9a-fA-F]"
+_OTHER_BACKSLASH = re.compile(rb"\\(?!" + _BYTE_ESCAPE + rb")")
+_ESCAPED_UTF8_RUN = re.compile(rb"\\\\|(?:\\" + _BYTE_ESCAPE + rb")+")
+# stands in for escaped backslashes; JSON text cannot contain a raw NUL
+_PLACEHOLDER = b"\x00\x00"
+
+
+def _unescape_run(match):
+    run = match.group()
+    if run == b"\\\\":
+        return run
+    raw = bytes.fromhex(run.replace(b"\\u00", b"").decode("ascii"))
+    try:
+        raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return run  # genuine Latin-1 escapes, not a UTF-8 sequence
+    return raw
+
+
+def fix_escaped_utf8(raw: bytes) -> bytes:
+    """
+    Export JSON with the byte escapes replaced by the UTF-8 bytes they stand for, so the JSON parser
+    produces correct strings in every field (content, names, reactions, titles, ...). Only bytes
+    >= 0x80 are unescaped, so no quote or backslash is ever introduced.
+
+    Runs as a few whole-buffer passes: escaped backslashes are parked, every other backslash that
+    does not start a byte escape is doubled, and ``unicode_escape`` + ``latin1`` turns the byte
+    escapes into bytes. Escapes that do not form valid UTF-8 (a genuine Latin-1 "é") go through the
+    slower per-run path, which leaves them as they are.
+    """
+    if b"\\u00" not in raw:
+        return raw
+    protected = _OTHER_BACKSLASH.sub(rb"\\\\", raw.replace(b"\\\\", _PLACEHOLDER))
+    fixed = protected.decode("unicode_escape").encode("latin1").replace(_PLACEHOLDER, b"\\\\")
+    try:
+        fixed.decode("utf-8")
+    except UnicodeDecodeError:
+        return _ESCAPED_UTF8_RUN.sub(_unescape_run, raw)
+    return fixed
+
+
+def _dicts(value):
+    """The objects of a JSON array; anything else is left for ``schema`` to report."""
+    return [item for item in value if type(item) is dict] if type(value) is list else ()
+
+
+def intern_names(data):
+    """
+    Participant, sender and reaction actor names become one shared string object per person.
+    Anything that is not a string is left for ``schema`` to report.
+    """
+    if type(data) is not dict:
+        return data
+    for participant in _dicts(data.get("participants")):
+        name = participant.get("name")
+        if type(name) is str:
+            participant["name"] = sys.intern(name)
+    for message in _dicts(data.get("messages")):
+        sender = message.get("sender_name")
+        if type(sender) is str:
+            message["sender_name"] = sys.intern(sender)
+        for reaction in _dicts(message.get("reactions")):
+            actor = reaction.get("actor")
+            if type(actor) is str:
+                reaction["actor"] = sys.intern(actor)
+    return data
+
+
+def loads_export(raw: bytes):
+    """
+    Parses one export page (``message_N.json``) with the text already repaired; replaces ``standarize``.
+    The parser is the fastest installed one, see ``jsonbackend``.
+    """
+    return intern_names(jsonbackend.loads(fix_escaped_utf8(raw)))
+
+
 def save_messages_from_person(data, person_name, output_file):
     """
     Save all messages from a specified person to a .txt file.
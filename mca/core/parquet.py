@@ -0,0 +1,182 @@
+"""
+Parquet copy of a parsed chat for notebooks and other tools.
+
+``write_chat`` writes two datasets under one directory, both partitioned by ``year=YYYY/month=M``:
+``messages`` with a row per ``ParsedMessage`` plus the derived ``hour``, ``num_photos`` and
+``num_videos`` columns (``sender`` dictionary-encoded), and ``day_features`` with the
+``build_day_features`` vector of every day, one column per ``FEATURE_NAMES`` entry.
+
+``read_messages`` and ``read_day_features`` return the tables as the Parquet reader gives them:
+the files are memory-mapped and their pages decoded into chunked Arrow columns once, with rows
+in partition directory order (``month=10`` comes before ``month=2``), not by time.
+Nothing is copied after that: a numeric chunk such as ``table.column("timestamp_ms").chunks[0]``
+goes to numpy with ``to_numpy()`` as a view. ``get_most_active_days``, ``get_average_message_length``
+and ``day_feature_matrix`` work on the columns with Arrow compute kernels and numpy and only build
+Python objects for their (small) results, like their ``mca.analytics.sql`` counterparts do in SQLite.
+``parsed_messages`` and ``day_features`` turn the tables into the row-wise inputs of the other
+analytics and ml steps; they sort the rows and build Python objects, so they copy.
+pyarrow is an optional dependency (``pip install messenger-chat-analysis[parquet]``).
+"""
+
+from __future__ import annotations
+
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+
+from ..analytics.topk import select_top
+from .parsed_messages import ParsedMessage
+
+MESSAGES_DATASET = "messages"
+DAY_FEATURES_DATASET = "day_features"
+_PARTITIONS = ["year", "month"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The Parquet export needs pyarrow: pip install 'messenger-chat-analysis[parquet]'") from e
+    return pa, pq
+
+
+def message_columns(messages: list[ParsedMessage]) -> dict[str, list]:
+    """The ``messages`` table as lists: every ``ParsedMessage`` field, the derived columns and the partition keys."""
+    columns = {f.name: [getattr(msg, f.name) for msg in messages] for f in fields(ParsedMessage)}
+    columns["hour"] = [datetime.fromtimestamp(msg.timestamp_ms / 1000.0).hour for msg in messages]
+    columns["num_photos"] = [len(msg.photos) for msg in messages]
+    columns["num_videos"] = [len(msg.videos) for msg in messages]
+    columns["year"] = [int(msg.date[:4]) for msg in messages]
+    columns["month"] = [int(msg.date[5:7]) for msg in messages]
+    return columns
+
+
+def day_feature_columns(features_per_day: dict) -> dict[str, list]:
+    """The ``day_features`` table as lists, one row per date of ``build_day_features`` output."""
+    from ..ml.features import FEATURE_NAMES
+
+    dates = sorted(features_per_day)
+    columns = {"date": dates}
+    for i, name in enumerate(FEATURE_NAMES):
+        columns[name] = [float(features_per_day[date][i]) for date in dates]
+    columns["year"] = [int(date[:4]) for date in dates]
+    columns["month"] = [int(date[5:7]) for date in dates]
+    return columns
+
+
+def _message_schema(pa):
+    strings = pa.list_(pa.string())
+    return pa.schema(
+        [
+            ("sender", pa.dictionary(pa.int32(), pa.string())),
+            ("content", pa.string()),
+            ("timestamp_ms", pa.int64()),
+            ("date", pa.string()),
+            ("num_reactions", pa.int32()),
+            ("urls", strings),
+            ("emojis", strings),
+            ("photos", strings),
+            ("videos", strings),
+            ("is_builtin", pa.bool_()),
+            ("hour", pa.int8()),
+            ("num_photos", pa.int32()),
+            ("num_videos", pa.int32()),
+            ("year", pa.int16()),
+            ("month", pa.int8()),
+        ]
+    )
+
+
+def _day_feature_schema(pa):
+    from ..ml.features import FEATURE_NAMES
+
+    features = [(name, pa.float64()) for name in FEATURE_NAMES]
+    return pa.schema([("date", pa.string()), *features, ("year", pa.int16()), ("month", pa.int8())])
+
+
+def _write(pq, table, path: Path):
+    # a rerun replaces the months it writes instead of adding a second file next to the old one
+    pq.write_to_dataset(table, path, partition_cols=_PARTITIONS, existing_data_behavior="delete_matching")
+
+
+def write_chat(root, messages: list[ParsedMessage], features_per_day: dict) -> Path:
+    """Writes ``parse_messages`` and ``build_day_features`` output of a chat under ``root``."""
+    pa, pq = _pyarrow()
+    root = Path(root)
+    _write(pq, pa.Table.from_pydict(message_columns(messages), schema=_message_schema(pa)), root / MESSAGES_DATASET)
+    _write(
+        pq,
+        pa.Table.from_pydict(day_feature_columns(features_per_day), schema=_day_feature_schema(pa)),
+        root / DAY_FEATURES_DATASET,
+    )
+    return root
+
+
+def read_messages(root, filters=None):
+    """
+    The ``messages`` table, optionally only the partitions matching ``filters``, e.g.
+    ``[("year", "=", 2024), ("month", "=", 3)]``.
+    """
+    _, pq = _pyarrow()
+    return pq.read_table(Path(root) / MESSAGES_DATASET, filters=filters, memory_map=True)
+
+
+def read_day_features(root, filters=None):
+    _, pq = _pyarrow()
+    return pq.read_table(Path(root) / DAY_FEATURES_DATASET, filters=filters, memory_map=True)
+
+
+def parsed_messages(table) -> list[ParsedMessage]:
+    """
+    ``ParsedMessage`` per row of a ``read_messages`` table, newest first like the export, for the
+    ``mca.analytics`` functions.
+    """
+    names = [f.name for f in fields(ParsedMessage)]
+    columns = table.select(names).sort_by([("timestamp_ms", "descending")]).to_pydict()
+    return [ParsedMessage(*row) for row in zip(*(columns[name] for name in names))]
+
+
+def day_features(table) -> dict:
+    """``{date: feature vector}`` of a ``read_day_features`` table, the shape ``build_day_features`` returns."""
+    dates, matrix = day_feature_matrix(table)
+    return dict(zip(dates, matrix))
+
+
+def get_most_active_days(table, top_n=3):
+    """``(dates with their message counts, top_n)`` of a ``read_messages`` table, like ``activity.get_most_active_days``."""
+    counts = table.group_by("date").aggregate([("date", "count")])
+    # newest day first, the order in which the export lists them, so ties break the same way
+    counts = counts.sort_by([("date", "descending")])
+    days = list(zip(counts.column("date").to_pylist(), counts.column("date_count").to_pylist()))
+    return select_top(days, top_n, key=lambda day: day[1]), top_n
+
+
+def get_average_message_length(table) -> dict[str, int]:
+    """Average characters per text message and sender, like ``message_length.get_average_message_length``."""
+    import pyarrow.compute as pc
+
+    pa, _ = _pyarrow()
+    texts = table.filter(pc.and_(pc.is_valid(table.column("content")), pc.invert(table.column("is_builtin"))))
+    lengths = pa.table(
+        {"sender": pc.cast(texts.column("sender"), pa.string()), "length": pc.utf8_length(texts.column("content"))}
+    )
+    totals = lengths.group_by("sender").aggregate([("length", "sum"), ("length", "count")]).to_pydict()
+    return {
+        sender: int(total / count)
+        for sender, total, count in zip(totals["sender"], totals["length_sum"], totals["length_count"])
+    }
+
+
+def day_feature_matrix(table):
+    """
+    ``(dates, matrix)`` of a ``read_day_features`` table in date order, the ``raw_matrix`` that
+    ``normalize_features`` and ``KNN`` take, without the ``{date: vector}`` dict in between.
+    """
+    import numpy as np
+
+    from ..ml.features import FEATURE_NAMES
+
+    table = table.sort_by("date")
+    matrix = np.column_stack([table.column(name).to_numpy() for name in FEATURE_NAMES])
+    return table.column("date").to_pylist(), matrix
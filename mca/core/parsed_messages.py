@@ -5,6 +5,7 @@ from datetime import datetime
 import emoji
 
 from ..config.constants import MESSENGER_BUILTIN_MESSAGES
+from .schema import as_messages
 
 _URL_PATTERN = re.compile(r"(?:http|ftp|https):\/\/([\w_-]+(?:\.[\w_-]+)+)([\w.,@?^=%&:\/~+#-]*[\w@?^=%&\/~+#-])")
 
@@ -24,17 +25,18 @@ class ParsedMessage:
 
 
 def parse_messages(data):
+    """``ParsedMessage`` per message; ``data["messages"]`` may be export dicts or decoded ``Message`` structs."""
     parsed = []
-    for message in data["messages"]:
-        current_sender = message["sender_name"]
-        content = message.get("content")
-        num_reactions = len(message.get("reactions", []))
-        date = datetime.fromtimestamp(message["timestamp_ms"] / 1000.0).strftime("%Y-%m-%d")
+    for message in as_messages(data["messages"]):
+        current_sender = message.sender_name
+        content = message.content
+        num_reactions = len(message.reactions)
+        date = datetime.fromtimestamp(message.timestamp_ms / 1000.0).strftime("%Y-%m-%d")
 
         urls = []
         emojis_in_msg = []
-        photos = [p["uri"] for p in message.get("photos", [])]
-        videos = [v["uri"] for v in message.get("videos", [])]
+        photos = [p.uri for p in message.photos]
+        videos = [v.uri for v in message.videos]
         is_builtin = False
 
         if num_reactions and not photos and not videos:
@@ -51,9 +53,9 @@ def parse_messages(data):
 
         parsed.append(
             ParsedMessage(
-                sender=message["sender_name"],
+                sender=current_sender,
                 content=content,
-                timestamp_ms=message["timestamp_ms"],
+                timestamp_ms=message.timestamp_ms,
                 date=date,
                 num_reactions=num_reactions,
                 urls=urls,
@@ -0,0 +1,222 @@
+"""
+Typed messages.
+
+``decode_messages`` turns the message dicts of an export into ``Message`` structs (slotted
+dataclasses) in one validating pass; ``ingest.load_messages`` runs it on every page as it is read.
+Afterwards every field is a plain attribute with a default when the export leaves it out
+(``content`` is None, ``reactions``/``photos``/... are empty tuples), so analysis code needs no
+``"content" in message`` or ``message.get("reactions", [])``. Fields the schema does not know are
+ignored. A field of the wrong type is a ``SchemaError`` with its JSON path, e.g.
+``message_2.json: $.messages[41].reactions[0].actor: expected str, got int``; given a ``skipped``
+list, ``decode_messages`` leaves such messages out and records the error there instead.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+_MEDIA_FIELDS = ("photos", "videos", "gifs", "audio_files", "files")
+
+
+class SchemaError(ValueError):
+    def __init__(self, location: str, problem: str):
+        super().__init__(f"{location}: {problem}")
+        self.location = location
+        self.problem = problem
+
+
+@dataclass(slots=True)
+class Reaction:
+    reaction: str
+    actor: str
+
+
+@dataclass(slots=True)
+class Media:
+    """A photo, video, gif, audio file, file or sticker; ``uri`` is relative to the export root."""
+
+    uri: str
+    creation_timestamp: int | None = None
+
+
+@dataclass(slots=True)
+class Share:
+    link: str | None = None
+    share_text: str | None = None
+
+
+@dataclass(slots=True)
+class Message:
+    sender_name: str
+    timestamp_ms: int
+    content: str | None = None
+    reactions: tuple[Reaction, ...] = ()
+    photos: tuple[Media, ...] = ()
+    videos: tuple[Media, ...] = ()
+    gifs: tuple[Media, ...] = ()
+    audio_files: tuple[Media, ...] = ()
+    files: tuple[Media, ...] = ()
+    sticker: Media | None = None
+    share: Share | None = None
+
+    @property
+    def has_media(self) -> bool:
+        return bool(self.photos or self.videos or self.gifs)
+
+
+@dataclass(slots=True)
+class Page:
+    participants: tuple[str, ...]
+    messages: list[Message]
+    title: str = ""
+
+
+_JSON_TYPES = {dict: "object", list: "array", str: "str", int: "int", float: "float", bool: "bool"}
+
+
+def _kind(value) -> str:
+    return "null" if value is None else _JSON_TYPES.get(type(value), type(value).__name__)
+
+
+def _check(value, kind: type, location: str, key: str | None = None):
+    """``value`` if it is a ``kind``; the location of a field is only formatted when it is wrong."""
+    # type() rather than isinstance(): True is not a timestamp
+    if type(value) is not kind:
+        raise SchemaError(
+            location if key is None else f"{location}.{key}", f"expected {_JSON_TYPES[kind]}, got {_kind(value)}"
+        )
+    return value
+
+
+def _optional(obj: dict, key: str, kind: type, location: str):
+    value = obj.get(key)
+    return None if value is None else _check(value, kind, location, key)
+
+
+def _required(obj: dict, key: str, kind: type, location: str):
+    if key not in obj:
+        raise SchemaError(location, f"missing required field {key!r}")
+    return _check(obj[key], kind, location, key)
+
+
+# The decoders check the well-formed case inline and only go through _check / _required, which
+# format the location (``index`` is the position in an array), to report what is wrong: that
+# halves the time per message.
+
+
+def _at(location: str, index: int | None) -> str:
+    return location if index is None else f"{location}[{index}]"
+
+
+def _media(value, location: str, index: int | None = None) -> Media:
+    if type(value) is dict:
+        uri, created = value.get("uri"), value.get("creation_timestamp")
+        if type(uri) is str and (created is None or type(created) is int):
+            return Media(uri, created)
+    location = _at(location, index)
+    _check(value, dict, location)
+    return Media(_required(value, "uri", str, location), _optional(value, "creation_timestamp", int, location))
+
+
+def _reaction(value, location: str, index: int | None = None) -> Reaction:
+    if type(value) is dict:
+        reaction, actor = value.get("reaction"), value.get("actor")
+        if type(reaction) is str and type(actor) is str:
+            return Reaction(reaction, actor)
+    location = _at(location, index)
+    _check(value, dict, location)
+    return Reaction(_required(value, "reaction", str, location), _required(value, "actor", str, location))
+
+
+def _participant(value, location: str, index: int | None = None) -> str:
+    location = _at(location, index)
+    return _required(_check(value, dict, location), "name", str, location)
+
+
+def _array(obj: dict, key: str, item, location: str) -> tuple:
+    values = obj.get(key)
+    if not values:
+        return ()
+    if type(values) is not list:
+        _check(values, list, location, key)
+    location = f"{location}.{key}"
+    return tuple([item(value, location, i) for i, value in enumerate(values)])
+
+
+def decode_message(raw, location: str = "$") -> Message:
+    _check(raw, dict, location)
+    sender, timestamp, content = raw.get("sender_name"), raw.get("timestamp_ms"), raw.get("content")
+    if type(sender) is not str:
+        _required(raw, "sender_name", str, location)
+    if type(timestamp) is not int:
+        _required(raw, "timestamp_ms", int, location)
+    if content is not None and type(content) is not str:
+        _check(content, str, location, "content")
+    message = Message(sender, timestamp, content, _array(raw, "reactions", _reaction, location))
+    for key in _MEDIA_FIELDS:
+        if raw.get(key):
+            setattr(message, key, _array(raw, key, _media, location))
+    sticker = raw.get("sticker")
+    if sticker is not None:
+        message.sticker = _media(sticker, f"{location}.sticker")
+    share = raw.get("share")
+    if share is not None:
+        _check(share, dict, location, "share")
+        at = f"{location}.share"
+        message.share = Share(_optional(share, "link", str, at), _optional(share, "share_text", str, at))
+    return message
+
+
+def placeable(raw) -> bool:
+    """Whether a message has the sender and timestamp it needs to be part of the chat; the rest is up to decoding."""
+    return type(raw) is not dict or (raw.get("sender_name") is not None and raw.get("timestamp_ms") is not None)
+
+
+def decode_messages(
+    messages, source: str = "$.messages", skipped: list | None = None, kept: list | None = None
+) -> list[Message]:
+    """
+    ``Message`` for every dict in ``messages``, a list or any other sequence such as a
+    ``MessageWindow``; ``source`` prefixes the locations in errors. With a ``skipped`` list, a
+    message that does not decode is left out and its error (``"{location}: {problem}"``) appended
+    there; without one, the first error is raised, except for messages that are not ``placeable``,
+    which are always left out. ``kept`` gets the dicts of the decoded messages, in order.
+    """
+    if isinstance(messages, str) or not isinstance(messages, Sequence):
+        _check(messages, list, source)
+    decoded = []
+    for i, raw in enumerate(messages):
+        try:
+            decoded.append(decode_message(raw))
+        except SchemaError as e:
+            located = SchemaError(f"{source}[{i}]{e.location[1:]}", e.problem)
+            if skipped is not None:
+                skipped.append(str(located))
+            elif placeable(raw):
+                raise located from None
+            continue
+        if kept is not None:
+            kept.append(raw)
+    return decoded
+
+
+def decode_page(data, source: str = "", skipped: list | None = None, kept: list | None = None) -> Page:
+    """
+    A whole ``message_N.json``; ``source`` (usually the page name) goes in front of error and
+    ``skipped`` locations. ``skipped`` and ``kept`` work as in ``decode_messages``.
+    """
+    root = f"{source}: $" if source else "$"
+    _check(data, dict, root)
+    return Page(
+        _array(data, "participants", _participant, root),
+        decode_messages(data.get("messages", []), f"{root}.messages", skipped, kept),
+        _optional(data, "title", str, root) or "",
+    )
+
+
+def as_messages(messages) -> list[Message]:
+    """``messages`` as ``Message`` structs; a list that is already decoded is returned as is."""
+    if messages and not isinstance(messages[0], Message):
+        return decode_messages(messages)
+    return messages
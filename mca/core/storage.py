@@ -0,0 +1,276 @@
+"""
+Access to Facebook exports, extracted or still zipped.
+
+``FolderExport`` is the unpacked ``facebook-*`` folder. ``ZipExport`` reads the ZIP file(s)
+Facebook hands out without unpacking them. The central directories of all parts are indexed once
+and the index is cached next to the other caches, so later runs go from a member name straight to
+its local header. Message pages are decompressed from the archive straight into the JSON parser,
+and media is only extracted when it is actually used, i.e. for the top-N photos and videos.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from contextlib import ExitStack
+from pathlib import Path
+from typing import IO
+
+from .normalizer import loads_export
+
+MESSAGES_DIR = "your_facebook_activity/messages"
+INBOX = f"{MESSAGES_DIR}/inbox"
+# chat folders of an export; e2ee_cutover holds the chats that moved to end-to-end encryption
+THREAD_FOLDERS = ("inbox", "archived_threads", "filtered_threads", "e2ee_cutover")
+
+_EXPORT_CACHE_DIR = os.path.join("misc", "cache", "exports")
+_INDEX_VERSION = 1
+# "facebook-x-AbC-1.zip", "facebook-x-AbC_2.zip" and "facebook-x-AbC (3).zip" are parts of "facebook-x-AbC"
+_PART_SUFFIX = re.compile(r"(?:[-_]\d{1,3}| \(\d{1,3}\))$")
+_PAGE_RE = re.compile(r"message_(\d+)\.json")
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_COPY_BUFFER = 1 << 20
+
+
+class Export(ABC):
+    """What the pipeline needs from an export; member names are POSIX paths relative to its root."""
+
+    name: str
+
+    @abstractmethod
+    def names(self, directory: str) -> list[str]:
+        """Names of the files directly inside ``directory``."""
+
+    @abstractmethod
+    def open(self, name: str) -> IO[bytes]: ...
+
+    @abstractmethod
+    def stat(self, name: str) -> tuple[int, int]:
+        """``(size, mtime_ns)`` of a member, enough to tell whether it changed."""
+
+    @abstractmethod
+    def media_path(self, uri: str) -> str | None:
+        """Local path of a photo or video ``uri`` from the messages, or None if it is not in the export."""
+
+    @abstractmethod
+    def chats(self, folder: str = "inbox") -> list[str]:
+        """Chat directories in one of the ``THREAD_FOLDERS``."""
+
+    def message_pages(self, chat: str, folder: str = "inbox") -> list[str]:
+        """``message_N.json`` names of ``chat`` in page order."""
+        pages = []
+        for name in self.names(f"{MESSAGES_DIR}/{folder}/{chat}"):
+            match = _PAGE_RE.fullmatch(name.rsplit("/", 1)[-1])
+            if match:
+                pages.append((int(match.group(1)), name))
+        return [name for _, name in sorted(pages)]
+
+    def load_json(self, name: str):
+        """A message page, parsed with Facebook's escaped UTF-8 already repaired (see ``loads_export``)."""
+        with self.open(name) as f:
+            return loads_export(f.read())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class FolderExport(Export):
+    def __init__(self, root):
+        self.root = Path(root)
+        self.name = self.root.name
+
+    def names(self, directory):
+        folder = self.root / directory
+        if not folder.is_dir():
+            return []
+        return [f"{directory}/{p.name}" for p in folder.iterdir() if p.is_file()]
+
+    def open(self, name):
+        return (self.root / name).open("rb")
+
+    def stat(self, name):
+        st = (self.root / name).stat()
+        return st.st_size, st.st_mtime_ns
+
+    def media_path(self, uri):
+        path = self.root / uri
+        return str(path) if path.is_file() else None
+
+    def chats(self, folder="inbox"):
+        threads = self.root / MESSAGES_DIR / folder
+        if not threads.is_dir():
+            return []
+        return sorted(p.name for p in threads.iterdir() if p.is_dir())
+
+
+def _part_stamp(path: Path) -> list:
+    stat = path.stat()
+    return [path.name, stat.st_size, stat.st_mtime_ns]
+
+
+def build_zip_index(parts: Iterable[Path]) -> dict[str, list]:
+    """
+    ``name -> [part, header_offset, compress_type, compress_size, file_size, CRC, flag_bits]`` for
+    every file in the archive parts; the first part wins if a name appears twice.
+    """
+    members = {}
+    for part_no, part in enumerate(parts):
+        with zipfile.ZipFile(part) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or info.filename in members:
+                    continue
+                members[info.filename] = [
+                    part_no,
+                    info.header_offset,
+                    info.compress_type,
+                    info.compress_size,
+                    info.file_size,
+                    info.CRC,
+                    info.flag_bits,
+                ]
+    return members
+
+
+def load_zip_index(parts: list[Path], index_path: Path) -> dict[str, list]:
+    """``build_zip_index``, cached in ``index_path`` until a part changes size or modification time."""
+    stamps = [_part_stamp(part) for part in parts]
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") == _INDEX_VERSION and cached.get("parts") == stamps:
+            return cached["members"]
+    except (OSError, ValueError):
+        pass
+
+    members = build_zip_index(parts)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    partial = index_path.with_name(index_path.name + ".part")
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump({"version": _INDEX_VERSION, "parts": stamps, "members": members}, f, ensure_ascii=False)
+    os.replace(partial, index_path)
+    return members
+
+
+class ZipExport(Export):
+    def __init__(self, parts, cache_dir=_EXPORT_CACHE_DIR):
+        self.parts = [Path(part) for part in parts]
+        if not self.parts:
+            raise ValueError("ZipExport needs at least one archive")
+        self.name = _PART_SUFFIX.sub("", self.parts[0].stem)
+        self.cache_dir = Path(cache_dir)
+        self._members = load_zip_index(self.parts, self.cache_dir / f"{self.name}.index.json")
+        self._mtimes = [part.stat().st_mtime_ns for part in self.parts]
+        # some archives wrap everything in one top-level folder
+        messages_name = next((name for name in self._members if f"{MESSAGES_DIR}/" in name), "")
+        self._root = messages_name[: messages_name.find(MESSAGES_DIR)] if messages_name else ""
+        self._dirs: dict[str, list[str]] | None = None
+
+    def _listing(self) -> dict[str, list[str]]:
+        if self._dirs is None:
+            self._dirs = {}
+            for member in self._members:
+                if member.startswith(self._root):
+                    name = member[len(self._root) :]
+                    self._dirs.setdefault(name.rpartition("/")[0], []).append(name)
+        return self._dirs
+
+    def names(self, directory):
+        return list(self._listing().get(directory, []))
+
+    def chats(self, folder="inbox"):
+        prefix = f"{MESSAGES_DIR}/{folder}/"
+        return sorted(
+            {
+                d[len(prefix) :].split("/", 1)[0]
+                for d in self._listing()
+                if d.startswith(prefix) and len(d) > len(prefix)
+            }
+        )
+
+    def stat(self, name):
+        entry = self._members.get(self._root + name)
+        if entry is None:
+            raise FileNotFoundError(f"{name} is not in {self.name}")
+        return entry[4], self._mtimes[entry[0]]
+
+    def open(self, name):
+        """Reads a member straight from its local header, without parsing the central directory again."""
+        member = self._root + name
+        try:
+            part_no, offset, compress_type, compress_size, file_size, crc, flag_bits = self._members[member]
+        except KeyError:
+            raise FileNotFoundError(f"{name} is not in {self.name}") from None
+
+        info = zipfile.ZipInfo(member)
+        info.compress_type = compress_type
+        info.compress_size = compress_size
+        info.file_size = file_size
+        info.CRC = crc
+        info.flag_bits = flag_bits
+
+        with ExitStack() as stack:
+            f = stack.enter_context(open(self.parts[part_no], "rb"))
+            f.seek(offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            if header[0] != _LOCAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile(f"Bad local header for {member} in {self.parts[part_no]}, delete the index")
+            f.seek(header[-2] + header[-1], os.SEEK_CUR)  # file name and extra field
+            member_file = zipfile.ZipExtFile(f, "rb", info, close_fileobj=True)
+            stack.pop_all()  # from here on the ZipExtFile owns the handle and closes it
+        return member_file
+
+    def media_path(self, uri):
+        """Extracts ``uri`` into the cache on first use and returns the extracted file."""
+        entry = self._members.get(self._root + uri)
+        if entry is None:
+            return None
+        target = self.cache_dir / self.name / uri
+        if target.is_file() and target.stat().st_size == entry[4]:
+            return str(target)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, partial = tempfile.mkstemp(suffix=".part", dir=target.parent)
+        try:
+            with self.open(uri) as src, os.fdopen(fd, "wb") as dst:
+                shutil.copyfileobj(src, dst, _COPY_BUFFER)
+            os.replace(partial, target)
+        except BaseException:
+            os.remove(partial)
+            raise
+        return str(target)
+
+
+def open_export(location) -> Export:
+    """``location`` as an ``Export``: a ``.zip`` archive, an extracted folder, or an ``Export`` as is."""
+    if isinstance(location, Export):
+        return location
+    path = Path(location)
+    if path.suffix.lower() == ".zip":
+        return ZipExport([path])
+    return FolderExport(path)
+
+
+def find_exports(directory=".", prefix="facebook") -> list[Export]:
+    """
+    Exports in ``directory``: extracted ``facebook*`` folders, then ``facebook*.zip`` archives, with the
+    numbered parts of a split download grouped into one ``ZipExport``.
+    """
+    directory = Path(directory)
+    folders = []
+    archives: dict[str, list[Path]] = {}
+    for entry in sorted(directory.iterdir()):
+        if not entry.name.startswith(prefix):
+            continue
+        if entry.is_dir():
+            folders.append(FolderExport(entry))
+        elif entry.suffix.lower() == ".zip":
+            archives.setdefault(_PART_SUFFIX.sub("", entry.stem), []).append(entry)
+    return folders + [ZipExport(parts) for parts in archives.values()]
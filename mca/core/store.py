@@ -0,0 +1,154 @@
+"""
+SQLite copy of a chat for repeated and ad-hoc querying.
+
+``import_chat`` loads a chat into one database file per chat (``misc/cache/stores/<export>/<folder>/
+<chat>.sqlite``) with ``messages``, ``reactions``, ``media`` and ``participants`` tables, indexes on
+``timestamp_ms``, ``(sender, timestamp_ms)`` and ``date`` and an FTS5 index over the message text.
+Every ``message_N.json`` is imported in its own transaction and remembered with its size and
+modification time, so running the import again only re-reads the pages that changed (and drops
+the messages of pages that are gone). ``mca.analytics.sql`` runs the analytics against it.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from ..config.constants import MESSENGER_BUILTIN_MESSAGES
+from .schema import decode_page
+from .storage import Export
+
+_STORE_DIR = os.path.join("misc", "cache", "stores")
+_STORE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE pages (
+    page TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE participants (name TEXT PRIMARY KEY);
+CREATE TABLE messages (
+    id INTEGER PRIMARY KEY,
+    page TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    content TEXT,
+    is_builtin INTEGER NOT NULL,
+    num_reactions INTEGER NOT NULL,
+    share_link TEXT
+);
+CREATE INDEX messages_timestamp ON messages (timestamp_ms);
+CREATE INDEX messages_sender_timestamp ON messages (sender, timestamp_ms);
+CREATE INDEX messages_date ON messages (date);
+CREATE INDEX messages_page ON messages (page);
+CREATE TABLE reactions (
+    message_id INTEGER NOT NULL REFERENCES messages (id) ON DELETE CASCADE,
+    actor TEXT NOT NULL,
+    reaction TEXT NOT NULL
+);
+CREATE INDEX reactions_message ON reactions (message_id);
+CREATE TABLE media (
+    message_id INTEGER NOT NULL REFERENCES messages (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    creation_timestamp INTEGER
+);
+CREATE INDEX media_message ON media (message_id);
+CREATE VIRTUAL TABLE messages_fts USING fts5 (content, content = 'messages', content_rowid = 'id');
+"""
+
+_INSERT_MESSAGE = "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_MEDIA_KINDS = ("photos", "videos", "gifs", "audio_files", "files")
+# the full-text index follows a page's messages in one statement, far cheaper than a trigger per row
+_FTS_DELETE_PAGE = (
+    "INSERT INTO messages_fts (messages_fts, rowid, content)"
+    " SELECT 'delete', id, content FROM messages WHERE page = ? AND content IS NOT NULL"
+)
+_FTS_INSERT_PAGE = (
+    "INSERT INTO messages_fts (rowid, content) SELECT id, content FROM messages WHERE page = ? AND content IS NOT NULL"
+)
+
+
+def store_path(export: Export, chat: str, folder: str = "inbox", store_dir=_STORE_DIR) -> Path:
+    return Path(store_dir) / export.name / folder / f"{chat}.sqlite"
+
+
+def open_store(path) -> sqlite3.Connection:
+    """Connection to the store at ``path``, created on first use; a store of an older layout is rebuilt."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != _STORE_VERSION:
+        conn.close()
+        path.unlink()
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.executescript(_SCHEMA + f"PRAGMA user_version = {_STORE_VERSION};")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _delete_page(conn: sqlite3.Connection, page: str):
+    conn.execute(_FTS_DELETE_PAGE, (page,))
+    conn.execute("DELETE FROM messages WHERE page = ?", (page,))
+
+
+def _is_builtin(content: str | None) -> bool:
+    return bool(content) and any(keyword in content for keyword in MESSENGER_BUILTIN_MESSAGES)
+
+
+def _import_page(conn: sqlite3.Connection, export: Export, page: str, stamp: tuple[int, int], skipped=None):
+    decoded = decode_page(export.load_json(page), source=page, skipped=skipped)
+    next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM messages").fetchone()[0]
+    messages, reactions, media = [], [], []
+    for message_id, message in enumerate(decoded.messages, next_id):
+        messages.append(
+            (
+                message_id,
+                page,
+                message.sender_name,
+                message.timestamp_ms,
+                datetime.fromtimestamp(message.timestamp_ms / 1000.0).strftime("%Y-%m-%d"),
+                message.content,
+                _is_builtin(message.content),
+                len(message.reactions),
+                message.share.link if message.share else None,
+            )
+        )
+        reactions.extend((message_id, r.actor, r.reaction) for r in message.reactions)
+        for kind in _MEDIA_KINDS:
+            media.extend((message_id, kind, m.uri, m.creation_timestamp) for m in getattr(message, kind))
+
+    with conn:
+        _delete_page(conn, page)
+        conn.executemany(_INSERT_MESSAGE, messages)
+        conn.execute(_FTS_INSERT_PAGE, (page,))
+        conn.executemany("INSERT INTO reactions VALUES (?, ?, ?)", reactions)
+        conn.executemany("INSERT INTO media VALUES (?, ?, ?, ?)", media)
+        conn.executemany("INSERT OR IGNORE INTO participants VALUES (?)", [(name,) for name in decoded.participants])
+        conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (page, *stamp))
+
+
+def import_chat(conn: sqlite3.Connection, export: Export, chat: str, folder: str = "inbox", skipped=None) -> int:
+    """
+    Brings the store up to date with the pages of ``chat`` and returns how many pages were
+    (re)imported: 0 when nothing changed since the last import. Messages that do not decode
+    (no sender or timestamp, a field of the wrong type) are not imported; their errors go to ``skipped``.
+    """
+    pages = {page: export.stat(page) for page in export.message_pages(chat, folder)}
+    stored = {row["page"]: (row["size"], row["mtime_ns"]) for row in conn.execute("SELECT * FROM pages")}
+
+    for page in stored.keys() - pages.keys():
+        with conn:
+            _delete_page(conn, page)
+            conn.execute("DELETE FROM pages WHERE page = ?", (page,))
+
+    changed = [page for page, stamp in pages.items() if stored.get(page) != stamp]
+    for page in changed:
+        _import_page(conn, export, page, pages[page], skipped)
+    return len(changed)
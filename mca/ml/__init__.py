@@ -1,8 +1,15 @@
-from .features import (
-    FEATURE_NAMES,
-    build_day_features,
-    export_labels,
-    normalize_features,
-    save_training_data,
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        ".features": [
+            "FEATURE_NAMES",
+            "build_day_features",
+            "export_labels",
+            "normalize_features",
+            "save_training_data",
+        ],
+        ".label_days": ["KNN", "display_label_calendar", "label_days"],
+    },
 )
-from .label_days import KNN, display_label_calendar, label_days
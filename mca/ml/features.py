@@ -6,6 +6,7 @@ import numpy as np
 import pandas as pd
 
 from ..config.constants import MESSENGER_BUILTIN_MESSAGES
+from ..core.schema import as_messages
 
 FEATURE_NAMES = [
     "msg_count",
@@ -26,8 +27,8 @@ def build_day_features(data) -> dict[str, np.ndarray]:
     (8,) with features in the order defined by FEATURE_NAMES.
     """
     days: dict[str, list] = {}
-    for message in data["messages"]:
-        date = datetime.datetime.fromtimestamp(message["timestamp_ms"] / 1000.0).strftime("%Y-%m-%d")
+    for message in as_messages(data["messages"]):
+        date = datetime.datetime.fromtimestamp(message.timestamp_ms / 1000.0).strftime("%Y-%m-%d")
         days.setdefault(date, []).append(message)
 
     day_features: dict[str, np.ndarray] = {}
@@ -42,28 +43,27 @@ def build_day_features(data) -> dict[str, np.ndarray]:
         evening_msgs = 0  # hours 18-23
 
         for message in messages:
-            if "content" in message and any(keyword in message["content"] for keyword in MESSENGER_BUILTIN_MESSAGES):
+            content = message.content
+            if content is not None and any(keyword in content for keyword in MESSENGER_BUILTIN_MESSAGES):
                 continue
 
             msg_count += 1
-            unique_senders.add(message["sender_name"])
+            unique_senders.add(message.sender_name)
 
-            hour = datetime.datetime.fromtimestamp(message["timestamp_ms"] / 1000.0).hour
+            hour = datetime.datetime.fromtimestamp(message.timestamp_ms / 1000.0).hour
             if hour < 6:
                 night_msgs += 1
             elif hour >= 18:
                 evening_msgs += 1
 
-            if "content" in message:
-                content = message["content"]
+            if content is not None:
                 lengths.append(len(content))
                 emoji_count += sum(1 for char in content if char in emoji.EMOJI_DATA)
 
-            if any(key in message for key in ("photos", "videos", "gifs")):
+            if message.has_media:
                 media_count += 1
 
-            if "reactions" in message:
-                reaction_count += len(message["reactions"])
+            reaction_count += len(message.reactions)
 
         avg_msg_length = float(np.mean(lengths)) if lengths else 0.0
         night_ratio = night_msgs / msg_count if msg_count > 0 else 0.0
@@ -19,6 +19,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 
 from ..config.constants import MESSENGER_BUILTIN_MESSAGES
+from ..core.schema import as_messages
 from .features import FEATURE_NAMES, build_day_features, export_labels, normalize_features, save_training_data
 
 
@@ -120,8 +121,8 @@ def browse_cluster_days(
 ) -> None:
     """Write the most representative conversations per cluster to a text file."""
     messages_by_date: dict[str, list] = {}
-    for msg in data["messages"]:
-        date = datetime.datetime.fromtimestamp(msg["timestamp_ms"] / 1000.0).strftime("%Y-%m-%d")
+    for msg in as_messages(data["messages"]):
+        date = datetime.datetime.fromtimestamp(msg.timestamp_ms / 1000.0).strftime("%Y-%m-%d")
         messages_by_date.setdefault(date, []).append(msg)
 
     date_arr = np.array(dates)
@@ -147,23 +148,23 @@ def browse_cluster_days(
 
         for day_date in sample_dates:
             msgs = messages_by_date.get(day_date, [])
-            msgs = sorted(msgs, key=lambda m: m["timestamp_ms"])
+            msgs = sorted(msgs, key=lambda m: m.timestamp_ms)
 
             lines.append(f"\n  -- {day_date} ({len(msgs)} messages) --")
             for msg in msgs:
-                if "content" in msg and any(kw in msg["content"] for kw in MESSENGER_BUILTIN_MESSAGES):
+                if msg.content is not None and any(kw in msg.content for kw in MESSENGER_BUILTIN_MESSAGES):
                     continue
 
-                time_str = datetime.datetime.fromtimestamp(msg["timestamp_ms"] / 1000.0).strftime("%H:%M")
-                sender = msg["sender_name"]
+                time_str = datetime.datetime.fromtimestamp(msg.timestamp_ms / 1000.0).strftime("%H:%M")
+                sender = msg.sender_name
 
-                if "content" in msg:
-                    content = msg["content"]
-                elif "photos" in msg:
-                    content = f"[{len(msg['photos'])} photo(s)]"
-                elif "videos" in msg:
-                    content = f"[{len(msg['videos'])} video(s)]"
-                elif "gifs" in msg:
+                if msg.content is not None:
+                    content = msg.content
+                elif msg.photos:
+                    content = f"[{len(msg.photos)} photo(s)]"
+                elif msg.videos:
+                    content = f"[{len(msg.videos)} video(s)]"
+                elif msg.gifs:
                     content = "[gif]"
                 else:
                     content = "[attachment]"
@@ -192,6 +193,7 @@ if __name__ == "__main__":
         encoding="UTF-8",
     ) as f:
         data = json.load(f)
+    data["messages"] = as_messages(data["messages"])  # decoded once for both passes below
 
     features_per_day = build_day_features(data)
     dates = list(features_per_day.keys())
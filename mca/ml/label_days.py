@@ -1,14 +1,15 @@
-import datetime
 import os
 from collections import Counter
 from pathlib import Path
 
 import matplotlib.patches as mpatches
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+from matplotlib import colormaps
+from matplotlib.colors import ListedColormap
 
 from ..config import constants
+from ..viz.render import export_figure, new_figure
 from .features import (
     build_day_features,
     normalize_features,
@@ -79,60 +80,62 @@ def label_days(data):
     return dict(zip(dates, predictions.tolist()))
 
 
-def display_label_calendar(day_labels, debug=False):
-    if not day_labels:
-        return
-
+def label_calendar_figure(day_labels, show=False):
     unique_labels = sorted(set(day_labels.values()), key=str)
-    palette = plt.cm.Set2.colors
+    palette = colormaps["Set2"].colors
     label_color = {lbl: palette[i % len(palette)] for i, lbl in enumerate(unique_labels)}
+    label_index = {lbl: i for i, lbl in enumerate(unique_labels)}
 
-    dates_parsed = sorted(datetime.date.fromisoformat(d) for d in day_labels)
-    start, end = dates_parsed[0], dates_parsed[-1]
-    grid_start = start - datetime.timedelta(days=start.weekday())
-    n_weeks = ((end - grid_start).days // 7) + 1
+    dates = np.array(list(day_labels), dtype="datetime64[D]")
+    labels = np.fromiter((label_index[lbl] for lbl in day_labels.values()), dtype=np.int64, count=len(day_labels))
+    start = dates.min()
+    # 1970-01-01 was a Thursday, so (days + 3) % 7 is the weekday with Monday = 0
+    grid_start = start - (start.astype(np.int64) + 3) % 7
+    offsets = (dates - grid_start).astype(np.int64)
+    n_weeks = int(offsets.max()) // 7 + 1
 
-    _, ax = plt.subplots(figsize=(max(14, n_weeks * 0.6 + 3), 4.5))
-    ax.set_xlim(-1.8, n_weeks + 0.5)
-    ax.set_ylim(-1, 9)
+    # one cell per day: rows are weekdays, columns weeks, -1 marks days without a label
+    grid = np.full((7, n_weeks), -1, dtype=np.int64)
+    grid[offsets % 7, offsets // 7] = labels
+
+    fig = new_figure(figsize=(max(14, n_weeks * 0.6 + 3), 4.5), show=show)
+    ax = fig.subplots()
 
     DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
     EMPTY_COLOR = "#d0d0d0"
 
-    for w in range(n_weeks):
-        for d in range(7):
-            date = grid_start + datetime.timedelta(weeks=w, days=d)
-            color = label_color.get(day_labels.get(date.isoformat()), EMPTY_COLOR)
-            ax.add_patch(
-                mpatches.FancyBboxPatch(
-                    (w + 0.06, 6 - d + 0.06),
-                    0.88,
-                    0.88,
-                    boxstyle="round,pad=0.05",
-                    facecolor=color,
-                    edgecolor="white",
-                    linewidth=1.0,
-                )
-            )
+    cmap = ListedColormap([EMPTY_COLOR] + [label_color[lbl] for lbl in unique_labels])
+    ax.imshow(
+        grid + 1,
+        cmap=cmap,
+        vmin=0,
+        vmax=len(unique_labels),
+        extent=(0, n_weeks, 0, 7),
+        origin="upper",
+        aspect="auto",
+        interpolation="nearest",
+    )
+    # white gutters between the cells
+    ax.vlines(np.arange(n_weeks + 1), 0, 7, colors="white", linewidth=2)
+    ax.hlines(np.arange(8), 0, n_weeks, colors="white", linewidth=2)
+    ax.set_xlim(-1.8, n_weeks + 0.5)
+    ax.set_ylim(-1, 9)
 
     for d, name in enumerate(DAY_NAMES):
         ax.text(-0.2, 6 - d + 0.5, name, va="center", ha="right", fontsize=9)
 
-    seen_months: set = set()
-    for w in range(n_weeks):
-        week_date = grid_start + datetime.timedelta(weeks=w)
-        key = (week_date.year, week_date.month)
-        if key not in seen_months:
-            seen_months.add(key)
-            ax.text(
-                w + 0.5,
-                7.15,
-                week_date.strftime("%b %Y"),
-                ha="left",
-                va="bottom",
-                fontsize=9,
-                fontweight="bold",
-            )
+    week_starts = grid_start + 7 * np.arange(n_weeks)
+    _, first_weeks = np.unique(week_starts.astype("datetime64[M]"), return_index=True)
+    for w in first_weeks:
+        ax.text(
+            w + 0.5,
+            7.15,
+            week_starts[w].item().strftime("%b %Y"),
+            ha="left",
+            va="bottom",
+            fontsize=9,
+            fontweight="bold",
+        )
 
     ax.axis("off")
     ax.legend(
@@ -142,10 +145,13 @@ def display_label_calendar(day_labels, debug=False):
         framealpha=0.9,
     )
     ax.set_title("Day Label Calendar", fontsize=13, pad=6)
-    plt.tight_layout()
+    fig.tight_layout()
+    return fig
+
+
+def display_label_calendar(day_labels, debug=False, exporter=None):
+    if not day_labels:
+        return
+    fig = label_calendar_figure(day_labels, show=debug)
     save_path = Path(constants.results_dir()) / "day_label_calendar.png"
-    save_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(save_path, dpi=150, bbox_inches="tight")
-    if debug:
-        plt.show()
-    plt.close()
+    export_figure(fig, save_path, exporter=exporter, debug=debug, dpi=150, bbox_inches="tight")
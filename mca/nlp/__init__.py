@@ -1 +1,8 @@
-from .digest import build_group_chat_digest, save_group_chat_digest
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        ".digest": ["build_group_chat_digest", "save_group_chat_digest"],
+    },
+)
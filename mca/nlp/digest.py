@@ -6,8 +6,13 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+from scipy import sparse
+
 from ..config import constants
-from ..config.constants import MESSENGER_BUILTIN_MESSAGES, STOPWORDS_POLISH
+from ..config.constants import MESSENGER_BUILTIN_MESSAGES, load_nltk, stopwords_polish
+from .keywords import KeywordIndex
+from .threads import adaptive_gap_min, iter_chronological, segment_threads
 
 
 # ----------------------------
@@ -17,12 +22,17 @@ from ..config.constants import MESSENGER_BUILTIN_MESSAGES, STOPWORDS_POLISH
 class DigestConfig:
     # Thread segmentation
     time_gap_min: int = 60  # gap (minutes) => new thread
+    adaptive_gap: bool = False  # derive the gap from this chat's inter-message times instead
+    gap_quantile: float = 0.95
+    gap_bounds_min: Tuple[int, int] = (15, 240)
     min_thread_messages: int = 8  # ignore smaller threads
     max_threads: int = 8  # how many threads to output
 
     # Topic keywords
     top_keywords: int = 6
     min_word_len: int = 3
+    keyword_scoring: str = "bm25"  # "tf" | "tfidf" | "bm25"
+    keyword_df_path: Optional[str] = None  # JSON with stem document frequencies of earlier months
 
     # NEW: topic-related sentences (ranked)
     topic_sentences_max: int = 6
@@ -129,11 +139,10 @@ def _is_builtin_message(content: str) -> bool:
 
 def _iter_content_messages(data: Dict) -> List[Dict]:
     """
-    Returns sorted list: {ts, author, text} only for real messages (filters system/builtin).
+    Returns chronological list: {ts, author, text} only for real messages (filters system/builtin).
     """
-    msgs = sorted(data.get("messages", []), key=lambda m: m.get("timestamp_ms", 0))
     out = []
-    for m in msgs:
+    for m in iter_chronological(data.get("messages", [])):
         txt = m.get("content")
         if not txt:
             continue
@@ -192,23 +201,6 @@ def _mention_target(
     return None
 
 
-def _segment_threads(messages: List[Dict], time_gap_min: int) -> List[List[Dict]]:
-    if not messages:
-        return []
-    threads: List[List[Dict]] = []
-    cur = [messages[0]]
-    for prev, nxt in zip(messages, messages[1:]):
-        gap_min = (nxt["ts"] - prev["ts"]) / 60000.0
-        if gap_min >= time_gap_min:
-            threads.append(cur)
-            cur = [nxt]
-        else:
-            cur.append(nxt)
-    if cur:
-        threads.append(cur)
-    return threads
-
-
 # ----------------------------
 # Stemming (supports pystempel variants)
 # ----------------------------
@@ -262,9 +254,7 @@ def split_sentences_pl(text: str) -> List[str]:
     if not text:
         return []
     try:
-        from nltk.tokenize import sent_tokenize
-
-        sents = sent_tokenize(text, language="polish")
+        sents = load_nltk().sent_tokenize(text, language="polish")
         sents = [s.strip() for s in sents if s and s.strip()]
         return sents if sents else [text]
     except Exception:
@@ -275,31 +265,53 @@ def split_sentences_pl(text: str) -> List[str]:
 # ----------------------------
 # Topic keywords + topic sentences
 # ----------------------------
-def _keywords_for_thread(thread: List[Dict], cfg: DigestConfig, stemmer_kind: str, stemmer_obj) -> List[str]:
-    freq: Dict[str, int] = {}
+def _thread_stems(thread: List[Dict], cfg: DigestConfig, stemmer_kind: str, stemmer_obj) -> List[str]:
+    stop_words = stopwords_polish()
+    stems: List[str] = []
     for m in thread:
         for w in _WORD_RE.findall(m["text"]):
             w_low = w.lower()
             if len(w_low) < cfg.min_word_len:
                 continue
-            if w_low in STOPWORDS_POLISH:
+            if w_low in stop_words:
                 continue
             s = _stem(stemmer_kind, stemmer_obj, w_low)
-            if s in STOPWORDS_POLISH:
+            if s in stop_words:
                 continue
-            freq[s] = freq.get(s, 0) + 1
-    return [w for w, _ in sorted(freq.items(), key=lambda x: x[1], reverse=True)[: cfg.top_keywords]]
+            stems.append(s)
+    return stems
+
+
+def _build_keyword_index(threads: List[List[Dict]], cfg: DigestConfig, stemmer_kind: str, stemmer_obj) -> KeywordIndex:
+    """
+    Every thread (also the ones too small for the digest) is a document, so stems that
+    show up in all threads get a low IDF and stop dominating the keywords.
+    """
+    index = KeywordIndex(scoring=cfg.keyword_scoring)
+    index.fit([_thread_stems(th, cfg, stemmer_kind, stemmer_obj) for th in threads])
+    if cfg.keyword_df_path:
+        period = datetime.fromtimestamp(threads[0][0]["ts"] / 1000.0).strftime("%Y-%m")
+        index.load_prior(cfg.keyword_df_path, exclude_period=period)
+        index.save_period(cfg.keyword_df_path, period)
+    return index
 
 
 def _topic_sentence_candidates(
     thread: List[Dict],
-    keywords: List[str],
     cfg: DigestConfig,
     stemmer_kind: str,
     stemmer_obj,
-) -> List[Dict]:
-    candidates: List[Dict] = []
-    kw_set = set(keywords)
+) -> Tuple[List[Tuple[str, str]], sparse.csr_matrix, Dict[str, int]]:
+    """
+    Returns quotable (author, sentence) pairs, each only once, with their binary sentence x stem
+    incidence matrix and the stem -> column mapping.
+    """
+    stop_words = stopwords_polish()
+    sentences: List[Tuple[str, str]] = []
+    seen = set()
+    vocab: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
 
     for msg in thread:
         author = msg["author"]
@@ -307,35 +319,27 @@ def _topic_sentence_candidates(
             sent = sent.strip()
             if len(sent) < cfg.topic_sentence_min_chars:
                 continue
+            # a repeated sentence would only take up room in the top-up prune below
+            if (author, sent) in seen:
+                continue
+            seen.add((author, sent))
 
-            stems = set()
             for w in _WORD_RE.findall(sent):
                 w_low = w.lower()
                 if len(w_low) < cfg.min_word_len:
                     continue
-                if w_low in STOPWORDS_POLISH:
+                if w_low in stop_words:
                     continue
-                stems.add(_stem(stemmer_kind, stemmer_obj, w_low))
-
-            matched = sorted([kw for kw in kw_set if kw in stems])
-            if not matched:
-                continue
+                stem = _stem(stemmer_kind, stemmer_obj, w_low)
+                indices.append(vocab.setdefault(stem, len(vocab)))
+            indptr.append(len(indices))
+            sentences.append((author, sent))
 
-            score = (3.0 * len(matched)) + min(len(sent) / 120.0, 1.0)
-            candidates.append(
-                {
-                    "author": author,
-                    "sentence": sent,
-                    "matched_keywords": matched,
-                    "score": score,
-                }
-            )
-
-    candidates.sort(
-        key=lambda x: (x["score"], len(x["matched_keywords"]), len(x["sentence"])),
-        reverse=True,
-    )
-    return candidates
+    data = np.ones(len(indices), dtype=np.float64)
+    incidence = sparse.csr_matrix((data, indices, indptr), shape=(len(sentences), len(vocab)))
+    incidence.sum_duplicates()
+    incidence.data[:] = 1.0
+    return sentences, incidence, vocab
 
 
 def _select_topic_sentences_and_filter_keywords(
@@ -345,34 +349,73 @@ def _select_topic_sentences_and_filter_keywords(
     stemmer_kind: str,
     stemmer_obj,
 ) -> Tuple[List[str], List[Dict]]:
-    candidates = _topic_sentence_candidates(thread, keywords, cfg, stemmer_kind, stemmer_obj)
-
-    best_for_kw: Dict[str, Dict] = {}
-    for cand in candidates:
-        for kw in cand["matched_keywords"]:
-            if kw not in best_for_kw:
-                best_for_kw[kw] = cand
+    """
+    Picks the best sentence for every keyword, then tops up with the best remaining ones.
+    Keywords without any matching sentence are dropped.
 
-    filtered_keywords = [kw for kw in keywords if kw in best_for_kw]
+    Ranking: score = 3 * matched keywords + min(len / 120, 1), ties broken by matched count,
+    sentence length and thread order.
+    """
+    sentences, incidence, vocab = _topic_sentence_candidates(thread, cfg, stemmer_kind, stemmer_obj)
+    if not sentences:
+        return [], []
+
+    kw_cols = {kw: vocab[kw] for kw in keywords if kw in vocab}
+    weights = np.zeros(incidence.shape[1], dtype=np.float64)
+    weights[list(kw_cols.values())] = 1.0
+
+    matched = incidence @ weights
+    lengths = np.fromiter((len(sent) for _, sent in sentences), dtype=np.float64, count=len(sentences))
+    score = 3.0 * matched + np.minimum(lengths / 120.0, 1.0)
+
+    def ranked(rows: np.ndarray) -> np.ndarray:
+        return rows[np.lexsort((rows, -lengths[rows], -matched[rows], -score[rows]))]
+
+    def as_candidate(row: int) -> Dict:
+        author, sent = sentences[row]
+        stems = incidence.indices[incidence.indptr[row] : incidence.indptr[row + 1]]
+        return {
+            "author": author,
+            "sentence": sent,
+            "matched_keywords": sorted(kw for kw, col in kw_cols.items() if col in stems),
+            "score": float(score[row]),
+        }
+
+    by_stem = incidence.tocsc()
+    filtered_keywords: List[str] = []
+    best_rows: List[int] = []
+    for kw in keywords:
+        col = kw_cols.get(kw)
+        if col is None:
+            continue
+        rows = by_stem.indices[by_stem.indptr[col] : by_stem.indptr[col + 1]]
+        if rows.size == 0:
+            continue
+        filtered_keywords.append(kw)
+        best_rows.append(int(ranked(rows)[0]))
 
     selected: List[Dict] = []
     seen_sentences = set()
 
-    for kw in filtered_keywords:
-        cand = best_for_kw[kw]
-        key = (cand["author"], cand["sentence"])
-        if key not in seen_sentences:
-            selected.append(cand)
-            seen_sentences.add(key)
+    for row in best_rows:
+        if sentences[row] not in seen_sentences:
+            selected.append(as_candidate(row))
+            seen_sentences.add(sentences[row])
+
+    # Only the top-k candidates (plus anything tied with the k-th) can be needed for the top-up.
+    rows = np.flatnonzero(matched > 0)
+    k = cfg.topic_sentences_max + len(selected)
+    if rows.size > k > 0:
+        top = np.argpartition(-score[rows], k - 1)[:k]
+        rows = rows[score[rows] >= score[rows[top]].min()]
 
-    for cand in candidates:
+    for row in ranked(rows):
         if len(selected) >= cfg.topic_sentences_max:
             break
-        key = (cand["author"], cand["sentence"])
-        if key in seen_sentences:
+        if sentences[row] in seen_sentences:
             continue
-        selected.append(cand)
-        seen_sentences.add(key)
+        selected.append(as_candidate(int(row)))
+        seen_sentences.add(sentences[row])
 
     return filtered_keywords, selected
 
@@ -459,14 +502,20 @@ def build_group_chat_digest(data: Dict, cfg: Optional[DigestConfig] = None) -> s
     name_variants = _build_name_variants(data)
     stemmer_kind, stemmer_obj = _make_stemmer()
 
-    threads = _segment_threads(messages, cfg.time_gap_min)
+    time_gap_min = cfg.time_gap_min
+    if cfg.adaptive_gap:
+        time_gap_min = adaptive_gap_min(
+            [m["ts"] for m in messages], cfg.gap_quantile, cfg.gap_bounds_min, default=cfg.time_gap_min
+        )
+    threads = segment_threads(messages, time_gap_min)
+    keyword_index = _build_keyword_index(threads, cfg, stemmer_kind, stemmer_obj)
 
     enriched = []
-    for th in threads:
+    for doc_id, th in enumerate(threads):
         if len(th) < cfg.min_thread_messages:
             continue
 
-        keywords = _keywords_for_thread(th, cfg, stemmer_kind, stemmer_obj)
+        keywords = keyword_index.top_terms(doc_id, cfg.top_keywords)
 
         keywords, topic_sentences = _select_topic_sentences_and_filter_keywords(
             th, keywords, cfg, stemmer_kind, stemmer_obj
@@ -0,0 +1,157 @@
+"""
+Corpus-level keyword scoring for chat threads.
+
+Each thread is one document of stems. The index keeps a sparse document x term
+count matrix plus document frequencies, so keywords are ranked against the whole
+chat (and optionally previously analysed months) instead of raw in-thread counts.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+SCORINGS = ("tf", "tfidf", "bm25")
+
+
+class KeywordIndex:
+    def __init__(self, scoring: str = "bm25", k1: float = 1.5, b: float = 0.75):
+        if scoring not in SCORINGS:
+            raise ValueError(f"Unknown keyword scoring {scoring!r}, expected one of {SCORINGS}")
+        self.scoring = scoring
+        self.k1 = k1
+        self.b = b
+        self.vocab: dict[str, int] = {}
+        self.terms: list[str] = []
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self._prior_df: dict[str, int] = {}
+        self._prior_docs = 0
+        self._scores: sparse.csr_matrix | None = None
+
+    # ----------------------------
+    # Building
+    # ----------------------------
+    def fit(self, docs: Sequence[Sequence[str]]) -> KeywordIndex:
+        """Build the document x term count matrix. Term ids follow first appearance."""
+        indptr = [0]
+        indices: list[int] = []
+        for doc in docs:
+            for term in doc:
+                idx = self.vocab.get(term)
+                if idx is None:
+                    idx = self.vocab[term] = len(self.terms)
+                    self.terms.append(term)
+                indices.append(idx)
+            indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.float64)
+        m = sparse.csr_matrix((data, indices, indptr), shape=(len(docs), len(self.terms)))
+        m.sum_duplicates()
+        self.matrix = m
+        self._scores = None
+        return self
+
+    @property
+    def n_docs(self) -> int:
+        return self.matrix.shape[0] + self._prior_docs
+
+    def document_frequencies(self) -> np.ndarray:
+        df = np.bincount(self.matrix.indices, minlength=len(self.terms)).astype(np.float64)
+        for term, count in self._prior_df.items():
+            idx = self.vocab.get(term)
+            if idx is not None:
+                df[idx] += count
+        return df
+
+    def idf(self) -> np.ndarray:
+        n = float(self.n_docs)
+        df = self.document_frequencies()
+        if self.scoring == "bm25":
+            return np.log1p((n - df + 0.5) / (df + 0.5))
+        return np.log((1.0 + n) / (1.0 + df)) + 1.0
+
+    # ----------------------------
+    # Scoring
+    # ----------------------------
+    def scores(self) -> sparse.csr_matrix:
+        """Weighted document x term matrix for the configured scoring."""
+        if self._scores is not None:
+            return self._scores
+
+        m = self.matrix
+        out = m.copy()
+        if self.scoring == "tfidf":
+            out.data *= self.idf()[out.indices]
+        elif self.scoring == "bm25":
+            doc_len = np.asarray(m.sum(axis=1)).ravel()
+            avg_len = doc_len.mean() if doc_len.size else 0.0
+            norm = self.k1 * (1.0 - self.b + self.b * doc_len / (avg_len or 1.0))
+            rows = np.repeat(np.arange(m.shape[0]), np.diff(m.indptr))
+            tf = m.data
+            out.data = tf * (self.k1 + 1.0) / (tf + norm[rows]) * self.idf()[m.indices]
+
+        self._scores = out
+        return out
+
+    def top_terms(self, doc: int, k: int) -> list[str]:
+        """Top-k terms of one document; ties go to the more frequent, then earlier seen term."""
+        scores = self.scores()
+        lo, hi = scores.indptr[doc], scores.indptr[doc + 1]
+        if lo == hi:
+            return []
+        idx = scores.indices[lo:hi]
+        order = np.lexsort((idx, -self.matrix.data[lo:hi], -scores.data[lo:hi]))[:k]
+        return [self.terms[i] for i in idx[order]]
+
+    def term_frequencies(self) -> dict[str, float]:
+        """Corpus-wide term totals, e.g. for ``WordCloud.generate_from_frequencies``."""
+        totals = np.asarray(self.matrix.sum(axis=0)).ravel()
+        return {t: float(c) for t, c in zip(self.terms, totals) if c > 0}
+
+    # ----------------------------
+    # Persistence (document frequencies across months)
+    # ----------------------------
+    def load_prior(self, path: Path | str, exclude_period: str | None = None) -> KeywordIndex:
+        """Add document frequencies saved for other periods (``exclude_period`` is skipped)."""
+        path = Path(path)
+        if not path.exists():
+            return self
+        with path.open("r", encoding="utf-8") as f:
+            store = json.load(f)
+
+        prior: dict[str, int] = {}
+        docs = 0
+        for period, entry in store.get("periods", {}).items():
+            if period == exclude_period:
+                continue
+            docs += int(entry.get("n_docs", 0))
+            for term, count in entry.get("df", {}).items():
+                prior[term] = prior.get(term, 0) + int(count)
+
+        self._prior_df = prior
+        self._prior_docs = docs
+        self._scores = None
+        return self
+
+    def save_period(self, path: Path | str, period: str) -> Path:
+        """Store this corpus' document frequencies under ``period``, replacing an earlier run."""
+        path = Path(path)
+        store: dict = {"periods": {}}
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                store = json.load(f)
+
+        df = np.bincount(self.matrix.indices, minlength=len(self.terms))
+        store.setdefault("periods", {})[period] = {
+            "n_docs": int(self.matrix.shape[0]),
+            "df": {t: int(c) for t, c in zip(self.terms, df) if c},
+        }
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(store, f, ensure_ascii=False)
+        return path
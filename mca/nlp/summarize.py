@@ -1,71 +1,120 @@
-import json
-from datetime import datetime
+import re
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
 
+import numpy as np
 from pystempel import Stemmer
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.summarizers.lsa import LsaSummarizer
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.utils.extmath import randomized_svd
 
-from ..config.constants import MONTHNAME, STOPWORDS_POLISH
+from ..config import constants
+from ..config.constants import stopwords_polish
+from .digest import split_sentences_pl
 
-LANGUAGE = "polish"
 SENTENCES_COUNT = 50
-INPUT_FILE = "document.txt"
-
-
-def preprocess_json_to_summarize_month_format(json_file):
-    messages = json_file["messages"]
-    txt_format = []
-    with Path.open(f"./{MONTHNAME}_PREPROCECESSED_DATA_MONTH.txt", "w", encoding="UTF-8") as F:
-        for message in messages:
-            if "content" in message.keys():
-                heading = message["sender_name"]
-                text = message["content"]
-                info = heading + "\n" + text + "\n\n"
-                F.write(info)
-                txt_format.append(info)
-    return txt_format
-
-
-def preprocess_json_to_summarize_active_days_format(active_days: List, data: Dict):
-    dates = [day_info[0] for day_info in active_days[0]]
-    messages = data["messages"]
-
-    active_days_messages = {date: [] for date in dates}
-    for message in messages:
-        message_day = datetime.fromtimestamp(message["timestamp_ms"] / 1000.0).strftime("%Y-%m-%d")
-        if "content" in message.keys() and message_day in dates:
-            heading = message["sender_name"]
-            text = message["content"]
-            active_days_messages[message_day].append(heading + "\n" + text + "\n\n")
-    return active_days_messages
-
-
-def summarize_month():
-    with Path.open(f"./{MONTHNAME}_PREPROCECESSED_DATA_MONTH.txt", "r", encoding="UTF-8") as F:
-        text_summary = F.readlines()
-        parser = PlaintextParser.from_string("\n".join(text_summary), Tokenizer(LANGUAGE))
-    stemmer = Stemmer.polimorf()
-
-    summarizer = LsaSummarizer(stemmer)
-    summarizer.stop_words = STOPWORDS_POLISH
-    with Path.open(f"./{MONTHNAME}_MONTH_SUMMARY.txt", "w", encoding="UTF-8") as F:
-        for sentence in summarizer(parser.document, SENTENCES_COUNT):
-            F.write(str(sentence) + "\n")
-
-        print("saved1")
-
-
-def summarize_most_active_days(txt_summary: Dict):
-    for k, v in txt_summary.items():
-        parser = PlaintextParser.from_string("".join(v), Tokenizer(LANGUAGE))
-        stemmer = Stemmer.polimorf()
-
-        summarizer = LsaSummarizer(stemmer)
-        summarizer.stop_words = STOPWORDS_POLISH
-        with Path.open(f"./{MONTHNAME}_ACTIVE_DAYS_{k}_SUMMARY.txt", "w", encoding="UTF-8") as F:
-            for sentence in summarizer(parser.document, SENTENCES_COUNT):
-                F.write(str(sentence) + "\n")
-        print("saved2")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class LsaExtractor:
+    """Extractive LSA summarizer over a sparse TF-IDF sentence x term matrix.
+
+    Same ranking idea as sumy's ``LsaSummarizer`` (a sentence's weight in the strongest latent
+    topics), but the matrix stays sparse and only the top ``n_components`` singular triplets are
+    computed with randomized SVD, so busy months don't need a dense matrix or a full SVD.
+    """
+
+    def __init__(self, stemmer, stop_words=None, n_components: int = 20, random_state: int = 42):
+        self.stemmer = stemmer
+        self.stop_words = frozenset(stopwords_polish() if stop_words is None else stop_words)
+        self.n_components = n_components
+        self.random_state = random_state
+        self._stems: dict[str, str] = {}
+
+    def _stem(self, word: str) -> str:
+        stem = self._stems.get(word)
+        if stem is None:
+            stem = self._stems[word] = self.stemmer(word) or word
+        return stem
+
+    def _analyze(self, sentence: str) -> list[str]:
+        words = _WORD_RE.findall(sentence.lower())
+        return [self._stem(w) for w in words if w not in self.stop_words]
+
+    def __call__(self, sentences: Sequence[str], sentences_count: int) -> list[str]:
+        """Returns the ``sentences_count`` best sentences in their original order."""
+        if len(sentences) <= sentences_count:
+            return list(sentences)
+
+        try:
+            matrix = TfidfVectorizer(analyzer=self._analyze, sublinear_tf=True).fit_transform(sentences)
+        except ValueError:  # empty vocabulary, e.g. only stopwords and emoji
+            return list(sentences[:sentences_count])
+
+        k = max(1, min(self.n_components, min(matrix.shape) - 1))
+        u, sigma, _ = randomized_svd(matrix, n_components=k, random_state=self.random_state)
+        ranks = np.sqrt(((u * sigma) ** 2).sum(axis=1))
+
+        best = np.argpartition(-ranks, sentences_count - 1)[:sentences_count]
+        return [sentences[i] for i in np.sort(best)]
+
+
+_SUMMARIZER: LsaExtractor | None = None
+
+
+def get_summarizer() -> LsaExtractor:
+    """One shared summarizer per process; loading the polimorf stemming table takes seconds."""
+    global _SUMMARIZER
+    if _SUMMARIZER is None:
+        _SUMMARIZER = LsaExtractor(Stemmer.polimorf())
+    return _SUMMARIZER
+
+
+def _content_sentences(messages) -> list[str]:
+    return [sent for msg in messages if msg.content and not msg.is_builtin for sent in split_sentences_pl(msg.content)]
+
+
+def summarize_month(messages, summarizer: LsaExtractor | None = None) -> list[str]:
+    summarizer = summarizer or get_summarizer()
+    return summarizer(_content_sentences(messages), SENTENCES_COUNT)
+
+
+def summarize_most_active_days(
+    messages,
+    active_days: list,
+    summarizer: LsaExtractor | None = None,
+    max_workers: int | None = None,
+) -> dict[str, list[str]]:
+    """Summaries for the dates from ``get_most_active_days``, computed concurrently with one shared summarizer."""
+    summarizer = summarizer or get_summarizer()
+    messages_by_date: dict[str, list] = {date: [] for date, _ in active_days}
+    for msg in messages:
+        if msg.date in messages_by_date:
+            messages_by_date[msg.date].append(msg)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            date: pool.submit(summarize_month, day_messages, summarizer)
+            for date, day_messages in messages_by_date.items()
+        }
+        return {date: future.result() for date, future in futures.items()}
+
+
+def save_month_summary(messages, out_dir: Path | None = None) -> Path:
+    out_dir = out_dir or Path(constants.results_dir())
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / "month_summary_lsa.txt"
+    out_path.write_text("\n".join(summarize_month(messages)) + "\n", encoding="utf-8")
+    return out_path
+
+
+def save_active_days_summaries(messages, active_days: list, out_dir: Path | None = None) -> list[Path]:
+    out_dir = out_dir or Path(constants.results_dir())
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for date, sentences in summarize_most_active_days(messages, active_days).items():
+        out_path = out_dir / f"active_day_{date}_summary_lsa.txt"
+        out_path.write_text("\n".join(sentences) + "\n", encoding="utf-8")
+        paths.append(out_path)
+    return paths
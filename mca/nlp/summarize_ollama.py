@@ -9,13 +9,14 @@ import re
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import ollama
 from pydantic import BaseModel, Field
 
 from ..config import constants
 from ..config.constants import MESSENGER_BUILTIN_MESSAGES
+from .threads import adaptive_gap_min, iter_chronological, iter_threads
 
 MODEL = "llama3.2"
 
@@ -103,35 +104,15 @@ def _is_builtin(content: str) -> bool:
     return any(k.lower() in low for k in MESSENGER_BUILTIN_MESSAGES)
 
 
-def _iter_messages(data: Dict) -> List[Dict]:
-    msgs = sorted(data.get("messages", []), key=lambda m: m.get("timestamp_ms", 0))
-    out = []
-    for m in msgs:
+def _iter_messages(data: Dict) -> Iterator[Dict]:
+    for m in iter_chronological(data.get("messages", [])):
         txt = _clean_text(m.get("content", "") or "")
         if txt and not _is_builtin(txt):
-            out.append(
-                {
-                    "ts": m.get("timestamp_ms", 0),
-                    "author": m.get("sender_name", "Unknown"),
-                    "text": txt,
-                }
-            )
-    return out
-
-
-def _segment_threads(messages: List[Dict], time_gap_min: int = 60) -> List[List[Dict]]:
-    if not messages:
-        return []
-    threads: List[List[Dict]] = []
-    cur = [messages[0]]
-    for prev, nxt in zip(messages, messages[1:]):
-        if (nxt["ts"] - prev["ts"]) / 60_000 >= time_gap_min:
-            threads.append(cur)
-            cur = [nxt]
-        else:
-            cur.append(nxt)
-    threads.append(cur)
-    return threads
+            yield {
+                "ts": m.get("timestamp_ms", 0),
+                "author": m.get("sender_name", "Unknown"),
+                "text": txt,
+            }
 
 
 def _format_thread_for_prompt(thread: List[Dict]) -> str:
@@ -261,21 +242,24 @@ def build_group_chat_digest(
     time_gap_min: int = 60,
     min_thread_messages: int = 8,
     max_threads: int = 8,
+    adaptive_gap: bool = False,
 ) -> Tuple[ChatDigest, str]:
-    """Returns (ChatDigest, formatted_text_in_Polish)."""
-    messages = _iter_messages(data)
-    if not messages:
-        return (ChatDigest(threads=[]), "Brak wiadomości tekstowych do streszczenia.")
+    """Returns (ChatDigest, formatted_text_in_Polish).
 
-    raw_threads = [t for t in _segment_threads(messages, time_gap_min) if len(t) >= min_thread_messages]
-    if not raw_threads:
-        return (
-            ChatDigest(threads=[]),
-            "Nie wykryto wystarczająco dużych wątków. Zmniejsz min_thread_messages lub time_gap_min.",
-        )
+    Threads are analysed as the segmenter emits them; ``adaptive_gap`` derives the gap
+    threshold from the chat's inter-message times (this needs one pass over the timestamps).
+    """
+    messages = _iter_messages(data)
+    if adaptive_gap:
+        messages = list(messages)
+        time_gap_min = adaptive_gap_min([m["ts"] for m in messages], default=time_gap_min)
 
     results: List[ThreadResult] = []
-    for thread in raw_threads:
+    any_messages = False
+    for thread in iter_threads(messages, time_gap_min):
+        any_messages = True
+        if len(thread) < min_thread_messages:
+            continue
         digest = _analyse_thread(thread, model=model)
         results.append(
             ThreadResult(
@@ -287,6 +271,14 @@ def build_group_chat_digest(
             )
         )
 
+    if not any_messages:
+        return (ChatDigest(threads=[]), "Brak wiadomości tekstowych do streszczenia.")
+    if not results:
+        return (
+            ChatDigest(threads=[]),
+            "Nie wykryto wystarczająco dużych wątków. Zmniejsz min_thread_messages lub time_gap_min.",
+        )
+
     results.sort(key=lambda r: r.digest.importance_score, reverse=True)
     top = results[:max_threads]
 
@@ -295,7 +287,7 @@ def build_group_chat_digest(
 
 
 def summarize_month(data: Dict, model: str = MODEL) -> MonthlySummary:
-    messages = _iter_messages(data)
+    messages = list(_iter_messages(data))
     if not messages:
         return MonthlySummary(summary="Brak wiadomości.")
     return _summarize_month(messages, model=model)
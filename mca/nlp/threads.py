@@ -0,0 +1,66 @@
+"""
+Conversation thread segmentation shared by the heuristic and the ollama digests.
+
+Messages are walked oldest first and cut into threads wherever the silence between two
+messages reaches the gap threshold. Threads are yielded as soon as they are closed, so
+callers can start analysing the first thread before the rest of the chat is segmented.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import pairwise
+
+import numpy as np
+
+
+def iter_chronological(messages: Sequence[dict], key: str = "timestamp_ms") -> Iterator[dict]:
+    """
+    Yields messages oldest first. Facebook exports are newest first, so this is normally just a
+    reversed walk; only input in no particular order pays for a sort.
+    """
+    timestamps = [m.get(key, 0) for m in messages]
+    if all(a >= b for a, b in pairwise(timestamps)):
+        yield from reversed(messages)
+    elif all(a <= b for a, b in pairwise(timestamps)):
+        yield from messages
+    else:
+        yield from sorted(messages, key=lambda m: m.get(key, 0))
+
+
+def adaptive_gap_min(
+    timestamps: Sequence[int],
+    quantile: float = 0.95,
+    bounds_min: tuple[float, float] = (15, 240),
+    default: float = 60,
+) -> float:
+    """
+    Gap threshold (minutes) taken from the chat's own inter-message times: the given quantile of
+    the non-zero gaps, clamped to ``bounds_min``. Busy chats get shorter threads, quiet ones longer.
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    gaps = np.abs(np.diff(ts)) / 60_000.0
+    gaps = gaps[gaps > 0]
+    if gaps.size < 2:
+        return float(default)
+    lo, hi = bounds_min
+    return float(np.clip(np.quantile(gaps, quantile), lo, hi))
+
+
+def iter_threads(messages: Iterable[dict], time_gap_min: float) -> Iterator[list[dict]]:
+    """Lazily splits chronological ``{ts, ...}`` messages into threads in a single pass."""
+    gap_ms = time_gap_min * 60_000
+    cur: list[dict] = []
+    prev_ts = 0
+    for m in messages:
+        if cur and m["ts"] - prev_ts >= gap_ms:
+            yield cur
+            cur = []
+        cur.append(m)
+        prev_ts = m["ts"]
+    if cur:
+        yield cur
+
+
+def segment_threads(messages: Iterable[dict], time_gap_min: float) -> list[list[dict]]:
+    return list(iter_threads(messages, time_gap_min))
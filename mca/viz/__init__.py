@@ -1,2 +1,10 @@
-from .emojis import create_emoji_cloud, extract_emojis, save_emoji_cloud
-from .word_cloud import display_word_cloud, get_most_used_words
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        ".emojis": ["create_emoji_cloud", "extract_emojis", "save_emoji_cloud"],
+        ".render": ["FigureExporter", "export_figure", "new_figure"],
+        ".word_cloud": ["count_most_used_words", "display_word_cloud", "get_most_used_words"],
+    },
+)
@@ -1,12 +1,11 @@
-import math
+import hashlib
 import os
 import platform
-import random
 from collections import Counter
+from pathlib import Path
 
-from PIL import Image, ImageFont
-from pilmoji import Pilmoji
-from pilmoji.source import AppleEmojiSource, MicrosoftEmojiSource, TwitterEmojiSource
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
 
 from ..config import constants
 
@@ -19,17 +18,183 @@ _SYSTEM_EMOJI_FONT_BY_PLATFORM = {
 _SYSTEM_EMOJI_FONT = _SYSTEM_EMOJI_FONT_BY_PLATFORM.get(platform.system(), "")
 _EMOJI_FONT_PATH = _BUNDLED_EMOJI_FONT if os.path.exists(_BUNDLED_EMOJI_FONT) else _SYSTEM_EMOJI_FONT
 
-_EMOJI_SOURCE_BY_PLATFORM = {
-    "Windows": MicrosoftEmojiSource,
-    "Darwin": AppleEmojiSource,
-}
-_EMOJI_SOURCE = _EMOJI_SOURCE_BY_PLATFORM.get(platform.system(), TwitterEmojiSource)
+# optional folder of per-emoji PNGs named by codepoints, e.g. twemoji's "1f602.png" or "2764-fe0f.png"
+_EMOJI_IMAGE_DIR = os.path.join("misc", "emoji")
+_EMOJI_ATLAS_DIR = os.path.join("misc", "cache", "emoji_atlas")
+
+# bitmap emoji fonts only load at their strike sizes (Noto Color Emoji: 109 px, Apple: 96/160 px);
+# the glyph is rendered large once and downscaled
+_EMOJI_RENDER_SIZES = (109, 160, 96, 128)
+
+
+class EmojiAtlas:
+    """Local, persistent cache of rendered emoji glyphs.
+
+    Each emoji is rendered once per size from a local image folder or the emoji font, stored as
+    ``{cache_dir}/{source}/{size}/{codepoints}.png`` and reused by later runs, so drawing a cloud is
+    just pasting images and never touches the network. ``source`` names the font and fingerprints
+    the glyph sources, so replacing the font or editing, adding or removing a PNG starts a new cache.
+    """
+
+    def __init__(self, font_path=_EMOJI_FONT_PATH, image_dir=_EMOJI_IMAGE_DIR, cache_dir=_EMOJI_ATLAS_DIR):
+        self.font_path = font_path
+        self.image_dir = Path(image_dir) if image_dir else None
+        self.cache_dir = Path(cache_dir) / self._source_key() if cache_dir else None
+        self._glyphs = {}
+        self._font = None
+
+    def _source_key(self):
+        """``{font stem or "images"}-{hash}`` of the font file and the image folder: paths, sizes and mtimes."""
+        digest = hashlib.sha256()
+        if self.image_dir is not None and self.image_dir.is_dir():
+            digest.update(str(self.image_dir.resolve()).encode())
+            for png in sorted(self.image_dir.glob("*.png")):
+                stat = png.stat()
+                digest.update(f"\n{png.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        has_font = bool(self.font_path) and os.path.exists(self.font_path)
+        if has_font:
+            stat = os.stat(self.font_path)
+            digest.update(f"\n{os.path.abspath(self.font_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        name = Path(self.font_path).stem if has_font else "images"
+        return f"{name}-{digest.hexdigest()[:16]}"
+
+    @staticmethod
+    def _codepoints(emoji_char):
+        return "-".join(f"{ord(c):x}" for c in emoji_char)
+
+    def glyph(self, emoji_char, size):
+        """RGBA image of ``emoji_char`` fitted into a ``size`` x ``size`` square, or None if it can't be rendered."""
+        key = (emoji_char, size)
+        if key in self._glyphs:
+            return self._glyphs[key]
+
+        cached = self.cache_dir / str(size) / f"{self._codepoints(emoji_char)}.png" if self.cache_dir else None
+        if cached is not None and cached.exists():
+            glyph = Image.open(cached).convert("RGBA")
+        else:
+            glyph = self._render(emoji_char, size)
+            if glyph is not None and cached is not None:
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                glyph.save(cached, format="PNG")
+
+        self._glyphs[key] = glyph
+        return glyph
+
+    def _render(self, emoji_char, size):
+        base = self._from_image_dir(emoji_char)
+        if base is None:
+            base = self._from_font(emoji_char)
+        if base is None:
+            return None
+
+        bbox = base.getbbox()
+        if bbox is None:
+            return None
+        base = base.crop(bbox)
+        base.thumbnail((size, size), Image.LANCZOS)
+        glyph = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        glyph.paste(base, ((size - base.width) // 2, (size - base.height) // 2))
+        return glyph
+
+    def _from_image_dir(self, emoji_char):
+        if self.image_dir is None:
+            return None
+        codepoints = self._codepoints(emoji_char)
+        for name in (codepoints, codepoints.replace("-fe0f", "")):
+            path = self.image_dir / f"{name}.png"
+            if path.exists():
+                return Image.open(path).convert("RGBA")
+        return None
+
+    def _from_font(self, emoji_char):
+        if self._font is None:
+            self._font = False
+            for render_size in _EMOJI_RENDER_SIZES if self.font_path else ():
+                try:
+                    self._font = ImageFont.truetype(self.font_path, render_size)
+                    break
+                except OSError:
+                    continue
+        if not self._font:
+            return None
+
+        left, top, right, bottom = self._font.getbbox(emoji_char)
+        canvas = Image.new("RGBA", (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+        ImageDraw.Draw(canvas).text((-left, -top), emoji_char, font=self._font, embedded_color=True)
+        return canvas
 
 
 def extract_emojis(messages):
     return [e for msg in messages for e in msg.emojis]
 
 
+class _OccupancyGrid:
+    """Coarse occupancy bitmap of the canvas (one cell = ``cell`` px).
+
+    Free squares are found for all positions at once with a summed-area table, like wordcloud's
+    integral image, so placing an emoji costs a few array passes instead of a scan over every
+    emoji placed before it.
+    """
+
+    def __init__(self, width, height, cell=8, border=10):
+        self.width, self.height, self.cell, self.border = width, height, cell, border
+        self.occupied = np.zeros((-(-height // cell), -(-width // cell)), dtype=np.uint8)
+        self._sat = None
+        self._dist = {}
+
+    def _summed_area(self):
+        if self._sat is None:
+            sat = np.zeros((self.occupied.shape[0] + 1, self.occupied.shape[1] + 1), dtype=np.int32)
+            np.cumsum(np.cumsum(self.occupied, axis=0, dtype=np.int32), axis=1, out=sat[1:, 1:])
+            self._sat = sat
+        return self._sat
+
+    def find(self, size):
+        """Top-left (x, y) of the free spot for a ``size`` px square closest to the centre, or None."""
+        x_lo, y_lo, x_hi, y_hi = self._bounds(size)
+        if x_hi < x_lo or y_hi < y_lo:
+            return None
+
+        n = -(-size // self.cell)
+        sat = self._summed_area()
+        # occupied cells under an n x n square, for every top-left cell at once
+        taken = sat[n:, n:] - sat[:-n, n:] - sat[n:, :-n] + sat[:-n, :-n]
+        window = taken[y_lo : y_hi + 1, x_lo : x_hi + 1]
+
+        dist = np.where(window == 0, self._distances(size), np.inf)
+        best = np.argmin(dist)
+        if not np.isfinite(dist.flat[best]):
+            return None
+        row, col = divmod(int(best), window.shape[1])
+        return (x_lo + col) * self.cell, (y_lo + row) * self.cell
+
+    def _bounds(self, size):
+        """Cell range of valid top-left corners: border < x < width - size - border."""
+        c = self.cell
+        x_lo = y_lo = self.border // c + 1
+        x_hi = min((self.width - size - self.border - 1) // c, self.occupied.shape[1] - -(-size // c))
+        y_hi = min((self.height - size - self.border - 1) // c, self.occupied.shape[0] - -(-size // c))
+        return x_lo, y_lo, x_hi, y_hi
+
+    def _distances(self, size):
+        """Squared distance of every candidate's centre to the canvas centre (cached per size)."""
+        if size not in self._dist:
+            x_lo, y_lo, x_hi, y_hi = self._bounds(size)
+            xs = np.arange(x_lo, x_hi + 1) * self.cell + size / 2 - self.width / 2
+            ys = np.arange(y_lo, y_hi + 1) * self.cell + size / 2 - self.height / 2
+            self._dist[size] = ys[:, None] ** 2 + xs[None, :] ** 2
+        return self._dist[size]
+
+    def occupy(self, x, y, size, margin):
+        """Marks the square plus ``margin`` on every side, rounded out to whole cells."""
+        c = self.cell
+        self.occupied[
+            max(0, (y - margin) // c) : -(-(y + size + margin) // c),
+            max(0, (x - margin) // c) : -(-(x + size + margin) // c),
+        ] = 1
+        self._sat = None
+
+
 def create_emoji_cloud(emojis, max_emojis=50):
     if not emojis:
         print("No emojis available to create cloud.")
@@ -54,71 +219,27 @@ def create_emoji_cloud(emojis, max_emojis=50):
     emoji_data = [(e, scale_size(c), c) for e, c in top_emojis]
 
     img_width, img_height = 1200, 800
-    center_x, center_y = img_width // 2, img_height // 2
+    grid = _OccupancyGrid(img_width, img_height)
+    margin = 5
 
     placed = []
-    angle = 0
-    radius = 0
-    angle_step = 0.5
-    radius_step = 8
-
+    smallest_misfit = max_size + 1
     for emoji_char, size, count in emoji_data:
-        placed_ok = False
-        attempts = 0
-
-        while not placed_ok and attempts < 500:
-            x = center_x + int(radius * math.cos(angle)) - size // 2
-            y = center_y + int(radius * math.sin(angle)) - size // 2
-
-            if 10 < x < img_width - size - 10 and 10 < y < img_height - size - 10:
-                collision = False
-                for px, py, psize, _, _ in placed:
-                    margin = 5
-                    if (
-                        x < px + psize + margin
-                        and x + size + margin > px
-                        and y < py + psize + margin
-                        and y + size + margin > py
-                    ):
-                        collision = True
-                        break
-
-                if not collision:
-                    placed.append((x, y, size, emoji_char, count))
-                    placed_ok = True
-
-            angle += angle_step
-            if angle > 2 * math.pi:
-                angle -= 2 * math.pi
-                radius += radius_step
-
-            attempts += 1
-
-        if not placed_ok:
-            for _ in range(100):
-                x = random.randint(10, img_width - size - 10)
-                y = random.randint(10, img_height - size - 10)
-
-                collision = False
-                for px, py, psize, _, _ in placed:
-                    margin = 5
-                    if (
-                        x < px + psize + margin
-                        and x + size + margin > px
-                        and y < py + psize + margin
-                        and y + size + margin > py
-                    ):
-                        collision = True
-                        break
-
-                if not collision:
-                    placed.append((x, y, size, emoji_char, count))
-                    break
+        # the canvas only fills up, so anything at least as big as an emoji that didn't fit won't fit either
+        if size >= smallest_misfit:
+            continue
+        spot = grid.find(size)
+        if spot is None:
+            smallest_misfit = size
+            continue
+        x, y = spot
+        grid.occupy(x, y, size, margin)
+        placed.append((x, y, size, emoji_char, count))
 
     return placed
 
 
-def save_emoji_cloud(emoji_positions):
+def save_emoji_cloud(emoji_positions, atlas=None):
     if not emoji_positions:
         print("No emoji cloud to save")
         return
@@ -126,16 +247,16 @@ def save_emoji_cloud(emoji_positions):
     img_width, img_height = 1200, 800
     img = Image.new("RGBA", (img_width, img_height), color=(15, 15, 25, 255))
 
-    font_cache = {}
-
-    with Pilmoji(img, source=_EMOJI_SOURCE) as pilmoji:
-        for x, y, size, emoji_char, _ in emoji_positions:
-            if size not in font_cache:
-                try:
-                    font_cache[size] = ImageFont.truetype(_EMOJI_FONT_PATH, size)
-                except OSError:
-                    font_cache[size] = ImageFont.load_default()
-            pilmoji.text((x, y), emoji_char, font=font_cache[size])
+    atlas = atlas or EmojiAtlas()
+    missing = 0
+    for x, y, size, emoji_char, _ in emoji_positions:
+        glyph = atlas.glyph(emoji_char, size)
+        if glyph is None:
+            missing += 1
+            continue
+        img.alpha_composite(glyph, (x, y))
 
+    if missing:
+        print(f"Could not render {missing} emojis, no local emoji font or images found")
     img.save(f"{constants.results_dir()}/emoji_cloud.png", format="PNG")
-    print(f"Saved emoji cloud with {len(emoji_positions)} emojis")
+    print(f"Saved emoji cloud with {len(emoji_positions) - missing} emojis")
@@ -0,0 +1,128 @@
+"""
+Headless chart rendering.
+
+Charts are drawn on ``matplotlib.figure.Figure`` objects with their own Agg canvas, so nothing is
+registered with pyplot's global figure manager and a figure lives exactly as long as someone holds
+it. Only figures that are going to be shown (debug runs) are created through pyplot.
+
+Finished figures can be handed to a ``FigureExporter``, which rasterises them in worker processes:
+matplotlib is not thread-safe (text layout, the font cache and mathtext keep shared state), so
+the main process keeps building figures while each worker renders a pickled copy on its own.
+"""
+
+from __future__ import annotations
+
+import io
+import multiprocessing
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Self
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# workers start from a clean interpreter: forking a parent that has threads running can deadlock
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def new_figure(figsize=(12, 6), show=False, **kwargs) -> Figure:
+    """A standalone figure, or with ``show`` one managed by pyplot so ``show_figure`` can open it."""
+    if show:
+        import matplotlib.pyplot as plt
+
+        return plt.figure(figsize=figsize, **kwargs)
+    fig = Figure(figsize=figsize, **kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def save_figure(fig: Figure, path: Path | str, **savefig_kwargs) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(path, **savefig_kwargs)
+    return path
+
+
+def show_figure(fig: Figure) -> None:
+    """Opens a ``new_figure(..., show=True)`` figure in a pyplot window (debug runs only)."""
+    import matplotlib.pyplot as plt
+
+    plt.show()
+    plt.close(fig)
+
+
+def _render(pickled_fig: bytes, fmt: str | None, savefig_kwargs: dict) -> bytes:
+    fig = pickle.loads(pickled_fig)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, **savefig_kwargs)
+    return buffer.getvalue()
+
+
+class FigureExporter:
+    """
+    Writes figures to disk, rendering them in a small process pool. Each figure is rendered into
+    the path it was submitted with, so the output does not depend on scheduling; ``wait`` writes
+    the files, returns the paths in submission order and re-raises the first export error.
+    Figures that can't be pickled (e.g. a ``FuncFormatter`` with a lambda) are saved right away.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(_START_METHOD))
+        self._pending: list[tuple[Future, Path]] = []
+
+    def submit(self, fig: Figure, path: Path | str, **savefig_kwargs) -> Future:
+        path = Path(path)
+        try:
+            pickled_fig = pickle.dumps(fig)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            future = Future()
+            future.set_result(None)
+            save_figure(fig, path, **savefig_kwargs)
+        else:
+            fmt = savefig_kwargs.pop("format", None) or path.suffix[1:] or None
+            future = self._pool.submit(_render, pickled_fig, fmt, savefig_kwargs)
+        self._pending.append((future, path))
+        return future
+
+    def wait(self) -> list[Path]:
+        pending, self._pending = self._pending, []
+        written = []
+        for future, path in pending:
+            image = future.result()
+            if image is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(image)
+            written.append(path)
+        return written
+
+    def close(self) -> list[Path]:
+        try:
+            return self.wait()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def export_figure(
+    fig: Figure,
+    path: Path | str,
+    exporter: FigureExporter | None = None,
+    debug: bool = False,
+    **savefig_kwargs,
+) -> None:
+    """Queues ``fig`` on ``exporter`` or, without one (or when it has to be shown), saves it right away."""
+    if exporter is not None and not debug:
+        exporter.submit(fig, path, **savefig_kwargs)
+        return
+    save_figure(fig, path, **savefig_kwargs)
+    if debug:
+        show_figure(fig)
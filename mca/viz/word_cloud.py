@@ -1,6 +1,8 @@
 import os
 import random
 import re
+from collections import Counter
+from collections.abc import Mapping
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -11,46 +13,88 @@ from ..config import constants
 from ..config.constants import (
     MESSENGER_BUILTIN_MESSAGES,
     NICE_COLORMAPS,
-    STOPWORDS_POLISH,
+    stopwords_polish,
 )
 
+_STENCIL_PATH = os.path.join("misc", "stencils", "cat_stencil_2k.png")
+_MASK_CACHE_DIR = os.path.join("misc", "cache", "stencils")
+# words are placed on a mask this many times smaller and drawn back at full size through WordCloud(scale=...)
+LAYOUT_DOWNSCALE = 2
 
-def get_most_used_words(data, top_n=500_000):
-    words = []
+_LINK_RE = re.compile(r"(https?:\/\/\S+)")
+_TAG_RE = re.compile(r"@[A-Z][a-zęóąśłżźćń]+(?:[-\s][A-Z][a-zęóąśłżźćń]+)*")
+_WORD_RE = re.compile(r"\w+")
+
+
+def message_words(content, stop_words):
+    """Word cloud words of one (non-builtin) message: no links, @mentions or stopwords."""
+    content = _TAG_RE.sub("", _LINK_RE.sub("", content))
+    return [word for word in _WORD_RE.findall(content.lower()) if word not in stop_words]
+
+
+def _iter_words(data):
+    stop_words = stopwords_polish()
     for message in data["messages"]:
-        if "content" in message:
-            if any(keyword in message["content"] for keyword in MESSENGER_BUILTIN_MESSAGES):
-                continue
-            content_without_links = re.sub(r"(https?:\/\/\S+)", "", message["content"])
-            content_without_tags = re.sub(
-                r"@[A-Z][a-zęóąśłżźćń]+(?:[-\s][A-Z][a-zęóąśłżźćń]+)*",
-                "",
-                content_without_links,
-            )
+        content = message.get("content")
+        if not content:
+            continue
+        if any(keyword in content for keyword in MESSENGER_BUILTIN_MESSAGES):
+            continue
+        yield from message_words(content, stop_words)
+
+
+def get_most_used_words(data, top_n=500_000):
+    return list(_iter_words(data)), top_n
+
+
+def count_most_used_words(data, top_n=500_000):
+    """Like get_most_used_words, but streams straight into a word -> count Counter."""
+    return Counter(_iter_words(data)), top_n
+
+
+def load_mask(path=_STENCIL_PATH, downscale=1, cache_dir=_MASK_CACHE_DIR):
+    """
+    Stencil binarised the way wordcloud reads it (255 = no words, 0 = canvas) and shrunk
+    ``downscale`` times. Kept as .npy in ``cache_dir`` and rebuilt when the image is newer.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f"{stem}_{downscale}x.npy")
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        return np.load(cache_path)
 
-            words.extend(
-                word for word in re.findall(r"\w+", content_without_tags.lower()) if word not in STOPWORDS_POLISH
-            )
+    with Image.open(path) as img:
+        outside = np.all(np.asarray(img.convert("RGB")) == 255, axis=-1)
+    mask = np.where(outside, 255, 0).astype(np.uint8)
+    if downscale > 1:
+        # a shrunk pixel stays canvas only if most of the pixels it covers were
+        mask = np.where(np.asarray(Image.fromarray(mask).reduce(downscale)) > 127, 255, 0).astype(np.uint8)
 
-    return words, top_n
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(cache_path, mask)
+    return mask
 
 
-def display_word_cloud(words, top_n, debug):
+def display_word_cloud(words, top_n, debug, downscale=LAYOUT_DOWNSCALE):
     chosen_colormap = random.choice(NICE_COLORMAPS)
 
     # cat stencil I use for my groupchat
-    mask_file = os.path.join("misc", "stencils", "cat_stencil_2k.png")
-    cat_mask = np.array(Image.open(mask_file))
+    cat_mask = load_mask(downscale=downscale)
     wc = WordCloud(
         background_color="#232136",
         max_words=2000,
         mask=cat_mask,
+        scale=downscale,
+        margin=max(1, round(2 / downscale)),
         contour_width=5,
-        min_font_size=10,
+        min_font_size=max(1, round(10 / downscale)),
         contour_color="#232136",
         colormap=chosen_colormap,
     )
-    wc.generate(" ".join(words))
+    if isinstance(words, Mapping):
+        # same as wordcloud's own tokenizer: numbers are not words
+        wc.generate_from_frequencies({word: count for word, count in words.items() if not word.isdigit()})
+    else:
+        wc.generate(" ".join(words))
 
     wc.to_file(f"{constants.results_dir()}/words.png")
 
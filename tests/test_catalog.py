@@ -0,0 +1,130 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+import mca.core.catalog as catalog_module
+from mca.core.catalog import ChatEntry, load_catalog
+from mca.core.storage import MESSAGES_DIR, FolderExport, ZipExport
+
+
+def _mojibake(text):
+    return text.encode("utf-8").decode("latin1")
+
+
+def _pages(title, names, timestamps, per_page):
+    """Export-shaped pages: newest messages first, ``participants`` first and ``title`` after the messages."""
+    timestamps = sorted(timestamps, reverse=True)
+    pages = []
+    for start in range(0, len(timestamps), per_page):
+        page = {
+            "participants": [{"name": _mojibake(n)} for n in names],
+            "messages": [
+                {"sender_name": _mojibake(names[0]), "timestamp_ms": ts, "content": "x" * 200}
+                for ts in timestamps[start : start + per_page]
+            ],
+            "title": _mojibake(title),
+            "is_still_participant": True,
+            "thread_path": "inbox/whatever",
+        }
+        pages.append(json.dumps(page, indent=2))
+    return pages
+
+
+CHATS = {
+    ("inbox", "zupa_abc123"): ("Zupa pomidorowa 🍅", ["Łukasz", "Ola"], range(1_000_000, 3_000_000, 1000), 1000),
+    ("archived_threads", "ola_def456"): ("Ola", ["Ola", "Łukasz"], [5_000, 7_000], 10),
+    ("e2ee_cutover", "ela_ghi789"): ("Ela", ["Ela"], [9_000], 10),
+}
+
+
+def _write_folder(root):
+    for (folder, chat), (title, names, timestamps, per_page) in CHATS.items():
+        chat_dir = root / MESSAGES_DIR / folder / chat
+        chat_dir.mkdir(parents=True)
+        for n, page in enumerate(_pages(title, names, timestamps, per_page), 1):
+            (chat_dir / f"message_{n}.json").write_text(page, encoding="utf-8")
+    (root / MESSAGES_DIR / "inbox" / "empty_xyz").mkdir()
+    return root
+
+
+@pytest.fixture
+def export(tmp_path):
+    return FolderExport(_write_folder(tmp_path / "facebook-me"))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return tmp_path / "cache"
+
+
+def test_reads_header_fields_without_parsing_pages(export, cache, monkeypatch):
+    monkeypatch.setattr(export, "load_json", lambda name: pytest.fail(f"{name} parsed in full"))
+
+    entries = load_catalog(export, cache_dir=cache)
+
+    assert [(e.folder, e.chat) for e in entries] == list(CHATS)
+    zupa = entries[0]
+    assert zupa.title == "Zupa pomidorowa 🍅"
+    assert zupa.participants == ["Łukasz", "Ola"]
+    assert (zupa.first_ms, zupa.last_ms) == (1_000_000, 2_999_000)
+    assert zupa.pages == 2
+    assert zupa.size > 2 * catalog_module._EDGE_BYTES
+    assert entries[1].period() != ""
+
+
+def test_index_is_reused_until_a_page_changes(export, cache, monkeypatch):
+    first = load_catalog(export, cache_dir=cache)
+    read = []
+    real_read = catalog_module.read_chat_entry
+    monkeypatch.setattr(
+        catalog_module,
+        "read_chat_entry",
+        lambda export, folder, chat, *a: read.append(chat) or real_read(export, folder, chat, *a),
+    )
+
+    assert load_catalog(export, cache_dir=cache) == first
+    assert read == []
+
+    page = export.root / MESSAGES_DIR / "archived_threads" / "ola_def456" / "message_1.json"
+    page.write_text(_pages("Ola!", ["Ola"], [5_000], 10)[0], encoding="utf-8")
+    os.utime(page, ns=(0, 0))
+    entries = load_catalog(export, cache_dir=cache)
+
+    assert read == ["ola_def456"]
+    assert entries[1].title == "Ola!"
+
+
+def test_unusual_key_order_falls_back_to_a_full_parse(tmp_path, cache):
+    chat_dir = tmp_path / "facebook-x" / MESSAGES_DIR / "inbox" / "big_1"
+    chat_dir.mkdir(parents=True)
+    page = json.loads(_pages("Big", ["Ala"], range(0, 2_000_000, 1000), 5000)[0])
+    (chat_dir / "message_1.json").write_text(
+        json.dumps({"title": page["title"], "messages": page["messages"], "participants": page["participants"]}),
+        encoding="utf-8",
+    )
+
+    (entry,) = load_catalog(FolderExport(tmp_path / "facebook-x"), cache_dir=cache)
+
+    assert (entry.title, entry.participants, entry.first_ms, entry.last_ms) == ("Big", ["Ala"], 0, 1_999_000)
+
+
+def test_zip_export(export, tmp_path, cache):
+    archive = tmp_path / "facebook-me.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in export.root.rglob("*.json"):
+            zf.write(path, path.relative_to(export.root).as_posix())
+
+    entries = load_catalog(ZipExport([archive], cache_dir=cache), cache_dir=cache)
+
+    assert entries == load_catalog(export, cache_dir=tmp_path / "other")
+
+
+def test_matches():
+    entry = ChatEntry("inbox", "zupa_abc123", "Zupa", ["Łukasz", "Ola"])
+
+    assert entry.matches("zup")
+    assert entry.matches("łuk")
+    assert not entry.matches("ela")
+    assert ChatEntry("inbox", "zupa_abc123", "").name == "zupa"
@@ -8,7 +8,7 @@ from mca.nlp.digest import (
     _clip,
     _is_builtin_message,
     _iter_content_messages,
-    _segment_threads,
+    _select_topic_sentences_and_filter_keywords,
     build_group_chat_digest,
     split_sentences_pl,
 )
@@ -151,45 +151,6 @@ class TestIterContentMessages:
         assert result == []
 
 
-class TestSegmentThreads:
-    def test_splits_by_time_gap(self):
-        # Messages with 2-hour gaps (>60 min default)
-        messages = [
-            {"ts": 0, "author": "User1", "text": "msg1"},
-            {"ts": 60 * 60 * 1000, "author": "User1", "text": "msg2"},  # 1 hour later
-            {"ts": 3 * 60 * 60 * 1000, "author": "User1", "text": "msg3"},  # 2 hours after msg2
-        ]
-
-        result = _segment_threads(messages, time_gap_min=60)
-
-        assert len(result) == 3  # Each message in separate thread
-
-    def test_groups_close_messages(self):
-        # Messages within 30 minutes
-        messages = [
-            {"ts": 0, "author": "User1", "text": "msg1"},
-            {"ts": 10 * 60 * 1000, "author": "User1", "text": "msg2"},  # 10 min later
-            {"ts": 20 * 60 * 1000, "author": "User1", "text": "msg3"},  # 10 min later
-        ]
-
-        result = _segment_threads(messages, time_gap_min=60)
-
-        assert len(result) == 1
-        assert len(result[0]) == 3
-
-    def test_empty_messages(self):
-        result = _segment_threads([], time_gap_min=60)
-        assert result == []
-
-    def test_single_message(self):
-        messages = [{"ts": 0, "author": "User1", "text": "msg1"}]
-
-        result = _segment_threads(messages, time_gap_min=60)
-
-        assert len(result) == 1
-        assert len(result[0]) == 1
-
-
 class TestSplitSentencesPl:
     def test_splits_on_period(self):
         text = "First sentence. Second sentence."
@@ -220,6 +181,54 @@ class TestSplitSentencesPl:
         assert len(result) == 1
 
 
+class TestSelectTopicSentences:
+    def _thread(self, *texts):
+        return [{"ts": i, "author": f"User{i}", "text": t} for i, t in enumerate(texts)]
+
+    def test_drops_keywords_without_sentences(self):
+        thread = self._thread("rower jest bardzo szybki dzisiaj rano", "mecz był wczoraj wieczorem super")
+        cfg = DigestConfig(topic_sentence_min_chars=10)
+
+        keywords, selected = _select_topic_sentences_and_filter_keywords(
+            thread, ["rower", "pizza", "mecz"], cfg, "none", None
+        )
+
+        assert keywords == ["rower", "mecz"]
+        assert [s["author"] for s in selected] == ["User0", "User1"]
+
+    def test_prefers_sentences_matching_more_keywords(self):
+        thread = self._thread("rower stoi przed domem", "rower i mecz to całe moje życie")
+        cfg = DigestConfig(topic_sentence_min_chars=10, topic_sentences_max=1)
+
+        _, selected = _select_topic_sentences_and_filter_keywords(thread, ["rower", "mecz"], cfg, "none", None)
+
+        assert selected[0]["author"] == "User1"
+        assert selected[0]["matched_keywords"] == ["mecz", "rower"]
+
+    def test_tops_up_to_max_sentences(self):
+        thread = self._thread(*[f"rower numer {i} jest całkiem niezły" for i in range(10)])
+        cfg = DigestConfig(topic_sentence_min_chars=10, topic_sentences_max=4)
+
+        _, selected = _select_topic_sentences_and_filter_keywords(thread, ["rower"], cfg, "none", None)
+
+        assert len(selected) == 4
+
+    def test_repeated_sentences_do_not_crowd_out_the_top_up(self):
+        repeated = "rower rower rower to jest zdecydowanie najlepszy sposób na dojazd do pracy"
+        thread = [{"ts": i, "author": "Ola", "text": repeated} for i in range(5)]
+        thread += [{"ts": 5 + i, "author": f"User{i}", "text": f"rower numer {i} jest niezły"} for i in range(3)]
+        cfg = DigestConfig(topic_sentence_min_chars=10, topic_sentences_max=3)
+
+        _, selected = _select_topic_sentences_and_filter_keywords(thread, ["rower"], cfg, "none", None)
+
+        assert [s["author"] for s in selected] == ["Ola", "User0", "User1"]
+
+    def test_no_sentences(self):
+        cfg = DigestConfig()
+
+        assert _select_topic_sentences_and_filter_keywords([], ["rower"], cfg, "none", None) == ([], [])
+
+
 class TestBuildGroupChatDigest:
     def test_returns_message_for_empty_data(self):
         data = {"messages": []}
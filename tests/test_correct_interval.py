@@ -1,10 +1,17 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
 
 import pytest
 
 from mca.core.interval import (
+    MessageWindow,
     check_month_interval,
     filter_messages_to_one_month,
+    messages_in_range,
+    month_window,
+    partition_by_period,
+    period_window,
+    week_window,
 )
 
 
@@ -156,3 +163,130 @@ class TestFilterMessagesToOneMonth:
 
         # At least one message should remain (the one matching CORRECT_MONTH)
         assert len(result["messages"]) >= 1
+
+    def test_same_month_of_other_year_is_dropped(self):
+        jan_2023 = datetime(2023, 1, 20, 10, 0, 0).timestamp() * 1000
+        jan_2024 = datetime(2024, 1, 15, 10, 0, 0).timestamp() * 1000
+
+        data = {
+            "messages": [
+                {"timestamp_ms": jan_2024 + 86400000, "content": "jan2"},
+                {"timestamp_ms": jan_2024, "content": "jan1"},
+                {"timestamp_ms": jan_2023, "content": "old"},
+            ]
+        }
+
+        check_month_interval(data)
+        result = filter_messages_to_one_month(data)
+
+        assert [m["content"] for m in result["messages"]] == ["jan2", "jan1"]
+
+
+def _utc_ms(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+class TestMessagesInRange:
+    @pytest.fixture
+    def newest_first(self):
+        days = [_utc_ms(2024, 1, 30), _utc_ms(2024, 2, 1), _utc_ms(2024, 2, 14), _utc_ms(2024, 2, 29, 23, 59)]
+        days.append(_utc_ms(2024, 3, 1))
+        return [{"timestamp_ms": ts, "content": str(i)} for i, ts in enumerate(reversed(days))]
+
+    def test_month_window_newest_first(self, newest_first):
+        window = messages_in_range(newest_first, *month_window(2024, 2, timezone.utc))
+
+        assert [m["timestamp_ms"] for m in window] == [
+            _utc_ms(2024, 2, 29, 23, 59),
+            _utc_ms(2024, 2, 14),
+            _utc_ms(2024, 2, 1),
+        ]
+
+    def test_oldest_first_gives_same_messages(self, newest_first):
+        oldest_first = newest_first[::-1]
+        window = messages_in_range(oldest_first, *month_window(2024, 2, timezone.utc))
+
+        assert list(reversed(window)) == list(messages_in_range(newest_first, *month_window(2024, 2, timezone.utc)))
+
+    def test_window_is_a_view(self, newest_first):
+        window = messages_in_range(newest_first, *month_window(2024, 2, timezone.utc))
+
+        assert isinstance(window, MessageWindow)
+        assert len(window) == 3
+        assert window[0] is newest_first[1]
+        assert window[-1] is newest_first[3]
+        assert window[1:] == [newest_first[2], newest_first[3]]
+        with pytest.raises(IndexError):
+            window[3]
+
+    def test_empty_range(self, newest_first):
+        assert len(messages_in_range(newest_first, *month_window(2023, 5, timezone.utc))) == 0
+        assert len(messages_in_range([], 0, 10)) == 0
+
+    def test_timezone_moves_the_boundary(self, newest_first):
+        # 2024-02-29 23:59 UTC is already March 1st in UTC+1 (Polish winter time)
+        window = messages_in_range(newest_first, *month_window(2024, 3, timezone(timedelta(hours=1))))
+
+        assert [m["timestamp_ms"] for m in window] == [_utc_ms(2024, 3, 1), _utc_ms(2024, 2, 29, 23, 59)]
+
+    def test_week_window_starts_on_monday(self):
+        start, end = week_window(date(2024, 2, 15), timezone.utc)
+
+        assert start == _utc_ms(2024, 2, 12)
+        assert end == _utc_ms(2024, 2, 19)
+
+    def test_december_window_ends_in_next_year(self):
+        assert month_window(2023, 12, timezone.utc) == (_utc_ms(2023, 12, 1), _utc_ms(2024, 1, 1))
+
+
+class TestPartitionByPeriod:
+    @pytest.fixture
+    def newest_first(self):
+        days = [_utc_ms(2023, 12, 31, 12), _utc_ms(2024, 1, 1), _utc_ms(2024, 1, 20), _utc_ms(2024, 4, 2)]
+        return [{"timestamp_ms": ts} for ts in reversed(days)]
+
+    def test_month_partitions_skip_empty_months(self, newest_first):
+        partitions = partition_by_period(newest_first, "month", timezone.utc)
+
+        assert list(partitions) == ["2023-12", "2024-01", "2024-04"]
+        assert [len(w) for w in partitions.values()] == [1, 2, 1]
+        assert partitions["2024-01"][0] is newest_first[1]
+
+    def test_partitions_cover_every_message_once(self, newest_first):
+        for period in ("week", "month", "quarter"):
+            partitions = partition_by_period(newest_first, period, timezone.utc)
+            assert sum(len(w) for w in partitions.values()) == len(newest_first)
+
+    def test_objects_are_partitioned_by_attribute(self, newest_first):
+        objects = [SimpleNamespace(**message) for message in newest_first]
+
+        partitions = partition_by_period(objects, "month", timezone.utc)
+
+        assert {label: len(w) for label, w in partitions.items()} == {"2023-12": 1, "2024-01": 2, "2024-04": 1}
+        assert partitions["2024-01"][0] is objects[1]
+
+    def test_oldest_first_gives_same_partitions(self, newest_first):
+        partitions = partition_by_period(newest_first[::-1], "quarter", timezone.utc)
+
+        assert {label: len(w) for label, w in partitions.items()} == {"2023-Q4": 1, "2024-Q1": 2, "2024-Q2": 1}
+
+    def test_week_labels_use_iso_weeks(self, newest_first):
+        # Sunday 2023-12-31 belongs to 2023-W52, Monday 2024-01-01 opens 2024-W01
+        assert list(partition_by_period(newest_first, "week", timezone.utc)) == [
+            "2023-W52",
+            "2024-W01",
+            "2024-W03",
+            "2024-W14",
+        ]
+
+    def test_quarter_window(self):
+        assert period_window("quarter", date(2024, 11, 5), timezone.utc) == (
+            "2024-Q4",
+            _utc_ms(2024, 10, 1),
+            _utc_ms(2025, 1, 1),
+        )
+
+    def test_empty_and_unknown_period(self, newest_first):
+        assert partition_by_period([], "month") == {}
+        with pytest.raises(ValueError):
+            partition_by_period(newest_first, "year")
@@ -1,6 +1,10 @@
+import os
+
 import pytest
 
-from mca.viz.emojis import create_emoji_cloud, extract_emojis
+from PIL import Image
+
+from mca.viz.emojis import EmojiAtlas, create_emoji_cloud, extract_emojis
 
 
 @pytest.mark.parametrize(
@@ -88,3 +92,71 @@ class TestCreateEmojiCloud:
         counts = {item[3]: item[4] for item in result}
         assert counts["😊"] == 50
         assert counts["😂"] == 25
+
+    def test_large_cloud_has_no_overlaps(self):
+        import emoji
+
+        chars = list(emoji.EMOJI_DATA)[:300]
+        emojis = [c for i, c in enumerate(chars) for _ in range(1 + i % 40)]
+        result = create_emoji_cloud(emojis, max_emojis=300)
+
+        assert len(result) > 50
+        margin = 5
+        for i, (x1, y1, s1, _, _) in enumerate(result):
+            assert 10 < x1 < 1200 - s1 - 10
+            assert 10 < y1 < 800 - s1 - 10
+            for x2, y2, s2, _, _ in result[i + 1 :]:
+                overlap = x1 < x2 + s2 + margin and x1 + s1 + margin > x2 and y1 < y2 + s2 + margin and y1 + s1 + margin > y2
+                assert not overlap
+
+
+class TestEmojiAtlas:
+    @pytest.fixture
+    def image_dir(self, tmp_path):
+        folder = tmp_path / "emoji"
+        folder.mkdir()
+        Image.new("RGBA", (72, 72), (255, 0, 0, 255)).save(folder / "1f602.png")
+        Image.new("RGBA", (72, 36), (0, 255, 0, 255)).save(folder / "2764.png")
+        return folder
+
+    def test_glyph_from_image_dir_fits_square(self, image_dir, tmp_path):
+        atlas = EmojiAtlas(font_path=None, image_dir=image_dir, cache_dir=tmp_path / "cache")
+
+        glyph = atlas.glyph("😂", 40)
+
+        assert glyph.size == (40, 40)
+        assert glyph.getpixel((20, 20)) == (255, 0, 0, 255)
+
+    def test_variation_selector_falls_back_to_base_codepoint(self, image_dir):
+        atlas = EmojiAtlas(font_path=None, image_dir=image_dir, cache_dir=None)
+
+        glyph = atlas.glyph("❤️", 40)
+
+        assert glyph.getbbox() == (0, 10, 40, 30)
+
+    def test_glyphs_are_persisted_and_reused(self, image_dir, tmp_path, monkeypatch):
+        cache = tmp_path / "cache"
+        EmojiAtlas(font_path=None, image_dir=image_dir, cache_dir=cache).glyph("😂", 30)
+        monkeypatch.setattr(EmojiAtlas, "_render", lambda self, emoji_char, size: None)
+
+        glyph = EmojiAtlas(font_path=None, image_dir=image_dir, cache_dir=cache).glyph("😂", 30)
+
+        assert len(list(cache.glob("images-*/30/1f602.png"))) == 1
+        assert glyph is not None
+
+    def test_changed_images_are_not_served_from_cache(self, image_dir, tmp_path):
+        cache = tmp_path / "cache"
+        EmojiAtlas(font_path=None, image_dir=image_dir, cache_dir=cache).glyph("😂", 30)
+        png = image_dir / "1f602.png"
+        Image.new("RGBA", (72, 72), (0, 0, 255, 255)).save(png)
+        os.utime(png, ns=(png.stat().st_atime_ns, png.stat().st_mtime_ns + 1_000_000_000))
+
+        glyph = EmojiAtlas(font_path=None, image_dir=image_dir, cache_dir=cache).glyph("😂", 30)
+
+        assert glyph.getpixel((15, 15)) == (0, 0, 255, 255)
+        assert len(list(cache.glob("images-*"))) == 2
+
+    def test_unrenderable_emoji_returns_none(self, tmp_path):
+        atlas = EmojiAtlas(font_path=str(tmp_path / "missing.ttf"), image_dir=tmp_path, cache_dir=None)
+
+        assert atlas.glyph("😂", 30) is None
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from mca.core.ingest import load_messages
+from mca.core.schema import SchemaError
+from mca.core.storage import INBOX, FolderExport
+
+CHAT = "ola_abc123"
+MESSAGES = [
+    {"sender_name": "Ola", "timestamp_ms": 4, "content": "hej", "reactions": [{"reaction": "👍", "actor": "Ela"}]},
+    {"sender_name": "Ela", "timestamp_ms": 3, "photos": [{"uri": "photos/1.jpg", "creation_timestamp": 3}]},
+    {"sender_name": "Ola", "timestamp_ms": 2, "content": "co tam", "share": {"link": "https://example.com"}},
+    {"timestamp_ms": 1, "content": "bez nadawcy"},
+    {"sender_name": "Ela", "content": "bez czasu"},
+    {"sender_name": "Ela", "timestamp_ms": "1", "content": "czas jako tekst"},
+]
+HEADER = {"participants": [{"name": "Ola"}, {"name": "Ela"}], "title": "Ola", "thread_path": f"inbox/{CHAT}"}
+
+
+def _export(tmp_path, pages):
+    chat = tmp_path / "facebook-x" / INBOX / CHAT
+    chat.mkdir(parents=True)
+    for n, messages in enumerate(pages, 1):
+        page = {**HEADER, "messages": messages}
+        (chat / f"message_{n}.json").write_text(json.dumps(page), encoding="utf-8")
+    export = FolderExport(tmp_path / "facebook-x")
+    return export, export.message_pages(CHAT)
+
+
+def test_pages_are_merged_and_decoded_in_order(tmp_path):
+    first = {"sender_name": "Ela", "timestamp_ms": 0, "content": "pierwsza"}
+    export, names = _export(tmp_path, [MESSAGES[:2], MESSAGES[2:], [first]])
+    skipped = []
+
+    data, typed = load_messages(export, names, skipped)
+
+    assert data == {**HEADER, "messages": [*MESSAGES[:3], first]}
+    assert [m.timestamp_ms for m in typed] == [4, 3, 2, 0]
+    assert typed[0].reactions[0].actor == "Ela"
+    assert typed[0].sender_name is typed[2].sender_name is data["participants"][0]["name"]
+    page = names[1]
+    assert skipped == [
+        f"{page}: $.messages[1]: missing required field 'sender_name'",
+        f"{page}: $.messages[2]: missing required field 'timestamp_ms'",
+        f"{page}: $.messages[3].timestamp_ms: expected int, got str",
+    ]
+
+
+def test_malformed_message_raises_without_skipped(tmp_path):
+    export, names = _export(tmp_path, [MESSAGES])
+
+    with pytest.raises(SchemaError, match=r"message_1\.json: \$\.messages\[5\]\.timestamp_ms: expected int, got str$"):
+        load_messages(export, names)
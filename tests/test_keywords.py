@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from mca.nlp.keywords import KeywordIndex
+
+
+class TestKeywordIndex:
+    def test_tf_scoring_ranks_by_frequency(self):
+        index = KeywordIndex(scoring="tf").fit([["kot", "pies", "kot", "ryba", "kot", "pies"]])
+
+        assert index.top_terms(0, 3) == ["kot", "pies", "ryba"]
+
+    def test_filler_word_loses_to_thread_specific_word(self):
+        # "dobra" is in every thread, "rower" only in the first one
+        docs = [
+            ["dobra", "dobra", "dobra", "rower", "rower"],
+            ["dobra", "dobra", "mecz"],
+            ["dobra", "pizza"],
+        ]
+        for scoring in ("tfidf", "bm25"):
+            index = KeywordIndex(scoring=scoring).fit(docs)
+            assert index.top_terms(0, 1) == ["rower"]
+
+    def test_ties_keep_first_seen_order(self):
+        index = KeywordIndex().fit([["alfa", "beta", "gamma"]])
+
+        assert index.top_terms(0, 3) == ["alfa", "beta", "gamma"]
+
+    def test_empty_document(self):
+        index = KeywordIndex().fit([[], ["kot"]])
+
+        assert index.top_terms(0, 5) == []
+        assert index.top_terms(1, 5) == ["kot"]
+
+    def test_matrix_is_document_by_term(self):
+        index = KeywordIndex().fit([["a", "b", "a"], ["b"]])
+
+        assert index.matrix.shape == (2, 2)
+        assert index.matrix[0, index.vocab["a"]] == 2
+        assert index.term_frequencies() == {"a": 2.0, "b": 2.0}
+
+    def test_unknown_scoring_raises(self):
+        with pytest.raises(ValueError):
+            KeywordIndex(scoring="lsa")
+
+
+class TestKeywordIndexPersistence:
+    def test_prior_periods_add_document_frequencies(self, tmp_path):
+        path = tmp_path / "df.json"
+        KeywordIndex().fit([["dobra"], ["dobra"], ["dobra", "rower"]]).save_period(path, "2024-01")
+
+        index = KeywordIndex().load_prior(path, exclude_period="2024-02").fit([["dobra", "dobra", "mecz"]])
+
+        assert index.n_docs == 4
+        assert index.top_terms(0, 1) == ["mecz"]
+
+    def test_saving_same_period_replaces_entry(self, tmp_path):
+        path = tmp_path / "df.json"
+        KeywordIndex().fit([["a"], ["a"]]).save_period(path, "2024-01")
+        KeywordIndex().fit([["a"]]).save_period(path, "2024-01")
+
+        store = json.loads(path.read_text(encoding="utf-8"))
+        assert store["periods"]["2024-01"] == {"n_docs": 1, "df": {"a": 1}}
+
+    def test_excluded_period_is_skipped(self, tmp_path):
+        path = tmp_path / "df.json"
+        KeywordIndex().fit([["a"], ["a"]]).save_period(path, "2024-01")
+
+        index = KeywordIndex().load_prior(path, exclude_period="2024-01").fit([["a"]])
+
+        assert index.n_docs == 1
+
+    def test_missing_file_is_ignored(self, tmp_path):
+        index = KeywordIndex().load_prior(tmp_path / "nope.json").fit([["a"]])
+
+        assert index.n_docs == 1
@@ -1,10 +1,13 @@
+import json
 import os
 import tempfile
 from unittest.mock import patch
 
 import pytest
 
-from mca.analytics.links import get_topn_links
+from mca.analytics.links import aggregate_links, get_topn_links, normalize_url, write_links_report
+from mca.config import constants
+from mca.core.parsed_messages import ParsedMessage
 
 
 class TestGetTopnLinks:
@@ -160,3 +163,86 @@ class TestGetTopnLinks:
                 result, count = get_topn_links(data, top_n=15)
 
         assert count == 2
+
+
+def _msg(sender, urls, num_reactions):
+    return ParsedMessage(
+        sender=sender, content="", timestamp_ms=0, date="2024-01-01", num_reactions=num_reactions, urls=urls
+    )
+
+
+class TestNormalizeUrl:
+    @pytest.mark.parametrize(
+        "url, expected",
+        [
+            ("https://www.Example.com/page/", "example.com/page"),
+            ("example.com/page#section", "example.com/page"),
+            ("youtu.be/abc?si=xyz", "youtu.be/abc"),
+            ("shop.com/item?id=3&utm_source=fb&fbclid=1", "shop.com/item?id=3"),
+        ],
+    )
+    def test_normalizes(self, url, expected):
+        assert normalize_url(url) == expected
+
+
+class TestAggregateLinks:
+    @pytest.fixture
+    def messages(self):
+        return [
+            _msg("User1", ["example.com/page"], 2),
+            _msg("User2", ["www.example.com/page/", "example.com/other"], 1),
+            _msg("User1", ["example.com/page?utm_source=x"], 0),
+            _msg("User3", ["news.org/a"], 0),
+        ]
+
+    def test_dedupes_normalised_urls(self, messages):
+        stats = aggregate_links(messages)
+
+        assert list(stats) == ["example.com/page", "example.com/other", "news.org/a"]
+        page = stats["example.com/page"]
+        assert page.shares == 3
+        assert page.reactions == 3
+        assert page.senders == {"User1": 2, "User2": 1}
+        assert page.top_sender == "User1"
+
+    def test_reports_show_the_first_shared_link(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        os.makedirs(constants.results_dir())
+        messages = [_msg("User1", ["www.example.com/page/?utm_source=x"], 1), _msg("User2", ["example.com/page"], 1)]
+
+        stats = aggregate_links(messages)
+        result, _ = get_topn_links(messages)
+
+        assert list(stats) == ["example.com/page"]
+        assert result[0]["URL"] == "www.example.com/page/?utm_source=x"
+        report = (tmp_path / constants.results_dir() / "links.txt").read_text(encoding="UTF-8")
+        assert report.startswith("www.example.com/page/?utm_source=x (sent by User1, User2)")
+
+    def test_groups_by_domain(self, messages):
+        stats = aggregate_links(messages, by="domain")
+
+        assert stats["example.com"].shares == 4
+        assert stats["example.com"].reactions == 4
+
+    def test_unknown_grouping_raises(self, messages):
+        with pytest.raises(ValueError):
+            aggregate_links(messages, by="sender")
+
+    @pytest.mark.parametrize("fmt", ["txt", "csv", "json"])
+    def test_report_lists_only_reacted_links(self, messages, tmp_path, fmt):
+        path = write_links_report(aggregate_links(messages).values(), tmp_path / f"links.{fmt}", fmt=fmt)
+        text = path.read_text(encoding="UTF-8")
+
+        assert "example.com/page" in text
+        assert "news.org" not in text
+        if fmt == "json":
+            assert [row["url"] for row in json.loads(text)] == ["example.com/page", "example.com/other"]
+
+    def test_topn_uses_aggregated_reactions(self, messages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        os.makedirs(constants.results_dir())
+
+        result, count = get_topn_links(messages, top_n=15)
+
+        assert count == 2
+        assert result[0] == {"URL": "example.com/page", "Sender": "User1", "Num_reactions": 3, "Shares": 3}
@@ -1,4 +1,8 @@
 # Fix #21: tests for main.py functions (previously zero coverage)
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
 from mca.core.normalizer import standarize
@@ -148,3 +152,124 @@ def test_pick_chat_to_analyze_invalid_choice_returns_none(monkeypatch, tmp_path)
 
     result = pick_chat_to_analyze("fb")
     assert result is None
+
+
+def test_import_does_not_load_analysis_libraries():
+    # the chat picker should not wait for the heavy libraries; they load inside the steps
+    code = (
+        "import sys, main; "
+        "print(','.join(m for m in ('matplotlib', 'nltk', 'sklearn', 'PIL', 'wordcloud', 'ollama', 'emoji')"
+        " if m in sys.modules))"
+    )
+    root = Path(__file__).resolve().parents[1]
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
+
+
+# ---------------------------------------------------------------------------
+# load_chat()
+# ---------------------------------------------------------------------------
+
+
+def test_load_chat_merges_pages_from_a_zip(tmp_path, monkeypatch):
+    import json
+    import zipfile
+
+    from main import load_chat
+
+    inbox = "your_facebook_activity/messages/inbox/alice_abc123"
+    with zipfile.ZipFile(tmp_path / "facebook-alice.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+        for n in (1, 2):
+            message = {"sender_name": "Alice", "timestamp_ms": 3 - n, "content": f"page {n}"}
+            page = {"participants": [{"name": "Alice"}], "messages": [message]}
+            zf.writestr(f"{inbox}/message_{n}.json", json.dumps(page))
+    monkeypatch.chdir(tmp_path)
+
+    data, typed = load_chat("facebook-alice.zip", "alice_abc123")
+
+    assert [m["content"] for m in data["messages"]] == ["page 1", "page 2"]
+    assert [m.content for m in typed["messages"]] == ["page 1", "page 2"]
+
+
+def test_load_chat_skips_and_locates_malformed_messages(tmp_path, capsys):
+    import json
+
+    from main import load_chat
+
+    chat = tmp_path / "fb" / "your_facebook_activity" / "messages" / "inbox" / "alice_abc123"
+    chat.mkdir(parents=True)
+    pages = [
+        [{"sender_name": "Alice", "timestamp_ms": 4}, {"timestamp_ms": 3, "content": "unsent"}],
+        [
+            {"sender_name": "Alice", "timestamp_ms": 2, "reactions": [{"reaction": "👍", "actor": 7}]},
+            {"sender_name": "Alice", "timestamp_ms": 1, "reactions": [{"reaction": "👍", "actor": "Alice"}]},
+        ],
+    ]
+    for n, messages in enumerate(pages, 1):
+        (chat / f"message_{n}.json").write_text(json.dumps({"participants": [{"name": "Alice"}], "messages": messages}))
+
+    data, typed = load_chat(tmp_path / "fb", "alice_abc123")
+
+    assert [m["timestamp_ms"] for m in data["messages"]] == [4, 1]
+    assert [m.timestamp_ms for m in typed["messages"]] == [4, 1]
+    assert typed["messages"][1].reactions[0].actor == "Alice"
+    out = capsys.readouterr().out
+    assert "Skipped 2 messages that could not be read" in out
+    assert "alice_abc123/message_1.json: $.messages[1]: missing required field 'sender_name'; " in out
+    assert out.rstrip().endswith("alice_abc123/message_2.json: $.messages[0].reactions[0].actor: expected str, got int")
+
+
+def test_load_chat_reports_a_malformed_page(tmp_path, capsys):
+    import json
+
+    from main import load_chat
+
+    chat = tmp_path / "fb" / "your_facebook_activity" / "messages" / "inbox" / "alice_abc123"
+    chat.mkdir(parents=True)
+    (chat / "message_1.json").write_text(json.dumps({"participants": [], "messages": {"0": {}}}))
+
+    assert load_chat(tmp_path / "fb", "alice_abc123") is None
+    assert "message_1.json: $.messages: expected array, got object" in capsys.readouterr().out
+
+
+def test_load_month_decodes_the_filtered_window(tmp_path):
+    import json
+    from datetime import datetime
+
+    from main import load_month
+    from mca.core.interval import MessageWindow
+
+    chat = tmp_path / "fb" / "your_facebook_activity" / "messages" / "inbox" / "alice_abc123"
+    chat.mkdir(parents=True)
+    days = [(3, 20), (3, 15), (3, 10), (3, 5), (2, 28)]
+    messages = [
+        {"sender_name": "Alice", "timestamp_ms": int(datetime(2024, m, d, 12).timestamp() * 1000), "content": f"{d}.{m}"}
+        for m, d in days
+    ]
+    for n, page in enumerate((messages[:3], messages[3:]), 1):
+        (chat / f"message_{n}.json").write_text(json.dumps({"participants": [{"name": "Alice"}], "messages": page}))
+
+    data, typed = load_month(tmp_path / "fb", "alice_abc123")
+
+    assert isinstance(data["messages"], MessageWindow)
+    assert [m.content for m in typed["messages"]] == ["20.3", "15.3", "10.3", "5.3"]
+
+
+def test_pick_chat_to_analyze_filters_by_text(monkeypatch, tmp_path):
+    import json
+
+    from main import pick_chat_to_analyze
+
+    messages = tmp_path / "fb" / "your_facebook_activity" / "messages"
+    for folder, chat in (("inbox", "alice_abc123"), ("archived_threads", "bob_def456")):
+        (messages / folder / chat).mkdir(parents=True)
+        page = {"participants": [{"name": chat}], "messages": [{"timestamp_ms": 0}], "title": chat.split("_")[0]}
+        (messages / folder / chat / "message_1.json").write_text(json.dumps(page))
+    answers = iter(["bob", "1"])
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.input", lambda _: next(answers))
+
+    picked = pick_chat_to_analyze("fb")
+
+    assert (picked.folder, picked.chat) == ("archived_threads", "bob_def456")
@@ -0,0 +1,100 @@
+import copy
+import json
+
+import pytest
+
+from mca.core import jsonbackend
+from mca.core.normalizer import fix_escaped_utf8, intern_names, loads_export, standarize
+
+
+def _facebook_json(data):
+    """JSON the way Facebook writes it: every UTF-8 byte of non-ASCII text as its own \\u00XX escape."""
+    mangled = json.loads(json.dumps(data), object_hook=_mangle_object)
+    return json.dumps(mangled).encode("ascii")
+
+
+def _mangle(value):
+    return value.encode("utf-8").decode("latin1") if isinstance(value, str) else value
+
+
+def _mangle_object(obj):
+    return {key: _mangle(value) for key, value in obj.items()}
+
+
+PAGE = {
+    "participants": [{"name": "Łukasz Żółw"}, {"name": "Ola"}],
+    "messages": [
+        {
+            "sender_name": "Łukasz Żółw",
+            "timestamp_ms": 2,
+            "content": 'Zażółć gęślą jaźń 😀 "cytat" \\ koniec\n',
+            "reactions": [{"reaction": "❤️", "actor": "Ola"}],
+        },
+        {
+            "sender_name": "Łukasz Żółw",
+            "timestamp_ms": 1,
+            "share": {"link": "https://example.com", "share_text": "Śmieszne"},
+        },
+    ],
+    "title": "Grupa ąę",
+}
+
+
+def test_every_string_field_is_repaired():
+    raw = _facebook_json(PAGE)
+    assert b"\\u00c5\\u0081" in raw  # "Ł" the way exports write it
+
+    assert loads_export(raw) == PAGE
+
+
+def test_matches_standarize_on_the_fields_it_covers():
+    raw = _facebook_json(PAGE)
+    legacy = json.loads(raw)
+    standarize(legacy)
+
+    fixed = loads_export(raw)
+
+    assert fixed["participants"] == legacy["participants"]
+    assert [m["sender_name"] for m in fixed["messages"]] == [m["sender_name"] for m in legacy["messages"]]
+    assert fixed["messages"][0]["content"] == legacy["messages"][0]["content"]
+
+
+def test_escaped_backslash_before_u00_text_is_left_alone():
+    raw = json.dumps({"content": "\\u00c5\\u0082"}).encode()  # literal backslashes in the message
+
+    assert fix_escaped_utf8(raw) == raw
+    assert loads_export(raw)["content"] == "\\u00c5\\u0082"
+
+
+def test_latin1_escapes_that_are_not_utf8_stay_escaped():
+    raw = b'{"content": "caf\\u00e9"}'
+
+    assert fix_escaped_utf8(raw) == raw
+    assert loads_export(raw)["content"] == "café"
+
+
+def test_already_correct_json_is_unchanged():
+    raw = json.dumps(PAGE, ensure_ascii=False).encode("utf-8")
+
+    assert fix_escaped_utf8(raw) == raw
+    assert fix_escaped_utf8(json.dumps(PAGE).encode()) == json.dumps(PAGE).encode()
+
+
+def test_names_are_interned():
+    data = loads_export(_facebook_json(PAGE))
+    first, second = data["messages"]
+
+    assert first["sender_name"] is second["sender_name"] is data["participants"][0]["name"]
+    assert first["reactions"][0]["actor"] is data["participants"][1]["name"]
+    assert intern_names(copy.deepcopy(data)) == data
+
+
+def test_json_backend_selection():
+    assert jsonbackend.BACKEND in jsonbackend.BACKENDS
+    try:
+        assert jsonbackend.select_backend("json") == "json"
+        assert loads_export(_facebook_json(PAGE)) == PAGE
+        with pytest.raises(ValueError):
+            jsonbackend.select_backend("simdjson")
+    finally:
+        jsonbackend.select_backend()
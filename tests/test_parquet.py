@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+
+from mca.analytics.activity import get_most_active_days
+from mca.analytics.message_length import get_average_message_length
+from mca.core import parquet
+from mca.core.parsed_messages import parse_messages
+from mca.ml.features import FEATURE_NAMES, build_day_features
+
+
+def _ms(month, day, hour=12):
+    return int(datetime(2024, month, day, hour).timestamp() * 1000)
+
+
+DATA = {
+    "messages": [
+        {"sender_name": "Ola", "timestamp_ms": _ms(4, 2, 22), "content": "hej 😀 https://example.com/a"},
+        {"sender_name": "Ela", "timestamp_ms": _ms(4, 2, 9), "photos": [{"uri": "photos/1.jpg"}]},
+        {"sender_name": "Jan", "timestamp_ms": _ms(3, 30), "content": "Jan pinned a message."},
+        {
+            "sender_name": "Ola",
+            "timestamp_ms": _ms(3, 30, 8),
+            "content": "pizza",
+            "reactions": [{"reaction": "👍", "actor": "Ela"}],
+        },
+    ]
+}
+
+
+def test_message_columns():
+    columns = parquet.message_columns(parse_messages(DATA))
+
+    assert columns["sender"] == ["Ola", "Ela", "Jan", "Ola"]
+    assert columns["hour"] == [22, 9, 12, 8]
+    assert columns["urls"][0] == ["example.com/a"]
+    assert columns["emojis"][0] == ["😀"]
+    assert columns["num_photos"] == [0, 1, 0, 0]
+    assert columns["is_builtin"] == [False, False, True, False]
+    assert (columns["year"], columns["month"]) == ([2024] * 4, [4, 4, 3, 3])
+
+
+def test_day_feature_columns():
+    columns = parquet.day_feature_columns(build_day_features(DATA))
+
+    assert columns["date"] == ["2024-03-30", "2024-04-02"]
+    assert columns["msg_count"] == [1.0, 2.0]
+    assert set(FEATURE_NAMES) < columns.keys()
+    assert columns["month"] == [3, 4]
+
+
+def test_round_trip(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    messages = parse_messages(DATA)
+    features_per_day = build_day_features(DATA)
+
+    parquet.write_chat(tmp_path, messages, features_per_day)
+    parquet.write_chat(tmp_path, messages, features_per_day)
+
+    assert sorted(p.relative_to(tmp_path).parent.as_posix() for p in tmp_path.rglob("*.parquet")) == [
+        "day_features/year=2024/month=3",
+        "day_features/year=2024/month=4",
+        "messages/year=2024/month=3",
+        "messages/year=2024/month=4",
+    ]
+    table = parquet.read_messages(tmp_path)
+    assert pa.types.is_dictionary(table.schema.field("sender").type)
+    assert parquet.parsed_messages(table) == messages
+    assert get_most_active_days(parquet.parsed_messages(table)) == get_most_active_days(messages)
+
+    march = parquet.read_messages(tmp_path, filters=[("month", "=", 3)])
+    assert march.column("content").to_pylist() == ["Jan pinned a message.", "pizza"]
+    timestamps = march.column("timestamp_ms").chunks[0].to_numpy(zero_copy_only=True)
+    assert timestamps.tolist() == [_ms(3, 30), _ms(3, 30, 8)]
+
+    days = parquet.day_features(parquet.read_day_features(tmp_path))
+    assert days.keys() == features_per_day.keys()
+    for date, vector in features_per_day.items():
+        assert days[date].tolist() == vector.tolist()
+
+
+def test_column_statistics_match_the_row_functions(tmp_path):
+    pytest.importorskip("pyarrow")
+    data = {
+        "messages": [
+            *DATA["messages"],
+            {"sender_name": "Ela", "timestamp_ms": _ms(3, 29), "content": "zażółć"},
+            {"sender_name": "Ola", "timestamp_ms": _ms(3, 28), "content": ""},
+            {"sender_name": "Jan", "timestamp_ms": _ms(3, 27), "content": "a"},
+        ]
+    }
+    messages = parse_messages(data)
+    features_per_day = build_day_features(data)
+    parquet.write_chat(tmp_path, messages, features_per_day)
+    table = parquet.read_messages(tmp_path)
+
+    for top_n in (1, 2, 10):
+        assert parquet.get_most_active_days(table, top_n) == get_most_active_days(messages, top_n)
+    assert parquet.get_average_message_length(table) == get_average_message_length(messages)
+
+    dates, matrix = parquet.day_feature_matrix(parquet.read_day_features(tmp_path))
+    assert dates == sorted(features_per_day)
+    assert matrix.tolist() == [features_per_day[date].tolist() for date in dates]
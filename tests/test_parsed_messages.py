@@ -8,7 +8,7 @@ T = 1_700_000_000_000  # arbitrary base timestamp
 def _msg(sender, *, ts_offset=0, reactions=None, photos=None, videos=None, content=None):
     m = {"sender_name": sender, "timestamp_ms": T + ts_offset}
     if reactions:
-        m["reactions"] = reactions
+        m["reactions"] = [{"reaction": r, "actor": "Carol"} for r in reactions]
     if photos:
         m["photos"] = [{"uri": p} for p in photos]
     if videos:
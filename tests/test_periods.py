@@ -0,0 +1,83 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+
+from mca.analytics.activity import get_most_active_days
+from mca.analytics.links import aggregate_links
+from mca.analytics.media import get_most_reactedto_photos, get_most_reactedto_videos
+from mca.analytics.message_length import get_average_message_length
+from mca.analytics.periods import PeriodStats, aggregate_periods
+from mca.core.interval import partition_by_period
+from mca.core.parsed_messages import parse_messages
+from mca.viz.emojis import extract_emojis
+from mca.viz.word_cloud import count_most_used_words
+
+
+def _ms(*args):
+    return int(datetime(*args, 12, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+@pytest.fixture
+def chat():
+    messages = [
+        {"sender_name": "Alice", "timestamp_ms": _ms(2024, 1, 3), "content": "kot pies kot 😀"},
+        {"sender_name": "Bob", "timestamp_ms": _ms(2024, 1, 3), "content": "https://example.com/a"},
+        {"sender_name": "Bob", "timestamp_ms": _ms(2024, 1, 8), "reactions": [{"reaction": "❤", "actor": "Alice"}] * 2},
+        {"sender_name": "Bob", "timestamp_ms": _ms(2024, 1, 9), "photos": [{"uri": "p1.jpg"}]},
+        {"sender_name": "Alice", "timestamp_ms": _ms(2024, 1, 20), "content": "Alice pinned a message."},
+        {"sender_name": "Alice", "timestamp_ms": _ms(2024, 2, 2), "content": "pies 😀😀"},
+        {"sender_name": "Bob", "timestamp_ms": _ms(2024, 2, 5), "videos": [{"uri": "v1.mp4"}]},
+        {"sender_name": "Alice", "timestamp_ms": _ms(2024, 2, 5), "content": "https://www.example.com/a/"},
+        {"sender_name": "Bob", "timestamp_ms": _ms(2024, 2, 6), "content": ""},
+    ]
+    messages.reverse()  # newest first, like the export
+    return {"participants": [{"name": "Alice"}, {"name": "Bob"}], "messages": messages}
+
+
+@pytest.fixture
+def periods(chat):
+    partitions = partition_by_period(parse_messages(chat), "month", timezone.utc)
+    return aggregate_periods(partitions, stop_words=frozenset())
+
+
+def _month(chat, label):
+    raw = partition_by_period(chat["messages"], "month", timezone.utc)[label]
+    return raw[:], partition_by_period(parse_messages(chat), "month", timezone.utc)[label]
+
+
+@pytest.mark.parametrize("label", ["2024-01", "2024-02"])
+def test_period_matches_single_statistic_functions(chat, periods, label, monkeypatch):
+    monkeypatch.setattr("mca.viz.word_cloud.stopwords_polish", frozenset)
+    raw, messages = _month(chat, label)
+    stats = periods[label]
+
+    assert stats.messages == len(messages)
+    assert stats.most_active_days() == get_most_active_days(messages)
+    assert stats.average_message_lengths() == get_average_message_length(messages)
+    assert stats.emojis == extract_emojis(messages)
+    assert stats.words == count_most_used_words({"messages": raw})[0]
+    assert stats.links.keys() == aggregate_links(messages).keys()
+    assert stats.photos == get_most_reactedto_photos(messages)
+    assert stats.videos == get_most_reactedto_videos(messages)
+
+
+def test_member_counts_skip_builtin_messages(periods):
+    assert periods["2024-01"].member_messages == Counter({"Bob": 3, "Alice": 1})
+    assert periods["2024-02"].member_messages == Counter({"Alice": 2, "Bob": 2})
+
+
+def test_reactions_next_to_a_photo_go_to_the_photo(periods):
+    assert periods["2024-01"].photos == [{"sent_by": "Bob", "photo": "p1.jpg", "num_reactions": 2}]
+
+
+def test_links_are_counted_per_period(periods):
+    assert periods["2024-01"].links["example.com/a"].shares == 1
+    assert periods["2024-02"].links["example.com/a"].senders == Counter({"Alice": 1})
+
+
+def test_empty_period_stats():
+    stats = PeriodStats("2024-W01")
+
+    assert stats.average_message_lengths() == {}
+    assert stats.most_active_days() == ([], 3)
@@ -1,10 +1,18 @@
+import io
+import os
+import sys
+
 import pytest
+from PIL import Image
 
 from mca.analytics.media import (
+    annotate_photo,
+    display_topn_photos,
     get_most_reactedto_photos,
     get_most_reactedto_videos,
     get_topn_photos,
     get_topn_videos,
+    save_topn_videos,
 )
 
 
@@ -186,3 +194,122 @@ class TestGetTopnVideos:
 
         assert len(result) == 2
         assert result == [{"num_reactions": 2}, {"num_reactions": 1}]
+
+
+class TestDisplayTopnPhotos:
+    @pytest.fixture
+    def chat_folder(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        Image.new("RGB", (5000, 3000), "red").save(tmp_path / "huge.jpg", quality=90)
+        Image.new("RGBA", (300, 200), (0, 0, 255, 128)).save(tmp_path / "small.png")
+        return tmp_path
+
+    def test_huge_photo_is_decoded_downscaled(self, chat_folder):
+        with Image.open(io.BytesIO(annotate_photo(str(chat_folder / "huge.jpg"), "User1 7"))) as im:
+            assert im.format == "JPEG"
+            assert max(im.size) < 2 * 2048
+            assert im.width / (im.height - 40) == pytest.approx(5 / 3, rel=0.01)
+
+    def test_small_photo_keeps_size_with_caption_strip(self, chat_folder):
+        with Image.open(io.BytesIO(annotate_photo(str(chat_folder / "small.png"), "User2 3"))) as im:
+            assert im.size == (300, 220)
+            assert im.mode == "RGB"
+
+    def test_saved_in_ranking_order_skipping_broken(self, chat_folder):
+        photos = [
+            {"photo": "huge.jpg", "sent_by": "User1", "num_reactions": 7},
+            {"photo": "missing.jpg", "sent_by": "User3", "num_reactions": 5},
+            {"photo": "small.png", "sent_by": "User2", "num_reactions": 3},
+        ]
+        display_topn_photos(photos, str(chat_folder), debug=False, max_workers=2)
+
+        out_dir = next(chat_folder.glob("results-*")) / "top3photos"
+        assert sorted(os.listdir(out_dir)) == ["photo1.jpg", "photo2.jpg"]
+        with Image.open(out_dir / "photo2.jpg") as im:
+            assert im.size == (300, 220)
+
+
+_FAKE_FFMPEG = """#!/bin/sh
+# logs the call and copies the input (the argument after -i) to the output (the last argument)
+echo "$@" >> "$FAKE_FFMPEG_LOG"
+while [ "$1" != "-i" ]; do shift; done
+src="$2"
+for last; do :; done
+cp "$src" "$last"
+"""
+
+_FAKE_FFPROBE = """#!/bin/sh
+cat "$FAKE_FFPROBE_JSON"
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fake ffmpeg is a shell script")
+class TestSaveTopnVideos:
+    @pytest.fixture
+    def fake_ffmpeg(self, tmp_path, monkeypatch):
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        for name, script in (("ffmpeg", _FAKE_FFMPEG), ("ffprobe", _FAKE_FFPROBE)):
+            (bin_dir / name).write_text(script)
+            (bin_dir / name).chmod(0o755)
+        log = tmp_path / "ffmpeg.log"
+        log.touch()
+        probe = tmp_path / "probe.json"
+        probe.write_text('{"streams": [{"codec_type": "video", "codec_name": "hevc", "width": 1920, "height": 1080}]}')
+        monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        monkeypatch.setenv("FAKE_FFMPEG_LOG", str(log))
+        monkeypatch.setenv("FAKE_FFPROBE_JSON", str(probe))
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "a.mp4").write_bytes(b"video a")
+        (tmp_path / "b.mp4").write_bytes(b"video b")
+        return tmp_path, log, probe
+
+    def _videos(self, *names):
+        return [{"video": name, "sent_by": "User1", "num_reactions": 1} for name in names]
+
+    def test_repeat_run_is_served_from_cache(self, fake_ffmpeg):
+        folder, log, _ = fake_ffmpeg
+        cache = folder / "cache"
+
+        save_topn_videos(self._videos("a.mp4", "b.mp4"), str(folder), cache_dir=str(cache))
+        save_topn_videos(self._videos("a.mp4", "b.mp4"), str(folder), cache_dir=str(cache))
+
+        calls = log.read_text().splitlines()
+        assert len(calls) == 2
+        assert all("libx264" in call for call in calls)
+        out_dir = next(folder.glob("results-*")) / "top3videos"
+        assert (out_dir / "video1.mp4").read_bytes() == b"video a"
+        assert (out_dir / "video2.mp4").read_bytes() == b"video b"
+
+    def test_identical_sources_share_one_cache_entry(self, fake_ffmpeg):
+        folder, _, _ = fake_ffmpeg
+        cache = folder / "cache"
+        (folder / "c.mp4").write_bytes(b"video a")
+
+        save_topn_videos(self._videos("a.mp4", "c.mp4"), str(folder), cache_dir=str(cache))
+
+        out_dir = next(folder.glob("results-*")) / "top3videos"
+        assert (out_dir / "video1.mp4").read_bytes() == (out_dir / "video2.mp4").read_bytes() == b"video a"
+        assert len(os.listdir(cache)) == 1
+        assert not list(cache.glob("*.part.mp4"))
+
+    def test_target_format_is_stream_copied(self, fake_ffmpeg):
+        folder, log, probe = fake_ffmpeg
+        probe.write_text(
+            '{"streams": [{"codec_type": "video", "codec_name": "h264", "width": 1280, "height": 720},'
+            ' {"codec_type": "audio", "codec_name": "aac"}]}'
+        )
+
+        save_topn_videos(self._videos("a.mp4"), str(folder), cache_dir=str(folder / "cache"))
+
+        (call,) = log.read_text().splitlines()
+        assert "-c copy" in call
+        assert "libx264" not in call
+
+    def test_missing_source_is_skipped(self, fake_ffmpeg):
+        folder, log, _ = fake_ffmpeg
+
+        save_topn_videos(self._videos("missing.mp4", "a.mp4"), str(folder), cache_dir=str(folder / "cache"))
+
+        out_dir = next(folder.glob("results-*")) / "top3videos"
+        assert sorted(os.listdir(out_dir)) == ["video2.mp4"]
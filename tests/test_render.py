@@ -0,0 +1,104 @@
+import matplotlib.pyplot as plt
+import pytest
+from matplotlib.ticker import FuncFormatter
+
+from mca.analytics.activity import most_active_days_figure
+from mca.analytics.message_length import average_message_lengths_figure
+from mca.ml.label_days import label_calendar_figure
+from mca.viz.render import FigureExporter, export_figure, new_figure
+
+
+def _figure(value=1):
+    fig = new_figure(figsize=(2, 2))
+    fig.subplots().bar(["a"], [value])
+    return fig
+
+
+class TestNewFigure:
+    def test_does_not_touch_pyplot_state(self):
+        before = plt.get_fignums()
+
+        _figure()
+        most_active_days_figure([("2024-01-01", 5), ("2024-01-02", 3)], 2, day_labels={"2024-01-01": "chill"})
+        average_message_lengths_figure({"User1": 10, "User2": 4})
+        label_calendar_figure({"2024-01-01": "chill", "2024-01-09": "hype"})
+
+        assert plt.get_fignums() == before
+
+    def test_shown_figures_are_created_through_pyplot(self):
+        fig = new_figure(figsize=(2, 2), show=True)
+        try:
+            assert plt.fignum_exists(fig.number)
+        finally:
+            plt.close(fig)
+
+
+class TestFigureExporter:
+    def test_writes_files_in_submission_order(self, tmp_path):
+        paths = [tmp_path / "out" / f"chart_{i}.png" for i in range(5)]
+        with FigureExporter(max_workers=3) as exporter:
+            for i, path in enumerate(paths):
+                exporter.submit(_figure(i + 1), path)
+            written = exporter.wait()
+
+        assert written == paths
+        assert all(p.stat().st_size > 0 for p in paths)
+
+    def test_output_is_deterministic(self, tmp_path):
+        with FigureExporter() as exporter:
+            exporter.submit(_figure(), tmp_path / "a.png")
+            exporter.submit(_figure(), tmp_path / "b.png")
+
+        assert (tmp_path / "a.png").read_bytes() == (tmp_path / "b.png").read_bytes()
+
+    def test_export_errors_are_raised(self, tmp_path):
+        exporter = FigureExporter()
+        exporter.submit(_figure(), tmp_path / "chart.unknownformat")
+
+        with pytest.raises(ValueError):
+            exporter.close()
+
+    def test_unpicklable_figures_are_saved_in_place(self, tmp_path):
+        fig = _figure()
+        fig.axes[0].yaxis.set_major_formatter(FuncFormatter(lambda value, _: f"{value:.0f}"))
+
+        with FigureExporter() as exporter:
+            exporter.submit(fig, tmp_path / "chart.png")
+            written = exporter.wait()
+
+        assert written == [tmp_path / "chart.png"]
+        assert written[0].stat().st_size > 0
+
+
+class TestExportFigure:
+    def test_without_exporter_saves_immediately(self, tmp_path):
+        export_figure(_figure(), tmp_path / "chart.png")
+
+        assert (tmp_path / "chart.png").exists()
+
+
+class TestLabelCalendarFigure:
+    def test_grid_places_days_by_week_and_weekday(self):
+        # 2024-01-03 is a Wednesday, 2024-01-15 a Monday two weeks later
+        fig = label_calendar_figure({"2024-01-03": "hype", "2024-01-15": "chill", "2024-01-07": "hype"})
+        (image,) = fig.axes[0].get_images()
+        grid = image.get_array()
+
+        # 0 = no label, then labels in sorted order: chill = 1, hype = 2
+        assert grid.shape == (7, 3)
+        assert grid[2, 0] == 2
+        assert grid[6, 0] == 2
+        assert grid[0, 2] == 1
+        assert (grid == 0).sum() == 21 - 3
+
+    def test_multi_year_calendar_is_one_image(self):
+        labels = {
+            f"{year}-{month:02d}-{day:02d}": "chill"
+            for year in (2022, 2023)
+            for month in range(1, 13)
+            for day in (1, 15)
+        }
+        fig = label_calendar_figure(labels)
+
+        assert len(fig.axes[0].get_images()) == 1
+        assert not fig.axes[0].patches
@@ -0,0 +1,122 @@
+import pytest
+
+from mca.core.interval import MessageWindow
+from mca.core.schema import (
+    Media,
+    Message,
+    Reaction,
+    SchemaError,
+    Share,
+    as_messages,
+    decode_messages,
+    decode_page,
+)
+
+
+def test_fields_and_defaults():
+    full, bare = decode_messages(
+        [
+            {
+                "sender_name": "Ola",
+                "timestamp_ms": 2,
+                "content": "hej",
+                "reactions": [{"reaction": "😆", "actor": "Ela"}],
+                "photos": [{"uri": "photos/1.jpg", "creation_timestamp": 1}],
+                "gifs": [{"uri": "gifs/1.gif"}],
+                "sticker": {"uri": "stickers/1.png", "ai_stickers": []},
+                "share": {"link": "https://example.com"},
+                "is_geoblocked_for_viewer": False,
+            },
+            {"sender_name": "Ela", "timestamp_ms": 1},
+        ]
+    )
+
+    assert full.reactions == (Reaction("😆", "Ela"),)
+    assert full.photos == (Media("photos/1.jpg", 1),)
+    assert full.sticker == Media("stickers/1.png")
+    assert full.share == Share(link="https://example.com")
+    assert full.has_media
+    assert bare == Message("Ela", 1)
+    assert (bare.content, bare.reactions, bare.videos, bare.share, bare.has_media) == (None, (), (), None, False)
+
+
+@pytest.mark.parametrize(
+    "message, location, problem",
+    [
+        ({"sender_name": 5, "timestamp_ms": 1}, "$.messages[1].sender_name", "expected str, got int"),
+        ({"sender_name": "Ola", "timestamp_ms": True}, "$.messages[1].timestamp_ms", "expected int, got bool"),
+        ({"sender_name": "Ola", "timestamp_ms": 1, "content": 5}, "$.messages[1].content", "expected str, got int"),
+        (
+            {"sender_name": "Ola", "timestamp_ms": 1, "reactions": [{"reaction": "👍", "actor": "Ela"}, "👍"]},
+            "$.messages[1].reactions[1]",
+            "expected object, got str",
+        ),
+        (
+            {"sender_name": "Ola", "timestamp_ms": 1, "videos": [{"uri": None}]},
+            "$.messages[1].videos[0].uri",
+            "expected str, got null",
+        ),
+        ("hej", "$.messages[1]", "expected object, got str"),
+    ],
+)
+def test_errors_name_the_field(message, location, problem):
+    with pytest.raises(SchemaError) as error:
+        decode_messages([{"sender_name": "Ela", "timestamp_ms": 2}, message])
+
+    assert (error.value.location, error.value.problem) == (location, problem)
+    assert str(error.value) == f"{location}: {problem}"
+
+
+def test_messages_without_sender_or_timestamp_are_left_out():
+    raw = [
+        {"sender_name": "Ola", "timestamp_ms": 3},
+        {"timestamp_ms": 2, "content": "bez nadawcy"},
+        {"sender_name": "Ela", "timestamp_ms": None},
+        {"sender_name": "Ela", "timestamp_ms": 1},
+    ]
+
+    assert [m.timestamp_ms for m in decode_messages(raw)] == [3, 1]
+
+
+def test_malformed_messages_are_skipped_and_reported():
+    raw = [
+        {"sender_name": "Ola", "timestamp_ms": 3},
+        {"timestamp_ms": 2, "content": "bez nadawcy"},
+        {"sender_name": "Ela", "timestamp_ms": 2, "reactions": [{"reaction": "👍", "actor": 7}]},
+        {"sender_name": "Ela", "timestamp_ms": 1, "photos": [{"uri": "a.jpg"}]},
+    ]
+    skipped, kept = [], []
+
+    messages = decode_messages(raw, skipped=skipped, kept=kept)
+
+    assert [m.timestamp_ms for m in messages] == [3, 1]
+    assert kept == [raw[0], raw[3]]
+    assert skipped == [
+        "$.messages[1]: missing required field 'sender_name'",
+        "$.messages[2].reactions[0].actor: expected str, got int",
+    ]
+
+
+def test_page():
+    page = decode_page({"participants": [{"name": "Ola"}], "messages": [{"sender_name": "Ola", "timestamp_ms": 1}]})
+
+    assert page.participants == ("Ola",)
+    assert page.title == ""
+
+    with pytest.raises(SchemaError, match=r"^message_2\.json: \$\.participants\[0\]: missing required field 'name'"):
+        decode_page({"participants": [{}], "messages": []}, source="message_2.json")
+
+
+def test_as_messages_decodes_once():
+    messages = decode_messages([{"sender_name": "Ola", "timestamp_ms": 1}])
+
+    assert as_messages(messages) is messages
+    assert as_messages([]) == []
+
+
+def test_any_sequence_of_messages():
+    raw = [{"sender_name": "Ola", "timestamp_ms": t} for t in (3, 2, 1)]
+
+    assert [m.timestamp_ms for m in as_messages(MessageWindow(raw, 1, 3))] == [2, 1]
+    with pytest.raises(SchemaError, match=r"^\$\.messages: expected array, got str$"):
+        decode_messages("hej")
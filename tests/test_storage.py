@@ -0,0 +1,149 @@
+import json
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from mca.core.storage import INBOX, FolderExport, ZipExport, find_exports, open_export
+
+CHAT = "alice_abc123"
+
+
+def _page(n):
+    return json.dumps({"participants": [{"name": "Alice"}], "messages": [{"content": f"page {n}"}]})
+
+
+def _members(root=""):
+    chat = f"{root}{INBOX}/{CHAT}"
+    return {
+        f"{chat}/message_1.json": _page(1),
+        f"{chat}/message_2.json": _page(2),
+        f"{chat}/message_10.json": _page(10),
+        f"{chat}/photos/cat.jpg": b"\xff\xd8 not really a jpeg",
+        f"{root}{INBOX}/bob_def456/message_1.json": _page(1),
+        f"{root}your_facebook_activity/profile.json": "{}",
+    }
+
+
+def _write_zip(path, members, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, "w", compression=compression) as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    return path
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return _write_zip(tmp_path / "facebook-alice-AbC.zip", _members())
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return tmp_path / "cache"
+
+
+class TestZipExport:
+    def test_lists_chats_and_pages_in_order(self, archive, cache):
+        export = ZipExport([archive], cache_dir=cache)
+
+        assert export.name == "facebook-alice-AbC"
+        assert export.chats() == ["alice_abc123", "bob_def456"]
+        assert [name.rsplit("/", 1)[1] for name in export.message_pages(CHAT)] == [
+            "message_1.json",
+            "message_2.json",
+            "message_10.json",
+        ]
+
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_LZMA])
+    def test_reads_json_from_the_archive(self, tmp_path, cache, compression):
+        archive = _write_zip(tmp_path / "facebook-x.zip", _members(), compression)
+        export = ZipExport([archive], cache_dir=cache)
+
+        page = export.load_json(f"{INBOX}/{CHAT}/message_10.json")
+
+        assert page["messages"] == [{"content": "page 10"}]
+
+    def test_index_is_reused(self, archive, cache, monkeypatch):
+        ZipExport([archive], cache_dir=cache)
+        assert (cache / "facebook-alice-AbC.index.json").exists()
+
+        def no_central_directory(*args, **kwargs):
+            raise AssertionError("central directory read again")
+
+        monkeypatch.setattr(zipfile, "ZipFile", no_central_directory)
+        export = ZipExport([archive], cache_dir=cache)
+
+        assert export.load_json(f"{INBOX}/{CHAT}/message_1.json")["messages"] == [{"content": "page 1"}]
+
+    def test_index_is_rebuilt_when_the_archive_changes(self, archive, cache):
+        ZipExport([archive], cache_dir=cache)
+        members = _members()
+        members[f"{INBOX}/{CHAT}/message_1.json"] = _page(100)
+        _write_zip(archive, members)
+        os.utime(archive, ns=(0, 0))
+
+        export = ZipExport([archive], cache_dir=cache)
+
+        assert export.load_json(f"{INBOX}/{CHAT}/message_1.json")["messages"] == [{"content": "page 100"}]
+
+    def test_media_is_extracted_on_demand(self, archive, cache):
+        export = ZipExport([archive], cache_dir=cache)
+        uri = f"{INBOX}/{CHAT}/photos/cat.jpg"
+
+        path = export.media_path(uri)
+
+        assert path == str(cache / "facebook-alice-AbC" / uri)
+        assert Path(path).read_bytes() == b"\xff\xd8 not really a jpeg"
+        assert [p.name for p in (cache / "facebook-alice-AbC").rglob("*") if p.is_file()] == ["cat.jpg"]
+        assert export.media_path(uri) == path
+        assert export.media_path(f"{INBOX}/{CHAT}/photos/missing.jpg") is None
+
+    def test_archive_with_a_top_level_folder(self, tmp_path, cache):
+        archive = _write_zip(tmp_path / "facebook-x.zip", _members(root="facebook-x/"))
+        export = ZipExport([archive], cache_dir=cache)
+
+        assert export.chats() == ["alice_abc123", "bob_def456"]
+        assert export.media_path(f"{INBOX}/{CHAT}/photos/cat.jpg") is not None
+
+    def test_missing_member(self, archive, cache):
+        with pytest.raises(FileNotFoundError):
+            ZipExport([archive], cache_dir=cache).open("nope.json")
+
+    def test_stale_index_entry(self, archive, cache):
+        export = ZipExport([archive], cache_dir=cache)
+        name = f"{INBOX}/{CHAT}/message_1.json"
+        export._members[name][1] += 1
+
+        with pytest.raises(zipfile.BadZipFile, match="delete the index"):
+            export.open(name)
+
+
+def test_split_archive_parts_form_one_export(tmp_path, monkeypatch):
+    members = list(_members().items())
+    _write_zip(tmp_path / "facebook-alice-AbC-1.zip", dict(members[:3]))
+    _write_zip(tmp_path / "facebook-alice-AbC-2.zip", dict(members[3:]))
+    (tmp_path / f"facebook-bob/{INBOX}/{CHAT}").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+
+    exports = find_exports(tmp_path)
+
+    assert [type(e).__name__ for e in exports] == ["FolderExport", "ZipExport"]
+    assert exports[1].name == "facebook-alice-AbC"
+    assert len(exports[1].message_pages(CHAT)) == 3
+    assert exports[1].media_path(f"{INBOX}/{CHAT}/photos/cat.jpg") is not None
+
+
+def test_folder_export(tmp_path):
+    chat = tmp_path / "facebook-alice" / INBOX / CHAT
+    chat.mkdir(parents=True)
+    for name in ("message_2.json", "message_1.json"):
+        (chat / name).write_text(_page(name[8]), encoding="utf-8")
+
+    export = open_export(tmp_path / "facebook-alice")
+
+    assert isinstance(export, FolderExport)
+    assert export.chats() == [CHAT]
+    assert [export.load_json(p)["messages"][0]["content"] for p in export.message_pages(CHAT)] == ["page 1", "page 2"]
+    assert export.media_path(f"{INBOX}/{CHAT}/photos/none.jpg") is None
+    assert open_export(export) is export
@@ -0,0 +1,119 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from mca.analytics import sql
+from mca.analytics.activity import get_most_active_days
+from mca.analytics.message_length import get_average_message_length
+from mca.core.parsed_messages import parse_messages
+from mca.core.storage import INBOX, FolderExport
+from mca.core.store import import_chat, open_store, store_path
+
+CHAT = "ola_abc123"
+
+
+def _ms(day, hour=12):
+    return int(datetime(2024, 3, day, hour).timestamp() * 1000)
+
+
+PAGES = [
+    [
+        {
+            "sender_name": "Ola",
+            "timestamp_ms": _ms(9),
+            "content": "pizza dzisiaj?",
+            "reactions": [
+                {"reaction": "👍", "actor": "Ela"},
+                {"reaction": "❤", "actor": "Jan"},
+                {"reaction": "😆", "actor": "Ola"},
+                {"reaction": "👍", "actor": "Ela"},
+            ],
+        },
+        {"sender_name": "Ela", "timestamp_ms": _ms(9, 10), "photos": [{"uri": "photos/1.jpg"}]},
+        {"sender_name": "Jan", "timestamp_ms": _ms(8), "content": "Jan pinned a message."},
+    ],
+    [
+        {"sender_name": "Ela", "timestamp_ms": _ms(2), "content": "kebab albo pizza"},
+        {"sender_name": "Ola", "timestamp_ms": _ms(1), "content": "hej"},
+        {"sender_name": "Ola", "timestamp_ms": _ms(1, 9), "content": "", "share": {"link": "https://example.com"}},
+        {"sender_name": "Ela", "content": "bez czasu"},
+    ],
+]
+
+
+def _write_page(chat_dir, n, messages):
+    page = {"participants": [{"name": "Ola"}, {"name": "Ela"}, {"name": "Jan"}], "messages": messages}
+    (chat_dir / f"message_{n}.json").write_text(json.dumps(page), encoding="utf-8")
+
+
+@pytest.fixture
+def export(tmp_path):
+    chat_dir = tmp_path / "facebook-x" / INBOX / CHAT
+    chat_dir.mkdir(parents=True)
+    for n, messages in enumerate(PAGES, 1):
+        _write_page(chat_dir, n, messages)
+    return FolderExport(tmp_path / "facebook-x")
+
+
+@pytest.fixture
+def conn(export, tmp_path):
+    conn = open_store(store_path(export, CHAT, store_dir=tmp_path / "stores"))
+    import_chat(conn, export, CHAT)
+    yield conn
+    conn.close()
+
+
+def _count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_import(conn):
+    assert [_count(conn, t) for t in ("messages", "reactions", "media", "participants", "pages")] == [6, 4, 1, 3, 2]
+    rows = conn.execute(
+        "SELECT content FROM messages WHERE sender = 'Ola' AND date LIKE '2024-03-%' AND num_reactions > 3"
+    ).fetchall()
+    assert [row["content"] for row in rows] == ["pizza dzisiaj?"]
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM messages WHERE sender = 'Ola'"))
+    assert "messages_sender_timestamp" in plan
+
+
+def test_messages_without_a_timestamp_are_skipped(export, tmp_path):
+    skipped = []
+    conn = open_store(store_path(export, CHAT, store_dir=tmp_path / "other"))
+    import_chat(conn, export, CHAT, skipped=skipped)
+    conn.close()
+
+    assert skipped == [f"{INBOX}/{CHAT}/message_2.json: $.messages[3]: missing required field 'timestamp_ms'"]
+
+
+def test_reimport_is_incremental(conn, export):
+    assert import_chat(conn, export, CHAT) == 0
+    assert _count(conn, "messages") == 6
+
+    chat_dir = export.root / INBOX / CHAT
+    _write_page(chat_dir, 1, [{"sender_name": "Jan", "timestamp_ms": _ms(10), "content": "sushi"}])
+    os.utime(chat_dir / "message_1.json", ns=(0, 0))
+
+    assert import_chat(conn, export, CHAT) == 1
+    assert [_count(conn, t) for t in ("messages", "reactions", "media")] == [4, 0, 0]
+    assert [row["content"] for row in sql.search(conn, "pizza")] == ["kebab albo pizza"]
+
+    (chat_dir / "message_2.json").unlink()
+    assert import_chat(conn, export, CHAT) == 0
+    assert [row["content"] for row in conn.execute("SELECT content FROM messages")] == ["sushi"]
+
+
+def test_aggregates_match_the_python_analytics(conn, export):
+    messages = parse_messages({"messages": [m for page in PAGES for m in page]})
+
+    assert sql.get_most_active_days(conn) == get_most_active_days(messages)
+    assert sql.get_average_message_length(conn) == get_average_message_length(messages)
+    assert sql.count_messages(conn) == {"Ola": 3, "Ela": 2}
+    assert sql.count_messages(conn, start_ms=_ms(8)) == {"Ola": 1, "Ela": 1}
+    assert sorted(row["content"] for row in sql.search(conn, "pizza OR hej")) == [
+        "hej",
+        "kebab albo pizza",
+        "pizza dzisiaj?",
+    ]
@@ -0,0 +1,81 @@
+import pytest
+
+from mca.core.parsed_messages import ParsedMessage
+from mca.nlp.summarize import (
+    LsaExtractor,
+    save_active_days_summaries,
+    save_month_summary,
+    summarize_month,
+    summarize_most_active_days,
+)
+
+
+def _identity(word):
+    return word
+
+
+class TestLsaExtractor:
+    def test_returns_requested_number_of_sentences_in_order(self):
+        sentences = [f"zdanie numer {i} o rowerze {i % 3}" for i in range(30)]
+
+        result = LsaExtractor(_identity)(sentences, 5)
+
+        assert len(result) == 5
+        assert result == sorted(result, key=sentences.index)
+
+    def test_short_input_returned_unchanged(self):
+        sentences = ["pierwsze zdanie", "drugie zdanie"]
+
+        assert LsaExtractor(_identity)(sentences, 5) == sentences
+
+    def test_only_stopwords_falls_back_to_first_sentences(self):
+        sentences = ["to jest", "nie to", "jest nie"]
+
+        assert LsaExtractor(_identity)(sentences, 2) == ["to jest", "nie to"]
+
+
+def _parsed(sender, content, date="2024-01-15", is_builtin=False):
+    return ParsedMessage(
+        sender=sender, content=content, timestamp_ms=0, date=date, num_reactions=0, is_builtin=is_builtin
+    )
+
+
+@pytest.fixture
+def summarizer():
+    return LsaExtractor(_identity)
+
+
+class TestSummarizeMonth:
+    def test_uses_message_sentences_only(self, summarizer):
+        messages = [
+            _parsed("Alice", "Pierwsze zdanie. Drugie zdanie."),
+            _parsed("Bob", None),
+            _parsed("Bob", "Bob pinned a message", is_builtin=True),
+        ]
+
+        assert summarize_month(messages, summarizer) == ["Pierwsze zdanie.", "Drugie zdanie."]
+
+
+class TestSummarizeMostActiveDays:
+    def test_one_summary_per_active_day(self, summarizer):
+        messages = [
+            _parsed("Alice", "Rano był rower.", date="2024-01-01"),
+            _parsed("Bob", "Wieczorem mecz.", date="2024-01-02"),
+            _parsed("Bob", "Nieaktywny dzień.", date="2024-01-03"),
+        ]
+
+        result = summarize_most_active_days(messages, [("2024-01-02", 1), ("2024-01-01", 1)], summarizer)
+
+        assert result == {"2024-01-02": ["Wieczorem mecz."], "2024-01-01": ["Rano był rower."]}
+
+
+class TestSaveSummaries:
+    def test_writes_to_given_directory(self, tmp_path, monkeypatch, summarizer):
+        monkeypatch.setattr("mca.nlp.summarize._SUMMARIZER", summarizer)
+        messages = [_parsed("Alice", "Jedno zdanie.", date="2024-01-01")]
+
+        month_path = save_month_summary(messages, out_dir=tmp_path)
+        day_paths = save_active_days_summaries(messages, [("2024-01-01", 1)], out_dir=tmp_path)
+
+        assert month_path.read_text(encoding="utf-8") == "Jedno zdanie.\n"
+        assert [p.name for p in day_paths] == ["active_day_2024-01-01_summary_lsa.txt"]
@@ -0,0 +1,97 @@
+from mca.nlp.threads import adaptive_gap_min, iter_chronological, iter_threads, segment_threads
+
+
+class TestSegmentThreads:
+    def test_splits_by_time_gap(self):
+        # Messages with 2-hour gaps (>60 min default)
+        messages = [
+            {"ts": 0, "author": "User1", "text": "msg1"},
+            {"ts": 60 * 60 * 1000, "author": "User1", "text": "msg2"},  # 1 hour later
+            {"ts": 3 * 60 * 60 * 1000, "author": "User1", "text": "msg3"},  # 2 hours after msg2
+        ]
+
+        result = segment_threads(messages, time_gap_min=60)
+
+        assert len(result) == 3  # Each message in separate thread
+
+    def test_groups_close_messages(self):
+        # Messages within 30 minutes
+        messages = [
+            {"ts": 0, "author": "User1", "text": "msg1"},
+            {"ts": 10 * 60 * 1000, "author": "User1", "text": "msg2"},  # 10 min later
+            {"ts": 20 * 60 * 1000, "author": "User1", "text": "msg3"},  # 10 min later
+        ]
+
+        result = segment_threads(messages, time_gap_min=60)
+
+        assert len(result) == 1
+        assert len(result[0]) == 3
+
+    def test_empty_messages(self):
+        result = segment_threads([], time_gap_min=60)
+        assert result == []
+
+    def test_single_message(self):
+        messages = [{"ts": 0, "author": "User1", "text": "msg1"}]
+
+        result = segment_threads(messages, time_gap_min=60)
+
+        assert len(result) == 1
+        assert len(result[0]) == 1
+
+
+class TestIterThreads:
+    def test_yields_closed_thread_before_consuming_the_rest(self):
+        consumed = []
+
+        def stream():
+            for ts in (0, 1, 2 * 60 * 60 * 1000, 2 * 60 * 60 * 1000 + 1):
+                consumed.append(ts)
+                yield {"ts": ts}
+
+        first = next(iter_threads(stream(), time_gap_min=60))
+
+        assert [m["ts"] for m in first] == [0, 1]
+        assert len(consumed) == 3  # only the message that closed the thread was read past it
+
+    def test_gap_equal_to_threshold_starts_new_thread(self):
+        messages = [{"ts": 0}, {"ts": 30 * 60 * 1000}]
+
+        assert len(segment_threads(messages, time_gap_min=30)) == 2
+
+
+class TestIterChronological:
+    def test_reverses_newest_first_export(self):
+        messages = [{"timestamp_ms": 3}, {"timestamp_ms": 2}, {"timestamp_ms": 1}]
+
+        assert [m["timestamp_ms"] for m in iter_chronological(messages)] == [1, 2, 3]
+
+    def test_keeps_oldest_first_input(self):
+        messages = [{"timestamp_ms": 1}, {"timestamp_ms": 2}, {"timestamp_ms": 2}]
+
+        assert [m["timestamp_ms"] for m in iter_chronological(messages)] == [1, 2, 2]
+
+    def test_sorts_unordered_input(self):
+        messages = [{"timestamp_ms": 2}, {"timestamp_ms": 3}, {"timestamp_ms": 1}]
+
+        assert [m["timestamp_ms"] for m in iter_chronological(messages)] == [1, 2, 3]
+
+
+class TestAdaptiveGapMin:
+    def test_uses_quantile_of_gaps(self):
+        minute = 60 * 1000
+        timestamps = [i * 20 * minute for i in range(50)]
+
+        assert adaptive_gap_min(timestamps, quantile=0.95) == 20
+
+    def test_clamped_to_bounds(self):
+        minute = 60 * 1000
+        busy = [i * minute for i in range(50)]
+        quiet = [i * 24 * 60 * minute for i in range(50)]
+
+        assert adaptive_gap_min(busy, bounds_min=(15, 240)) == 15
+        assert adaptive_gap_min(quiet, bounds_min=(15, 240)) == 240
+
+    def test_default_when_too_few_gaps(self):
+        assert adaptive_gap_min([0], default=60) == 60
+        assert adaptive_gap_min([], default=45) == 45
@@ -0,0 +1,35 @@
+import random
+
+import numpy as np
+
+from mca.analytics.topk import select_top, top_k_indices
+
+
+class TestTopKIndices:
+    def test_matches_stable_sort_with_ties(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            scores = [rng.randint(0, 5) for _ in range(rng.randint(0, 30))]
+            k = rng.randint(0, 35)
+            expected = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+
+            assert top_k_indices(scores, k).tolist() == expected
+
+    def test_empty_and_zero_k(self):
+        assert top_k_indices([], 3).size == 0
+        assert top_k_indices([1.0, 2.0], 0).size == 0
+
+    def test_returns_numpy_indices(self):
+        assert top_k_indices(np.array([1, 3, 2]), 2).tolist() == [1, 2]
+
+
+class TestSelectTop:
+    def test_threshold_extends_n(self):
+        items = [{"n": 5}, {"n": 10}, {"n": 3}, {"n": 1}]
+
+        assert select_top(items, 1, key=lambda x: x["n"], threshold=2) == [{"n": 10}, {"n": 5}, {"n": 3}]
+
+    def test_threshold_never_shrinks_n(self):
+        items = [{"n": 5}, {"n": 10}, {"n": 3}]
+
+        assert select_top(items, 2, key=lambda x: x["n"], threshold=100) == [{"n": 10}, {"n": 5}]
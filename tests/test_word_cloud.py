@@ -1,6 +1,10 @@
+import os
+
+import numpy as np
 import pytest
+from PIL import Image
 
-from mca.viz.word_cloud import get_most_used_words
+from mca.viz.word_cloud import count_most_used_words, get_most_used_words, load_mask
 
 
 class TestGetMostUsedWords:
@@ -121,3 +125,65 @@ class TestGetMostUsedWords:
 
         # Polish special characters should be preserved
         assert "zażółć" in words or "gęślą" in words or "jaźń" in words
+
+
+class TestCountMostUsedWords:
+    def test_counts_match_word_list(self):
+        data = {
+            "messages": [
+                {"content": "HELLO World hello https://example.com"},
+                {"content": "User sent an attachment"},
+                {"content": "world of @Jan Kowalski"},
+            ]
+        }
+        counts, top_n = count_most_used_words(data, top_n=10)
+        words, _ = get_most_used_words(data)
+
+        assert top_n == 10
+        assert counts["hello"] == 2
+        assert counts["world"] == 2
+        assert sorted(counts.elements()) == sorted(words)
+
+    def test_empty_messages(self):
+        counts, _ = count_most_used_words({"messages": []})
+
+        assert not counts
+
+
+class TestLoadMask:
+    @pytest.fixture
+    def stencil(self, tmp_path):
+        # white border (no words) around a black 4x4 square (canvas)
+        arr = np.full((8, 8, 4), 255, dtype=np.uint8)
+        arr[2:6, 2:6, :3] = 0
+        path = tmp_path / "stencil.png"
+        Image.fromarray(arr, "RGBA").save(path)
+        return path
+
+    def test_binarises_like_wordcloud(self, stencil, tmp_path):
+        mask = load_mask(str(stencil), cache_dir=str(tmp_path / "cache"))
+
+        assert mask.shape == (8, 8)
+        assert mask.dtype == np.uint8
+        assert set(np.unique(mask)) == {0, 255}
+        assert (mask[2:6, 2:6] == 0).all()
+        assert mask[0, 0] == 255
+
+    def test_downscale(self, stencil, tmp_path):
+        mask = load_mask(str(stencil), downscale=2, cache_dir=str(tmp_path / "cache"))
+
+        assert mask.shape == (4, 4)
+        assert (mask[1:3, 1:3] == 0).all()
+        assert mask[0, 0] == 255
+
+    def test_cached_as_npy_and_reused(self, stencil, tmp_path):
+        cache_dir = tmp_path / "cache"
+        first = load_mask(str(stencil), cache_dir=str(cache_dir))
+        cached = cache_dir / "stencil_1x.npy"
+        assert cached.exists()
+
+        np.save(cached, np.zeros_like(first))
+        assert not load_mask(str(stencil), cache_dir=str(cache_dir)).any()
+
+        os.utime(stencil, (cached.stat().st_mtime + 10,) * 2)
+        assert (load_mask(str(stencil), cache_dir=str(cache_dir)) == first).all()